@@ -0,0 +1,79 @@
+from pathlib import Path
+
+import pytest
+
+from tiro.core import Scenario
+
+# The asset library of the karez example, also used by the tests.
+ASSET_LIBRARY_PATH = Path(__file__).parent.parent / "example" / "karez"
+
+SCENARIO = """
+DataHall:
+  $number: 2
+  $type: DataHall
+  Rack:
+    $number: 3
+    $type: Rack
+    Server:
+      $number: 2
+      $type: Server
+  CRAC:
+    $number: 1
+    $type: CRAC
+"""
+
+USE = """
+- DataHall:
+  - RoomTemperature
+  - CRAC:
+    - ActivePower
+    - SupplyTemperature
+  - Rack:
+    - ActivePower
+    - Server:
+      - ActivePower
+      - CPUTemperature
+"""
+
+
+def scenario_yaml(definition: str = SCENARIO) -> str:
+    """Scenario definition with the asset library of the tests"""
+    return (
+        f"$asset_library_name: test_assets\n"
+        f"$asset_library_path: {ASSET_LIBRARY_PATH}\n" + definition
+    )
+
+
+@pytest.fixture
+def load_scenario():
+    def load(definition: str = SCENARIO, *uses: str, **kwargs) -> Scenario:
+        return Scenario.from_yaml(scenario_yaml(definition), *uses, **kwargs)
+
+    return load
+
+
+@pytest.fixture
+def scenario(load_scenario) -> Scenario:
+    return load_scenario(SCENARIO, USE)
+
+
+def reference(halls: int = 2, racks: int = 2) -> dict:
+    """Reference of the test scenario, with a uuid for the ActivePower of every rack"""
+    tree = {
+        "DataHall": {
+            f"hall_{h}": {
+                "Rack": {
+                    f"rack_{h}_{r}": {"DataPoints": {"ActivePower": {}}}
+                    for r in range(racks)
+                }
+            }
+            for h in range(halls)
+        }
+    }
+    uuid_map = {
+        f"uuid_{h}_{r}": f"DataHall.hall_{h}.Rack.rack_{h}_{r}.ActivePower"
+        for h in range(halls)
+        for r in range(racks)
+    }
+    value_range = {"DataHall.Rack.ActivePower": {"min": 10, "max": 20}}
+    return dict(tree=tree, uuid_map=uuid_map, value_range=value_range)
@@ -0,0 +1,63 @@
+import json
+from importlib import import_module
+
+import pytest
+
+from tiro.core import Scenario
+from conftest import SCENARIO, USE, scenario_yaml
+
+
+def test_artifact_is_saved_and_loaded(load_scenario, tmp_path):
+    compiled = load_scenario(SCENARIO, USE, cache_dir=tmp_path)
+    artifacts = list(tmp_path.glob("*.json"))
+    assert len(artifacts) == 1
+    loaded = Scenario.from_artifact(json.loads(artifacts[0].read_text()))
+    assert sorted(loaded.root.all_required_paths()) == sorted(
+        compiled.root.all_required_paths()
+    )
+    assert loaded.model().schema() == compiled.model().schema()
+
+
+def test_cached_scenario_is_loaded_from_artifact(load_scenario, tmp_path):
+    load_scenario(SCENARIO, USE, cache_dir=tmp_path)
+    artifact = next(tmp_path.glob("*.json"))
+    # The artifact is used as long as the inputs are unchanged, so a marked artifact shows up.
+    content = json.loads(artifact.read_text())
+    content["required"]["uses"].append("DataHall.CRAC.FanSpeed")
+    artifact.write_text(json.dumps(content))
+    loaded = load_scenario(SCENARIO, USE, cache_dir=tmp_path)
+    assert "DataHall.CRAC.FanSpeed" in loaded.root.uses
+
+
+def test_outdated_artifact_is_rejected_before_rebuilding(load_scenario):
+    artifact = load_scenario(SCENARIO, USE).artifact()
+    artifact["library_digest"] = "outdated"
+    data_hall = artifact["definition"]["children"]["DataHall"]
+    data_hall["entity"]["children"]["Rack"]["entity"]["children"]["Server"]["meta"][
+        "$defaults"
+    ] = dict(CPUTemperature=99)
+    assert Scenario.from_artifact(artifact) is None
+    server = import_module("test_assets").Server
+    assert server.data_point_info["CPUTemperature"].default is None
+
+
+def test_scenario_digest_depends_on_uses():
+    assert Scenario.digest(scenario_yaml(), USE) != Scenario.digest(scenario_yaml())
+
+
+def truncate(artifact):
+    artifact.write_text(artifact.read_text()[:100])
+
+
+def corrupt(artifact):
+    content = json.loads(artifact.read_text())
+    content["library_modules"] = 1
+    artifact.write_text(json.dumps(content))
+
+
+@pytest.mark.parametrize("damage", [truncate, corrupt])
+def test_damaged_artifact_is_rebuilt(load_scenario, tmp_path, damage):
+    compiled = load_scenario(SCENARIO, USE, cache_dir=tmp_path)
+    damage(next(tmp_path.glob("*.json")))
+    loaded = load_scenario(SCENARIO, USE, cache_dir=tmp_path)
+    assert loaded.model().schema() == compiled.model().schema()
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from tiro.core.mock import MockApp, Mocker
+from conftest import reference
+
+PATH = "DataHall.data_hall_0.Rack.rack_0.Telemetry.ActivePower"
+UNKNOWN = "DataHall.data_hall_0.Rack.rack_9.Telemetry.ActivePower"
+
+
+@pytest.fixture
+def client(scenario):
+    return TestClient(MockApp(Mocker(scenario.root)))
+
+
+def test_batch_of_paths(client):
+    r = client.post("/points/batch", json=dict(paths=[PATH, UNKNOWN]))
+    assert r.status_code == 200
+    found, missing = r.json()
+    assert found["path"] == PATH and found["result"]["value"] is not None
+    assert missing == dict(path=UNKNOWN, error=f"Cannot find path {UNKNOWN}")
+
+
+@pytest.mark.parametrize(
+    "selector",
+    [
+        dict(pattern="DataHall%Rack%ActivePower"),
+        dict(uses=[{"DataHall": [{"Rack": ["ActivePower"]}]}]),
+    ],
+)
+def test_batch_of_type_paths(client, selector):
+    items = client.post("/points/batch", json=selector).json()
+    assert sorted(item["path"] for item in items) == [
+        f"DataHall.data_hall_{i // 3}.Rack.rack_{i}.Telemetry.ActivePower"
+        for i in range(6)
+    ]
+    assert all(item["result"]["value"] is not None for item in items)
+
+
+@pytest.mark.parametrize(
+    "selector", [{}, dict(pattern=""), dict(uses=[]), dict(paths=[], pattern="")]
+)
+def test_empty_selectors_are_rejected(client, selector):
+    assert client.post("/points/batch", json=selector).status_code == 422
+
+
+def test_streamed_batch(client):
+    r = client.post(
+        "/points/batch", params=dict(stream=True), json=dict(pattern="DataHall%%")
+    )
+    assert r.headers["content-type"] == "application/x-ndjson"
+    items = [json.loads(line) for line in r.text.splitlines()]
+    assert len(items) == len(
+        client.post("/points/batch", json=dict(pattern="%%")).json()
+    )
+
+
+def test_batch_of_uuids(scenario):
+    client = TestClient(MockApp(Mocker(scenario.root, reference=reference())))
+    r = client.post("/values/batch", json=dict(uuids=["uuid_0_1", "unknown"]))
+    found, missing = r.json()
+    assert found["name"] == "uuid_0_1" and 10 <= found["value"] <= 20
+    assert missing == dict(name="unknown", error="Cannot find uuid unknown")
+
+
+def test_vectorized_batch(scenario):
+    mocker = Mocker(scenario.root, vectorized=True)
+    paths = mocker.list_data_points()
+    results = dict(mocker.gen_data_points(paths + [UNKNOWN]))
+    assert results.pop(UNKNOWN) is None
+    assert list(results) == paths
+    assert all(r["value"] is not None for r in results.values())
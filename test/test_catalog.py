@@ -0,0 +1,42 @@
+import numpy as np
+
+
+def test_catalog_has_a_row_per_data_point(scenario):
+    catalog = scenario.catalog()
+    assert sorted(catalog["path"]) == sorted(scenario.root.all_required_paths())
+    row = catalog[catalog["path"] == "DataHall.Rack.Server.CPUTemperature"][0]
+    assert row["name"] == "CPUTemperature"
+    assert row["entity_type"] == "Server"
+    assert row["category"] == "Telemetry"
+    assert (row["ge"], row["le"]) == (0, 150)
+    assert np.isnan(row["default"]) and row["default_text"] == ""
+
+
+def test_catalog_is_cached_until_the_tree_changes(scenario):
+    catalog = scenario.catalog()
+    assert scenario.catalog() is catalog
+    scenario.root.requires("DataHall.Rack.Server.HeatLoad")
+    assert "DataHall.Rack.Server.HeatLoad" in scenario.catalog()["path"]
+
+
+def test_saved_catalog_is_memory_mapped(scenario, tmp_path):
+    path = tmp_path / "catalog.npy"
+    scenario.catalog(path)
+    saved = scenario.catalog()
+    assert len(list(tmp_path.glob("catalog.*.npy"))) == 1
+    loaded = scenario.catalog(path)
+    assert isinstance(loaded, np.memmap)
+    for name in loaded.dtype.names:
+        # Missing numbers are NaN, which only compare equal with equal_nan.
+        equal_nan = loaded.dtype[name].kind == "f"
+        assert np.array_equal(loaded[name], saved[name], equal_nan=equal_nan)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_saved_catalog_follows_the_scenario(scenario, tmp_path):
+    path = tmp_path / "catalog.npy"
+    scenario.catalog(path)
+    scenario.root.requires("DataHall.Rack.Server.HeatLoad")
+    assert "DataHall.Rack.Server.HeatLoad" in scenario.catalog(path)["path"]
+    (saved,) = tmp_path.glob("catalog.*.npy")
+    assert "DataHall.Rack.Server.HeatLoad" in np.load(saved)["path"]
@@ -0,0 +1,53 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from tiro.core.mock import MockApp, Mocker
+
+
+@pytest.fixture
+def mocker(scenario):
+    return Mocker(scenario.root)
+
+
+@pytest.fixture
+def client(mocker):
+    return TestClient(MockApp(mocker))
+
+
+@pytest.mark.parametrize("url", ["/hierarchy", "/points/", "/values/", "/attributes/"])
+def test_not_modified(client, url):
+    r = client.get(url)
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+    assert client.get(url).headers["etag"] == etag
+    r = client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert not r.content
+    r = client.get(url, headers={"If-None-Match": f'"other", {etag}'})
+    assert r.status_code == 304
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_regenerated_tree_changes_etag(client, mocker):
+    r = client.get("/points/")
+    mocker.dict(regenerate=True)
+    changed = client.get("/points/", headers={"If-None-Match": r.headers["etag"]})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != r.headers["etag"]
+    assert changed.json() == mocker.list_data_points()
+
+
+def test_attributes_depend_on_attribute_changes(client, mocker):
+    path = "DataHall.data_hall_0"
+    client.get(f"/attributes/{path}")
+    cache = client.app.response_cache
+    versions = cache[f"attributes:{path}"][0]
+    mocker.dict(change_attrs=True)
+    client.get(f"/attributes/{path}")
+    # The response is encoded again with the new versions.
+    assert cache[f"attributes:{path}"][0] != versions
+    assert cache[f"attributes:{path}"][0] == (
+        mocker.structure_version,
+        mocker.attrs_version,
+    )
+    assert client.get("/attributes/DataHall.data_hall_9").status_code == 404
@@ -0,0 +1,155 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from tiro.core import Entity, Scenario
+from tiro.core.faults import Burst, FaultInjector, Latency, LoadProfile
+from tiro.core.mock import Mocker
+from tiro.core.mock_app import MockApp
+from tiro.core.model import Attribute
+from tiro.core.utils import parse_isoformat
+
+PATH = "DataHall.data_hall_0.CRAC.crac_0.Telemetry.ActivePower"
+
+
+def test_profile_is_loaded(tmp_path):
+    path = tmp_path / "profile.yaml"
+    path.write_text(
+        "seed: 1\n"
+        "drop_rate: 0.1\n"
+        "latency:\n  default: {mean: 0.1}\n"
+        "burst: {period: 60, duration: 5}\n"
+    )
+    profile = LoadProfile.from_yaml(path)
+    assert profile.drop_rate == 0.1
+    assert profile.latency["default"].mean == 0.1
+    assert profile.burst.factor == 10.0
+    path.write_text("")
+    assert LoadProfile.from_yaml(path) == LoadProfile()
+
+
+def test_latency_of_the_most_specific_endpoint():
+    faults = FaultInjector(
+        LoadProfile(
+            seed=1,
+            latency={
+                "default": Latency(mean=1.0),
+                "/points": Latency(mean=5.0, std=1.0, max=5.5),
+                "/points/batch": Latency(mean=0.0),
+            },
+        )
+    )
+    assert faults.latency("/values/") == 1.0
+    assert all(0 <= faults.latency("/points/x") <= 5.5 for _ in range(100))
+    assert faults.latency("/points/batch") == 0.0
+    assert FaultInjector(LoadProfile()).latency("/points/x") == 0.0
+
+
+@pytest.mark.parametrize(
+    "timestamp", ["2022-09-01T12:00:00Z", "2022-09-01T12:00:00+00:00"]
+)
+def test_stale_timestamps(timestamp):
+    faults = FaultInjector(LoadProfile(seed=1, stale_rate=1.0, stale_factor=3.0))
+    time_var = timedelta(seconds=10)
+    for _ in range(20):
+        stale = datetime.fromisoformat(
+            faults.stale(dict(value=1, timestamp=timestamp), time_var)["timestamp"]
+        )
+        age = datetime(2022, 9, 1, 12, tzinfo=timezone.utc) - stale
+        assert time_var <= age <= 3 * time_var
+    result = dict(value=1, timestamp=None)
+    assert faults.stale(result, time_var) is result
+
+
+def test_faults_are_seeded():
+    def draw(seed):
+        faults = FaultInjector(
+            LoadProfile(
+                seed=seed,
+                drop_rate=0.5,
+                malformed_rate=0.5,
+                latency={"default": Latency(mean=1, std=1)},
+            )
+        )
+        return [
+            (faults.drops(), faults.malforms(), faults.latency("/points/"))
+            for _ in range(20)
+        ]
+
+    assert draw(1) == draw(1)
+    assert draw(1) != draw(2)
+
+
+def test_no_faults_at_zero_rates():
+    faults = FaultInjector(LoadProfile(seed=1))
+    result = dict(value=1, timestamp="2022-09-01T12:00:00")
+    assert not any(faults.drops() or faults.malforms() for _ in range(100))
+    assert faults.stale(result, timedelta(0)) is result
+
+
+def test_malformed_content_is_truncated():
+    faults = FaultInjector(LoadProfile(seed=1, malformed_rate=1.0))
+    content = json.dumps(dict(value=1.0, timestamp="2022-09-01T12:00:00")).encode()
+    for _ in range(20):
+        malformed = faults.malformed(content)
+        assert content.startswith(malformed) and len(malformed) < len(content)
+        with pytest.raises(ValueError):
+            json.loads(malformed)
+    assert faults.malformed(b"") == b""
+
+
+def test_burst_interval():
+    faults = FaultInjector(LoadProfile(burst=Burst(period=60, duration=5, factor=4)))
+    assert faults.interval(1.0, 122.0) == 0.25
+    assert faults.interval(1.0, 130.0) == 1.0
+    assert FaultInjector(LoadProfile()).interval(1.0, 122.0) == 1.0
+
+
+def test_dropped_data_points_are_not_served(scenario):
+    mocker = scenario.mocker()
+    client = TestClient(MockApp(mocker, profile=LoadProfile(seed=1, drop_rate=1.0)))
+    assert client.get(f"/points/{PATH}").status_code == 404
+    r = client.post("/points/batch", json=dict(paths=[PATH]))
+    assert r.status_code == 200
+    assert r.json() == [dict(path=PATH, error=f"Cannot find path {PATH}")]
+
+
+def test_served_timestamps_are_stale(scenario):
+    mocker = scenario.mocker()
+    client = TestClient(MockApp(mocker, profile=LoadProfile(seed=1, stale_rate=1.0)))
+    before = datetime.now(timezone.utc)
+    timestamp = parse_isoformat(client.get(f"/points/{PATH}").json()["timestamp"])
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    assert timestamp < before
+
+
+def test_responses_are_malformed(scenario):
+    mocker = scenario.mocker()
+    client = TestClient(
+        MockApp(mocker, profile=LoadProfile(seed=1, malformed_rate=1.0))
+    )
+    r = client.get(f"/points/{PATH}")
+    assert r.status_code == 200
+    with pytest.raises(ValueError):
+        r.json()
+
+
+class Gauge(Entity):
+    Label: Attribute(str, faker=lambda: "label")
+
+
+def test_dropped_attributes_are_not_served():
+    scenario = Scenario(Gauge.many(2))
+    scenario.requires(yaml="- Gauge:\n  - Label\n")
+    app = MockApp(Mocker(scenario.root), profile=LoadProfile(seed=1, drop_rate=1.0))
+    client = TestClient(app)
+    assert client.get("/attributes/").json() == {}
+    app.mocker.faults.profile.drop_rate = 0.0
+    # Responses depending on the faults are not cached.
+    attributes = client.get("/attributes/").json()
+    assert sorted(attributes["Gauge"]) == ["gauge_0", "gauge_1"]
+    assert client.get("/points/").json()
+    assert not app.response_cache
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from tiro.core.fragments import data_point_values, encode_tree
+from tiro.core.mock import Mocker
+
+PATH = "DataHall.data_hall_0.Rack.rack_0.Telemetry.ActivePower"
+
+
+def lookup(data: dict, path: str):
+    for key in path.split("."):
+        data = data[key]
+    return data
+
+
+def current(mocker: Mocker, path: str) -> dict:
+    dp = mocker.find_data_point(path)
+    if mocker.vectorized:
+        return mocker.engine.point(mocker.engine.index[dp.path_id])
+    return dp.dict()
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_dumps_encodes_the_current_values(scenario, vectorized):
+    mocker = Mocker(scenario.root, vectorized=vectorized)
+    previous = None
+    for _ in range(3):
+        data = json.loads(mocker.dumps())
+        assert data != previous
+        scenario.model().parse_obj(data)
+        for path in mocker.list_data_points():
+            assert lookup(data, path) == current(mocker, path)
+        previous = data
+
+
+def test_unchanged_subtrees_are_reused(scenario):
+    mocker = Mocker(scenario.root)
+    mocker.dumps()
+    hall_0, hall_1 = (
+        mocker.index.entities[f"DataHall.data_hall_{i}"] for i in range(2)
+    )
+    fragment_0, fragment_1 = hall_0.fragments[True][1], hall_1.fragments[True][1]
+    # Encoding again without generating anything reuses the whole tree.
+    assert (
+        encode_tree(mocker.entity, data_point_values)
+        == mocker.entity.fragments[True][1]
+    )
+    assert hall_0.fragments[True][1] is fragment_0
+
+    result = mocker.gen_data_point(PATH)
+    data = json.loads(encode_tree(mocker.entity, data_point_values))
+    assert lookup(data, PATH) == result
+    assert hall_0.fragments[True][1] is not fragment_0
+    assert hall_1.fragments[True][1] is fragment_1
+
+
+def test_json_with_arguments(scenario):
+    mocker = Mocker(scenario.root)
+    indented = mocker.json(indent=2)
+    assert "\n  " in indented
+    assert json.loads(mocker.json(include_data_points=False)) == mocker.dict(
+        include_data_points=False
+    )
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+from typer.testing import CliRunner
+
+from tiro.cli import app
+from tiro.core.history import to_line_protocol, write_history
+from tiro.core.mock import Mocker
+
+START = datetime(2024, 1, 1, 23)
+STOP = datetime(2024, 1, 2, 1)
+STEP = timedelta(minutes=10)
+STEPS = 12
+
+
+def history(scenario, **kwargs) -> list[pd.DataFrame]:
+    mocker = Mocker(scenario.root, vectorized=True, seed=0)
+    return list(mocker.generate_history(START, STOP, STEP, **kwargs))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 50, 10_000])
+def test_chunks_have_at_most_chunk_size_rows(scenario, chunk_size):
+    frames = history(scenario, chunk_size=chunk_size)
+    points = (frames[0].timestamp == pd.Timestamp(START)).sum()
+    assert sum(map(len, frames)) == STEPS * points
+    # A step is never split, so chunks smaller than a step hold one step.
+    assert all(len(f) <= max(chunk_size, points) for f in frames)
+    assert all(len(f) % points == 0 for f in frames)
+
+
+def test_rows_are_tagged_and_timestamped(scenario):
+    frame = pd.concat(history(scenario))
+    assert {"path", "asset_path", "DataHall", "type", "field", "value"} <= set(
+        frame.columns
+    )
+    # Without time_var, the timestamps are the times of the steps.
+    assert frame.timestamp.nunique() == STEPS
+    assert frame.timestamp.min() == pd.Timestamp(START)
+    assert frame.timestamp.max() == pd.Timestamp(STOP - STEP)
+    cpu = frame[frame.field == "CPUTemperature"]
+    assert cpu.value.between(0, 150).all()
+    assert set(cpu.path) == {"DataHall.Rack.Server.CPUTemperature"}
+
+
+def test_step_must_be_positive(scenario):
+    mocker = Mocker(scenario.root, vectorized=True)
+    with pytest.raises(ValueError):
+        list(mocker.generate_history(START, STOP, timedelta(0)))
+
+
+def test_csv_files_per_date(scenario, tmp_path):
+    rows = write_history(history(scenario, chunk_size=50), tmp_path, "csv")
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert files == ["2024-01-01.csv", "2024-01-02.csv"]
+    assert sum(len(pd.read_csv(tmp_path / f)) for f in files) == rows
+
+
+def test_line_protocol(scenario):
+    frame = history(scenario)[0]
+    lines = list(to_line_protocol(frame))
+    assert len(lines) == len(frame)
+    tags, field, timestamp = lines[0].split(" ")
+    assert tags.startswith("tiro_telemetry,")
+    assert f",path={frame.path[0]}" in tags
+    assert field.startswith(f"{frame.field[0]}=")
+    assert int(timestamp) == frame.timestamp[0].value
+
+
+def test_line_protocol_counts_the_lines_written(scenario, tmp_path):
+    frame = history(scenario)[0]
+    frame.loc[:9, "value"] = None
+    file = tmp_path / "history.lp"
+    rows = write_history([frame], file, "influx")
+    assert rows == len(frame) - 10
+    assert len(file.read_text().splitlines()) == rows
+
+
+def test_backfill_rejects_unknown_formats(tmp_path):
+    result = CliRunner().invoke(
+        app,
+        ["mock", "backfill", "scenario.yaml", "use.yaml", "-o", str(tmp_path)]
+        + ["--start", "2024-01-01", "-f", "xlsx"],
+    )
+    assert result.exit_code == 2
+    assert "xlsx" in result.output
+
+
+def test_parquet_dataset_partitioned_by_date(scenario, tmp_path):
+    pytest.importorskip("pyarrow")
+    rows = write_history(history(scenario, chunk_size=50), tmp_path, "parquet")
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "date=2024-01-01",
+        "date=2024-01-02",
+    ]
+    assert len(pd.read_parquet(tmp_path)) == rows
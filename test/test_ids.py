@@ -0,0 +1,71 @@
+import re
+
+import pytest
+from pydantic import ValidationError
+
+from tiro.core.model import IdSet, LITERAL_IDS_LIMIT
+
+
+def rack_scenario(load_scenario, ids: list[str]):
+    definition = f"""
+DataHall:
+  $ids: [hall]
+  $type: DataHall
+  Rack:
+    $ids: [{", ".join(ids)}]
+    $number: {len(ids)}
+    $type: Rack
+"""
+    return load_scenario(definition, "- DataHall:\n  - Rack:\n    - ActivePower\n")
+
+
+def racks_field(model):
+    data_hall = model.__fields__["DataHall"].type_
+    return data_hall.__fields__["Rack"]
+
+
+@pytest.mark.parametrize(
+    "number", [3, LITERAL_IDS_LIMIT, LITERAL_IDS_LIMIT + 1, 3 * LITERAL_IDS_LIMIT]
+)
+def test_predefined_ids(load_scenario, number):
+    ids = [f"rack_{i:03d}" for i in range(number)]
+    scenario = rack_scenario(load_scenario, ids)
+    model = scenario.model()
+    key_type = racks_field(model).key_field.type_
+    is_id_set = isinstance(key_type, type) and issubclass(key_type, IdSet)
+    assert is_id_set == (number > LITERAL_IDS_LIMIT)
+
+    data = scenario.mocker().dict()
+    assert sorted(data["DataHall"]["hall"]["Rack"]) == ids
+    model.parse_obj(data)
+
+    data["DataHall"]["hall"]["Rack"]["rack_999"] = data["DataHall"]["hall"]["Rack"][
+        ids[0]
+    ]
+    with pytest.raises(ValidationError) as e:
+        model.parse_obj(data)
+    assert [err["loc"][:4] for err in e.value.errors()] == [
+        ("DataHall", "hall", "Rack", "__key__")
+    ]
+
+
+def test_schema_of_many_ids(load_scenario):
+    ids = [f"rack_{i:03d}" for i in range(LITERAL_IDS_LIMIT + 1)]
+    schema = rack_scenario(load_scenario, ids).model().schema()
+    data_hall = next(
+        d for d in schema["definitions"].values() if "Rack" in d["properties"]
+    )
+    racks = data_hall["properties"]["Rack"]
+    (pattern,) = racks["patternProperties"]
+    assert all(re.fullmatch(pattern, i) for i in ids)
+    assert not re.fullmatch(pattern, "rack_999")
+    assert racks["additionalProperties"] is False
+
+
+def test_entity_config_applies(scenario):
+    # Entity models are created with Entity.Config, whose schema_extra removes the titles.
+    model = scenario.model()
+    assert "config" not in model.__fields__
+    schema = model.schema()
+    assert "title" not in schema
+    assert all("title" not in p for p in schema["properties"].values())
@@ -0,0 +1,101 @@
+import pytest
+
+from tiro.core.validate import Validator
+
+SERVER = "DataHall.data_hall_0.Rack.rack_0.Server.server_0"
+POWER = f"{SERVER}.Telemetry.ActivePower"
+TEMPERATURE = f"{SERVER}.Telemetry.CPUTemperature"
+
+
+@pytest.fixture
+def data(scenario) -> dict:
+    mocker = scenario.mocker()
+    return {path: mocker.gen_data_point(path) for path in mocker.list_data_points()}
+
+
+def validate(validator: Validator, data: dict) -> tuple[bool, list]:
+    for path, result in data.items():
+        validator.collect(path, result)
+    res = validator.validate()
+    errors = sorted(e["loc"] for e in res.exception.errors()) if res.exception else []
+    return res.valid, errors
+
+
+def invalid(data):
+    data[POWER] = dict(data[POWER], value="hot")
+
+
+def missing(data):
+    del data[TEMPERATURE]
+
+
+def unused(data):
+    data[f"{SERVER}.Telemetry.HeatLoad"] = dict(value="hot")
+
+
+def unexpected(data):
+    data["DataHall.data_hall_0.Unknown.unknown_0.Telemetry.ActivePower"] = dict(
+        value=1.0
+    )
+
+
+@pytest.mark.parametrize(
+    "change", [None, invalid, missing, unused, unexpected, (invalid, missing)]
+)
+def test_same_result_as_the_whole_tree(scenario, data, change):
+    for c in change if isinstance(change, tuple) else [change]:
+        if c is not None:
+            c(data)
+    expected = validate(scenario.validator(), data)
+    assert validate(scenario.validator(incremental=True), data) == expected
+
+
+def test_errors_of_the_data_points(scenario, data):
+    invalid(data)
+    missing(data)
+    valid, errors = validate(scenario.validator(incremental=True), data)
+    assert not valid
+    assert errors == sorted(
+        [
+            (*POWER.split("."), "value"),
+            tuple(TEMPERATURE.split(".")),
+        ]
+    )
+
+
+def test_latest_value_of_a_data_point_counts(scenario, data):
+    validator = scenario.validator(incremental=True)
+    validator.collect(POWER, dict(value="hot"))
+    assert validate(validator, data) == (True, [])
+    validator.collect(POWER, dict(value="hot"))
+    assert not validator.validate().valid
+
+
+def test_errors_are_reset_with_the_period(scenario, data):
+    with scenario.validator(incremental=True) as validator:
+        invalid(data)
+        assert not validate(validator, data)[0]
+        validator.reset_data()
+        data[POWER]["value"] = 1.0
+        assert validate(validator, data) == (True, [])
+
+
+def test_validate_path_only(scenario, data):
+    data[POWER] = 1.0
+    validator = scenario.validator(incremental=True, validate_path_only=True)
+    expected = validate(scenario.validator(validate_path_only=True), data)
+    assert not expected[0]
+    assert validate(validator, data) == expected
+
+
+def test_validate_dict_validates_the_whole_tree(scenario, data):
+    validator = scenario.validator(incremental=True)
+    invalid(data)
+    validate(validator, data)
+    assert validator.validate_dict({}).valid is False
+    assert validator.incremental
+
+
+def test_incremental_requires_a_scenario():
+    with pytest.raises(ValueError):
+        Validator(schema={}, incremental=True)
@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+
+from typer.testing import CliRunner
+
+from tiro.cli import SUBCOMMANDS, app
+
+# Dependencies that tiro.core and the tiro CLI must not import before they are needed.
+HEAVY_MODULES = (
+    "fastapi",
+    "uvicorn",
+    "pandas",
+    "numpy",
+    "faker",
+    "httpx",
+    "jsonschema",
+)
+
+# Budget of the cumulative import time of tiro.core and tiro.cli, generous enough for slow machines.
+IMPORT_BUDGET_MS = float(os.environ.get("TIRO_IMPORT_BUDGET_MS", 1000))
+
+
+def imported_modules(module: str) -> set[str]:
+    """Modules in sys.modules after importing the given module in a fresh interpreter"""
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys, {module}; print('\\n'.join(sys.modules))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return set(output.splitlines())
+
+
+def import_times(module: str) -> dict[str, float]:
+    """Cumulative import time (in milliseconds) of every module imported by the given module, by python -X importtime"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def test_import_time_is_within_budget():
+    for module in ("tiro.core", "tiro.cli"):
+        times = import_times(module)
+        assert times[module] < IMPORT_BUDGET_MS, f"{module} takes {times[module]} ms"
+        for heavy in HEAVY_MODULES:
+            assert heavy not in times, f"{module} imports {heavy}"
+
+
+def test_heavy_dependencies_are_lazy():
+    for module in ("tiro.core", "tiro.cli"):
+        imported = imported_modules(module)
+        for heavy in HEAVY_MODULES:
+            assert heavy not in imported, f"{module} imports {heavy}"
+
+
+def test_subcommands_are_imported_on_use():
+    imported = imported_modules("tiro.cli")
+    assert not {f"tiro.cli.{name}" for name in SUBCOMMANDS} & imported
+
+
+def test_subcommands_are_available():
+    runner = CliRunner()
+    for name in SUBCOMMANDS:
+        result = runner.invoke(app, [name, "--help"])
+        assert result.exit_code == 0, result.output
+    result = runner.invoke(app, ["mock", "serve", "--help"])
+    assert result.exit_code == 0
+    assert "SCENARIO_PATH" in result.output
+    assert runner.invoke(app, ["unknown"]).exit_code != 0
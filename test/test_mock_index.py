@@ -0,0 +1,52 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from tiro.core.mock import MockApp, Mocker
+
+PATH = "DataHall.data_hall_0.CRAC.crac_0.Telemetry.ActivePower"
+
+
+def test_data_point_is_found_on_a_fresh_mocker(scenario):
+    mocker = Mocker(scenario.root)
+    assert mocker.find_data_point(PATH) is not None
+    assert Mocker(scenario.root).gen_data_point(PATH)["value"] is not None
+
+
+def test_first_request_of_a_data_point_is_served(scenario):
+    client = TestClient(MockApp(Mocker(scenario.root)))
+    for _ in range(2):
+        r = client.get(f"/points/{PATH}")
+        assert r.status_code == 200
+        assert r.json()["value"] is not None
+
+
+def test_entities_and_data_points_are_indexed(scenario):
+    mocker = scenario.mocker()
+    index = mocker.index
+    assert set(mocker.list_entities()) == set(index.entities)
+    assert "DataHall.data_hall_1.Rack.rack_5" in index.entities
+    assert (
+        mocker.search_entity("rack_2")
+        is index.entities["DataHall.data_hall_0.Rack.rack_2"]
+    )
+    dp = mocker.find_data_point(PATH)
+    assert mocker.find_data_point(dp.path_id) is dp
+    assert mocker.find_data_point(PATH.split(".")) is dp
+    assert (
+        mocker.find_data_point("DataHall.data_hall_0.CRAC.crac_9.Telemetry.X") is None
+    )
+    with pytest.raises(KeyError):
+        mocker.gen_data_point("DataHall.data_hall_0.CRAC.crac_9.Telemetry.X")
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_data_points_of_a_regenerated_tree(scenario, vectorized):
+    mocker = Mocker(scenario.root, vectorized=vectorized)
+    old_paths = mocker.list_data_points()
+    assert mocker.gen_data_point(old_paths[0])["value"] is not None
+    mocker.dict(regenerate=True, include_data_points=False)
+    new_paths = mocker.list_data_points()
+    assert not set(old_paths) & set(new_paths)
+    for path in new_paths:
+        assert mocker.gen_data_point(path)["value"] is not None
+    assert mocker.find_data_point(old_paths[0]) is None
@@ -0,0 +1,27 @@
+def test_model_is_compiled_once(scenario):
+    model = scenario.model()
+    assert scenario.model() is model
+    assert scenario.model(hide_dp_values=True) is not model
+    assert scenario.model(hide_dp_values=True) is scenario.model(hide_dp_values=True)
+
+
+def test_requires_invalidates_ancestors(scenario):
+    model = scenario.model()
+    rack = scenario.root.children["DataHall"].children["Rack"]
+    rack_model = rack.model()
+    rack.requires("Server.HeatLoad")
+    assert rack.model() is not rack_model
+    assert scenario.model() is not model
+    assert "HeatLoad" in str(scenario.model().schema())
+
+
+def test_update_defaults_invalidates(scenario):
+    data_hall = scenario.root.child_info["DataHall"].cls
+    server = data_hall.child_info["Rack"].cls.child_info["Server"].cls
+    default = server.data_point_info["CPUTemperature"].default
+    model = scenario.model()
+    try:
+        server.update_defaults(CPUTemperature=42)
+        assert scenario.model() is not model
+    finally:
+        server.update_defaults(CPUTemperature=default)
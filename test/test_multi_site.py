@@ -0,0 +1,141 @@
+from datetime import timedelta
+from importlib import import_module
+
+import pytest
+import uvicorn
+import yaml
+from fastapi.testclient import TestClient
+from typer.testing import CliRunner
+
+from tiro.cli import app
+from tiro.core.multi_site import MultiSiteApp, load_sites, site_options
+from conftest import SCENARIO, USE, reference, scenario_yaml
+
+SERVER_DEFAULTS = """
+      $defaults:
+        CPUTemperature: 42
+"""
+
+
+SITES = {
+    "site-a": dict(scenario="scenario.yaml", uses=["use.yaml"], seed=1),
+    "site-b": dict(
+        scenario="scenario.yaml", uses=["use.yaml"], reference="reference.yaml"
+    ),
+}
+
+
+@pytest.fixture
+def write_sites(tmp_path):
+    # The scenario of the sites sets a default of the library class Server.
+    (tmp_path / "scenario.yaml").write_text(
+        scenario_yaml(
+            SCENARIO.replace("$type: Server\n", "$type: Server" + SERVER_DEFAULTS)
+        )
+    )
+    (tmp_path / "use.yaml").write_text(USE)
+    (tmp_path / "reference.yaml").write_text(yaml.safe_dump(reference()))
+
+    def write(sites: dict = SITES):
+        config = tmp_path / "sites.yaml"
+        config.write_text(yaml.safe_dump(sites))
+        return config
+
+    return write
+
+
+def server_info(scenario):
+    data_hall = scenario.root.child_info["DataHall"].cls
+    return data_hall.child_info["Rack"].cls.child_info["Server"].cls.data_point_info
+
+
+def test_sites_are_loaded(write_sites, tmp_path):
+    sites = load_sites(write_sites())
+    (a, a_options), (b, b_options) = sites["site-a"], sites["site-b"]
+    assert a_options == dict(seed=1)
+    assert b_options == dict(reference=tmp_path / "reference.yaml")
+    assert a.root.child_info["DataHall"].cls is b.root.child_info["DataHall"].cls
+
+
+def test_defaults_do_not_leak_into_the_library(write_sites, load_scenario):
+    sites = load_sites(write_sites())
+    assert server_info(sites["site-a"][0])["CPUTemperature"].default == 42
+    assert (
+        import_module("test_assets").Server.data_point_info["CPUTemperature"].default
+        is None
+    )
+    assert server_info(load_scenario(SCENARIO, USE))["CPUTemperature"].default is None
+
+
+def test_site_options():
+    defaults = dict(seed=None, tick=1.0)
+    assert site_options("a", dict(seed=1), defaults) == dict(seed=1, tick=1.0)
+    with pytest.raises(ValueError, match="Unknown options of site a: speed"):
+        site_options("a", dict(seed=1, speed=2), defaults)
+
+
+def test_sites_are_served(write_sites):
+    def create_app(site, scenario, options):
+        from tiro.core.mock_app import MockApp
+
+        options = site_options(site, options, dict(reference=None, seed=None))
+        mocker = scenario.mocker(**options)
+        mocker.build()
+        return MockApp(mocker)
+
+    client = TestClient(MultiSiteApp.from_config(write_sites(), create_app))
+    assert client.get("/sites").json() == ["site-a", "site-b"]
+    assert client.get("/site-a/points/").json()
+    value = client.get("/site-b/values/uuid_0_0").json()
+    assert 10 <= value <= 20
+    assert client.get("/site-c/points/").status_code == 404
+
+
+@pytest.fixture
+def served(monkeypatch):
+    apps = []
+    monkeypatch.setattr(uvicorn, "run", lambda app, **kwargs: apps.append(app))
+    return apps
+
+
+def test_mock_options_of_sites_are_applied(write_sites, served):
+    config = write_sites(
+        {
+            "site-a": dict(scenario="scenario.yaml", uses=["use.yaml"], seed=1),
+            "site-b": dict(scenario="scenario.yaml", uses=["use.yaml"], tick=0.5),
+        }
+    )
+    result = CliRunner().invoke(app, ["mock", "serve-sites", str(config)])
+    assert result.exit_code == 0, result.output
+    (sites,) = served
+    assert sites.sites["site-a"].mocker.seed == 1
+    assert sites.sites["site-a"].tick == 1.0
+    assert sites.sites["site-b"].mocker.seed is None
+    assert sites.sites["site-b"].tick == 0.5
+
+
+def test_validate_options_of_sites_are_applied(write_sites, served):
+    config = write_sites(
+        {
+            "site-a": dict(scenario="scenario.yaml", uses=["use.yaml"], retention=5),
+            "site-b": dict(scenario="scenario.yaml", uses=["use.yaml"]),
+        }
+    )
+    result = CliRunner().invoke(
+        app, ["validate", "serve-sites", str(config), "-r", "30"]
+    )
+    assert result.exit_code == 0, result.output
+    (sites,) = served
+    assert sites.sites["site-a"].validator.retention == timedelta(seconds=5)
+    assert sites.sites["site-b"].validator.retention == timedelta(seconds=30)
+
+
+@pytest.mark.parametrize("command", ["mock", "validate"])
+def test_unknown_options_of_sites_are_rejected(write_sites, served, command):
+    config = write_sites(
+        {"site-a": dict(scenario="scenario.yaml", uses=["use.yaml"], speed=2)}
+    )
+    result = CliRunner().invoke(app, [command, "serve-sites", str(config)])
+    assert result.exit_code == 2
+    assert "Unknown options of site site-a: speed" in result.output
+    assert not served
@@ -0,0 +1,63 @@
+import pytest
+
+from tiro.core.utils import compile_pattern, literal_prefix
+
+PATTERNS = [
+    "DataHall%CRAC%ActivePower",
+    "DataHall%Rack%%",
+    "DataHall%Rack%Server%(ActivePower|CPUTemperature)",
+    "%%Temperature",
+    "DataHall%RoomTemperature|DataHall%CRAC%%",
+    "DataHall%%Server%%",
+    "Unknown%%",
+]
+
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_match_agrees_with_scanning_all_paths(scenario, pattern):
+    root = scenario.root
+    expected = [
+        p for p in root.all_required_paths() if compile_pattern(pattern).fullmatch(p)
+    ]
+    # all_required_paths yields the data points of an entity in no particular order.
+    assert sorted(root.match_data_points(pattern)) == sorted(expected)
+
+
+@pytest.mark.parametrize(
+    "pattern, prefix",
+    [
+        ("DataHall%Rack%ActivePower", ["DataHall", "Rack", "ActivePower"]),
+        # "Rack%%" also matches "Racks.…", so Rack is not a literal component.
+        ("DataHall%Rack%%", ["DataHall"]),
+        ("DataHall%(Rack|CRAC)%ActivePower", ["DataHall"]),
+        ("%%Temperature", []),
+        ("DataHall%Rack|CRAC", []),
+        ("Data.*%Rack", []),
+    ],
+)
+def test_literal_prefix(pattern, prefix):
+    assert literal_prefix(pattern) == prefix
+
+
+def test_lookup_and_defaults(scenario):
+    root = scenario.root
+    node = root.path_index().lookup("DataHall.Rack.Server.CPUTemperature")
+    assert node.is_data_point and node.category == "Telemetry"
+    assert root.path_index().lookup("DataHall.Rack.Unknown") is None
+    assert (
+        root.query_data_point_info("DataHall.Rack.ActivePower")
+        is node.entity.parent.data_point_info["ActivePower"]
+    )
+    assert root.default_values("DataHall.Rack.ActivePower") == {}
+
+
+def test_index_is_rebuilt_after_requires(scenario):
+    root = scenario.root
+    index = root.path_index()
+    assert root.path_index() is index
+    assert not list(root.match_data_points("DataHall%Rack%Server%HeatLoad"))
+    root.requires("DataHall.Rack.Server.HeatLoad")
+    assert root.path_index() is not index
+    assert list(root.match_data_points("DataHall%Rack%Server%HeatLoad")) == [
+        "DataHall.Rack.Server.HeatLoad"
+    ]
@@ -0,0 +1,110 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from tiro.core.mock_app import MockApp
+from tiro.core.multi_site import MultiSiteApp
+from tiro.core.push import LATENCY_BUCKETS, LatencyHistogram, Pusher
+from tiro.core.validate_app import RestfulValidationApp
+
+
+class Source(FastAPI):
+    """Source without batches, serving paths that can change, and counting the requests in flight"""
+
+    def __init__(self, paths: list[str]):
+        super(Source, self).__init__()
+        self.paths: list[str] = paths
+        self.in_flight: int = 0
+        self.max_in_flight: int = 0
+
+        @self.get("/points/")
+        async def list_points():
+            return self.paths
+
+        @self.get("/points/{path}")
+        async def get_point(path: str):
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            return dict(value=1.0, timestamp="2022-09-01T12:00:00")
+
+
+class Result(BaseModel):
+    value: float
+    timestamp: str
+
+
+class Receiver(FastAPI):
+    """Receiver without batches, keeping the paths pushed"""
+
+    def __init__(self):
+        super(Receiver, self).__init__()
+        self.pushed: list[str] = []
+
+        @self.post("/points/{path}")
+        async def push_point(path: str, result: Result):
+            self.pushed.append(path)
+
+
+def pusher(source: FastAPI, receiver: FastAPI, **kwargs) -> Pusher:
+    app = MultiSiteApp(dict(source=source, receiver=receiver))
+    return Pusher(
+        "http://test/source",
+        "http://test/receiver",
+        transport=httpx.ASGITransport(app=app),
+        **kwargs,
+    )
+
+
+def test_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) is None
+    for latency in (0.0005, 0.003, 0.003, 10):
+        histogram.record(latency, 10)
+    histogram.record(0.003, 10, ok=False)
+    assert (histogram.requests, histogram.errors, histogram.points) == (5, 1, 40)
+    assert histogram.percentile(50) == 5
+    assert histogram.percentile(100) == float("inf")
+    assert sum(histogram.counts) == 5 and histogram.counts[-1] == 1
+    assert len(histogram.counts) == len(LATENCY_BUCKETS) + 1
+
+
+def test_requests_in_flight_are_bounded():
+    source, receiver = Source([f"p{i}" for i in range(40)]), Receiver()
+    p = pusher(source, receiver, concurrency=4, batch_size=20)
+    asyncio.run(p.run(cycles=1, live=False))
+    assert not p.source_batch and not p.receiver_batch
+    assert 1 < source.max_in_flight <= 4
+    assert sorted(receiver.pushed) == sorted(source.paths)
+    assert p.stats["fetch"].requests == p.stats["push"].requests == 40
+    assert p.stats["fetch"].errors == p.stats["push"].errors == 0
+
+
+def test_paths_are_listed_every_cycle():
+    source, receiver = Source(["p0", "p1"]), Receiver()
+    p = pusher(source, receiver, interval=0)
+
+    async def run():
+        running = asyncio.ensure_future(p.run(cycles=2, live=False))
+        while len(receiver.pushed) < 2:
+            await asyncio.sleep(0.001)
+        source.paths = ["p1", "p2"]
+        await running
+
+    asyncio.run(run())
+    assert sorted(receiver.pushed) == ["p0", "p1", "p1", "p2"]
+
+
+def test_batches_between_services(scenario):
+    mocker = scenario.mocker()
+    validator = scenario.validator(log=True)
+    p = pusher(MockApp(mocker), RestfulValidationApp(validator), batch_size=7)
+    asyncio.run(p.run(cycles=1, live=False))
+    assert p.source_batch and p.receiver_batch
+    points = len(mocker.list_data_points())
+    assert p.stats["fetch"].points == p.stats["push"].points == points
+    assert p.stats["fetch"].requests == -(-points // 7)
+    assert p.stats["push"].errors == 0
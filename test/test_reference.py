@@ -0,0 +1,50 @@
+from tiro.core.mock import Mocker, Reference
+from conftest import reference
+
+
+def test_lookup_tables():
+    ref = Reference(reference())
+    assert set(ref.get_children("DataHall")) == {"hall_0", "hall_1"}
+    assert set(ref.get_children(["DataHall", "hall_1", "Rack"])) == {
+        "rack_1_0",
+        "rack_1_1",
+    }
+    assert ref.get_children("DataHall.hall_9") == {}
+    assert ref.get_data_points("DataHall.hall_0.Rack.rack_0_1") == {"ActivePower": {}}
+    assert ref.range_of("DataHall.Rack.ActivePower") == (10, 20)
+    assert ref.range_of("DataHall.Rack.HeatLoad") is None
+    assert ref.get_value_range("DataHall.hall_0.Rack.rack_0_0", "ActivePower") == {
+        "min": 10,
+        "max": 20,
+    }
+
+
+def test_uuids_are_resolved():
+    ref = Reference(reference())
+    handle = ref.resolve_uuid("uuid_1_0")
+    assert handle.path == "DataHall.hall_1.Rack.rack_1_0.ActivePower"
+    assert handle.asset_path == "DataHall.hall_1.Rack.rack_1_0"
+    assert handle.name == "ActivePower"
+    assert handle.type_path == "DataHall.Rack.ActivePower"
+    assert ref.resolve_uuid("unknown") is None
+    assert ref.search_by_uuid("uuid_1_0") == handle.path
+
+
+def test_empty_reference():
+    ref = Reference()
+    assert ref.get_children("DataHall") is None
+    assert ref.get_data_points("DataHall") is None
+    assert ref.range_of("DataHall.Rack.ActivePower") is None
+    assert ref.list_uuids() == []
+
+
+def test_tree_follows_the_reference(scenario):
+    mocker = Mocker(scenario.root, reference=reference(halls=1, racks=3))
+    assert sorted(mocker.list_entities()) == [
+        "",
+        "DataHall.hall_0",
+        *(f"DataHall.hall_0.Rack.rack_0_{r}" for r in range(3)),
+    ]
+    values = dict(mocker.gen_values_by_uuids(mocker.list_uuids()))
+    assert list(values) == ["uuid_0_0", "uuid_0_1", "uuid_0_2"]
+    assert all(10 <= v["value"] <= 20 for v in values.values())
@@ -0,0 +1,84 @@
+from tiro.core.mock import TelemetryStream
+from tiro.core.registry import PathRegistry
+
+PATH = "DataHall.data_hall_0.Rack.rack_0.Telemetry.ActivePower"
+
+
+def test_register_and_lookup():
+    registry = PathRegistry()
+    path_id = registry.register(PATH)
+    assert registry.register(PATH) == path_id
+    assert registry.get_id(PATH) == path_id
+    assert registry.get_id(PATH.split(".")) == path_id
+    assert registry[path_id] == PATH
+    assert registry.parts(path_id) == tuple(PATH.split("."))
+    assert registry.get_id("DataHall.unknown") is None
+    assert "DataHall.unknown" not in registry
+
+
+def test_child_paths():
+    registry = PathRegistry()
+    rack = registry.child(
+        registry.child("", "DataHall", "data_hall_0"), "Rack", "rack_0"
+    )
+    assert registry[rack] == "DataHall.data_hall_0.Rack.rack_0"
+    assert registry.child(rack, "Telemetry", "ActivePower") == registry.get_id(PATH)
+
+
+def test_type_paths_and_tags():
+    registry = PathRegistry()
+    assert registry.is_data_point(PATH)
+    assert not registry.is_data_point("DataHall.data_hall_0")
+    assert registry.type_path(PATH) == "DataHall.Rack.ActivePower"
+    assert registry.type_path("DataHall.data_hall_0.Rack.rack_0") == "DataHall.Rack"
+    assert registry.tags(PATH) == dict(
+        path="DataHall.Rack.ActivePower",
+        asset_path=PATH,
+        DataHall="data_hall_0",
+        Rack="rack_0",
+        type="Telemetry",
+        field="ActivePower",
+    )
+
+
+def test_requested_paths_are_not_registered(scenario):
+    mocker = scenario.mocker()
+    paths = mocker.list_data_points()
+    size = len(mocker.registry)
+    unknown = [
+        f"DataHall.data_hall_0.Rack.rack_{i}.Telemetry.ActivePower"
+        for i in range(100, 110)
+    ]
+    stream = TelemetryStream(mocker, paths + unknown)
+    assert len(stream.paths) == len(paths)
+    results = dict(mocker.gen_data_points(unknown + [p.split(".") for p in paths]))
+    assert all(results[p] is None for p in unknown)
+    assert all(results[p] is not None for p in paths)
+    assert len(mocker.registry) == size
+
+
+def test_registry_does_not_grow_with_regenerations(scenario):
+    mocker = scenario.mocker()
+    sizes = set()
+    for _ in range(5):
+        mocker.dict(regenerate=True)
+        sizes.add(len(mocker.registry))
+        assert all(
+            mocker.registry[dp.path_id] == path
+            for path, dp in mocker.entity.list_data_points(skip_default=False)
+        )
+    assert len(sizes) == 1
+
+
+def test_unregistered_paths_are_not_registered(scenario):
+    registry = scenario.path_registry
+    size = len(registry)
+    registered = PathRegistry()
+    registered.register(PATH)
+    for path in (PATH, PATH.split("."), "DataHall.data_hall_0"):
+        assert registry.parts(path) == registered.parts(path)
+        assert registry.tags(path) == registered.tags(path)
+        assert registry.type_path(path) == registered.type_path(path)
+        assert registry.is_data_point(path) == registered.is_data_point(path)
+    assert PATH not in registry
+    assert len(registry) == size
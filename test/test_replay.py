@@ -0,0 +1,130 @@
+import json
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from tiro.core import Entity, Scenario
+from tiro.core.mock import MockApp, Mocker
+from tiro.core.model import Attribute
+from tiro.core.replay import Replay, read_recording
+from tiro.core.utils import parse_timestamp
+from conftest import reference
+
+PATH = "DataHall.hall_0.Rack.rack_0_0.Telemetry.ActivePower"
+
+
+def item(path: str, value, timestamp) -> dict:
+    return dict(path=path, result=dict(value=value, timestamp=timestamp))
+
+
+def test_parse_timestamp():
+    utc = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+    assert parse_timestamp("2024-01-01T12:00:00Z") == utc
+    assert parse_timestamp("2024-01-01T12:00:00") == utc
+    assert parse_timestamp("2024-01-01T14:00:00+02:00") == utc
+    assert parse_timestamp(datetime(2024, 1, 1, 12)) == utc
+    assert parse_timestamp(pd.Timestamp("2024-01-01T12:00:00Z")) == utc
+    assert parse_timestamp("2024-01-01T12:00:00Z").tzinfo == timezone.utc
+
+
+def test_records_are_replayed_along_their_timestamps():
+    replay = Replay(
+        [
+            item("a", 1, "2024-01-01T12:00:00Z"),
+            item("b", 2, "2024-01-01T12:00:05"),
+            item("a", 3, "2024-01-01T14:00:10+02:00"),
+        ],
+        speed=2,
+    )
+    assert replay.advance(wall_time=0) == 1
+    assert replay.get("a") == dict(value=1, timestamp="2024-01-01T12:00:00Z")
+    assert replay.get("b") is None
+    assert replay.advance(wall_time=2.5) == 1
+    assert replay.get("b")["value"] == 2
+    assert replay.advance(wall_time=4) == 0
+    assert replay.advance(wall_time=5) == 1
+    assert replay.get("a")["value"] == 3
+    assert replay.finished
+
+
+def test_named_items_are_resolved():
+    replay = Replay(
+        [dict(name="uuid_0_0", value=5, timestamp="2024-01-01T12:00:00Z")],
+        resolve={"uuid_0_0": PATH}.get,
+    )
+    replay.advance(wall_time=0)
+    assert replay.get(PATH) == dict(value=5, timestamp="2024-01-01T12:00:00Z")
+    with pytest.raises(ValueError, match="uuid_0_0 of the recording has no timestamp"):
+        Replay([dict(name="uuid_0_0", value=5)])
+    with pytest.raises(ValueError, match=f"{PATH} of the recording has no timestamp"):
+        Replay([dict(path=PATH, result=dict(value=5))])
+    with pytest.raises(ValueError):
+        Replay([], speed=0)
+
+
+def test_recordings(tmp_path):
+    items = [item(PATH, i, f"2024-01-01T12:00:0{i}Z") for i in range(3)]
+    ndjson = tmp_path / "recording.ndjson"
+    ndjson.write_text("\n".join(map(json.dumps, items)) + "\n")
+    assert list(read_recording(ndjson)) == items
+
+    rows = pd.DataFrame(
+        dict(
+            asset_path="DataHall.hall_0.Rack.rack_0_0",
+            type="Telemetry",
+            field="ActivePower",
+            value=range(3),
+            timestamp=[f"2024-01-01T12:00:0{i}Z" for i in range(3)],
+        )
+    )
+    csv = tmp_path / "recording.csv"
+    rows.to_csv(csv, index=False)
+    assert [(i["path"], i["result"]["value"]) for i in read_recording(csv)] == [
+        (PATH, i) for i in range(3)
+    ]
+    with pytest.raises(ValueError):
+        read_recording(tmp_path / "recording.txt")
+
+
+def test_mocker_serves_replayed_data_points(scenario, tmp_path):
+    recording = tmp_path / "recording.ndjson"
+    now = datetime.now(timezone.utc)
+    recording.write_text(
+        json.dumps(item(PATH, 42, now.isoformat().replace("+00:00", "Z"))) + "\n"
+    )
+    mocker = Mocker(scenario.root, reference=reference())
+    mocker.replay_recording(recording)
+    assert mocker.gen_data_point(PATH)["value"] == 42
+    other = PATH.replace("rack_0_0", "rack_0_1")
+    assert 10 <= mocker.gen_data_point(other)["value"] <= 20
+
+
+class Gauge(Entity):
+    Label: Attribute(str)
+
+
+def test_replayed_attributes_are_served(tmp_path):
+    scenario = Scenario(Gauge.many(1))
+    scenario.requires(yaml="- Gauge:\n  - Label\n")
+    recording = tmp_path / "recording.ndjson"
+    path = "Gauge.gauge_0.Attribute.Label"
+    recording.write_text(
+        json.dumps(item(path, "first", "2024-01-01T12:00:00Z"))
+        + "\n"
+        + json.dumps(item(path, "second", "2024-01-01T12:00:05Z"))
+        + "\n"
+    )
+    mocker = Mocker(scenario.root)
+    replay = mocker.replay_recording(recording)
+    client = TestClient(MockApp(mocker))
+
+    def label():
+        attributes = client.get("/attributes/").json()
+        return attributes["Gauge"]["gauge_0"]["Attribute"]["Label"]["value"]
+
+    assert label() == "first"
+    # The clock of the replay passes the second record.
+    replay.started -= 10
+    assert label() == "second"
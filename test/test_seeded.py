@@ -0,0 +1,130 @@
+import random
+from functools import partial
+
+import pytest
+from faker import Faker
+
+from tiro.core import Entity, Scenario, parallel
+from tiro.core.mock import Mocker
+from tiro.core.model import Attribute, Telemetry
+
+# Numbers of children drawn from a range, so that the structure of the tree depends on the seed.
+SCENARIO = """
+DataHall:
+  $number: 3
+  $type: DataHall
+  Rack:
+    $number: 1-6
+    $type: Rack
+    Server:
+      $number: 1-4
+      $type: Server
+"""
+
+USE = """
+- DataHall:
+  - Rack:
+    - ActivePower
+    - Server:
+      - CPUTemperature
+"""
+
+
+@pytest.fixture
+def seeded(load_scenario):
+    return load_scenario(SCENARIO, USE)
+
+
+def snapshot(mocker: Mocker) -> dict:
+    mocker.build()
+    return {path: dp.cur_value for path, dp in mocker.entity.list_data_points(False)}
+
+
+def test_same_seed_gives_the_same_tree(seeded):
+    first = snapshot(Mocker(seeded.root, seed=7))
+    assert snapshot(Mocker(seeded.root, seed=7)) == first
+    assert snapshot(Mocker(seeded.root, seed=8)) != first
+    assert all(0 <= v <= 150 for p, v in first.items() if p.endswith("CPUTemperature"))
+
+
+def test_seeding_is_local_to_the_tree(seeded):
+    random.seed(0)
+    expected = random.random()
+    random.seed(0)
+    first = snapshot(Mocker(seeded.root, seed=7))
+    assert random.random() == expected
+    # Draws elsewhere in the process do not change the tree.
+    random.seed(1)
+    assert snapshot(Mocker(seeded.root, seed=7)) == first
+
+
+def test_trees_do_not_interfere(seeded):
+    expected = snapshot(Mocker(seeded.root, seed=7))
+    a, b = Mocker(seeded.root, seed=7), Mocker(seeded.root, seed=8)
+    b.build()
+    assert snapshot(a) == expected
+    b.dict(regenerate=True)
+    assert set(a.list_entities()) == set(Mocker(seeded.root, seed=7).list_entities())
+
+
+def test_process_pool_gives_the_same_tree(seeded):
+    sequential = snapshot(Mocker(seeded.root, seed=7))
+    mocker = Mocker(seeded.root, seed=7, processes=2)
+    try:
+        assert mocker.pool is not None
+        assert snapshot(mocker) == sequential
+        # The pool started with the mocker is reused for regenerations.
+        pool = mocker.pool
+        mocker.build(regenerate=True)
+        assert mocker.pool is pool
+        assert len(snapshot(mocker)) > 0
+    finally:
+        mocker.close()
+    assert mocker.pool is None
+
+
+def test_unseeded_mocker_has_no_pool(seeded):
+    mocker = Mocker(seeded.root, processes=2)
+    assert mocker.pool is None and mocker.entity.random is None
+
+
+class Gauge(Entity):
+    # Fakers without known bounds, whose values are drawn by Faker
+    Reading: Telemetry(float, faker=partial(Faker().pyfloat, right_digits=3))
+    Label: Attribute(str, faker=Faker().name)
+
+
+@pytest.fixture
+def gauges():
+    scenario = Scenario(Gauge.many(3))
+    scenario.requires(yaml="- Gauge:\n  - Reading\n  - Label\n")
+    return scenario
+
+
+def values(data: dict) -> dict:
+    """Values of a tree generated by Mocker.dict, without the timestamps drawn relative to now"""
+    if "value" in data:
+        return data["value"]
+    return {k: values(v) for k, v in data.items() if isinstance(v, dict)}
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_values_of_fakers_are_seeded(gauges, vectorized):
+    def generate(seed):
+        return values(Mocker(gauges.root, seed=seed, vectorized=vectorized).dict())
+
+    first = generate(7)
+    assert first["Gauge"]["gauge_0"]["Attribute"]["Label"]
+    assert generate(7) == first
+    assert generate(8) != first
+
+
+def test_workers_do_not_register_every_generation(seeded):
+    mocker = Mocker(seeded.root, seed=7)
+    mocker.build()
+    parallel._init_worker(mocker.entity)
+    sizes = set()
+    for uuid in ("data_hall_0", "data_hall_1", "data_hall_0"):
+        parallel._generate_in_worker(("DataHall", uuid, 7, True, True))
+        sizes.add(len(mocker.entity.registry))
+    assert max(sizes) < len(mocker.registry)
@@ -0,0 +1,98 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from tiro.core.mock import MockApp, Mocker
+from tiro.core.utils import shard_of
+from conftest import reference
+
+SHARDS = 2
+URLS = [f"http://shard-{i}" for i in range(SHARDS)]
+
+
+@pytest.fixture
+def mockers(scenario) -> list[Mocker]:
+    ref = reference(halls=6)
+    return [
+        Mocker(scenario.root, reference=ref, seed=0, shard=i, shards=SHARDS)
+        for i in range(SHARDS)
+    ]
+
+
+def test_each_uuid_is_listed_by_one_shard(mockers):
+    listed = [m.list_uuids() for m in mockers]
+    assert all(listed)
+    assert not set(listed[0]) & set(listed[1])
+    assert sorted(listed[0] + listed[1]) == sorted(reference(halls=6)["uuid_map"])
+    for i, (mocker, uuids) in enumerate(zip(mockers, listed)):
+        assert all(mocker.shard_of(uuid) == i for uuid in uuids)
+        assert all(
+            result is not None for _, result in mocker.gen_values_by_uuids(uuids)
+        )
+
+
+def test_shards_split_the_tree(mockers):
+    paths = [m.list_data_points() for m in mockers]
+    assert all(paths) and not set(paths[0]) & set(paths[1])
+    unsharded = Mocker(mockers[0].entity.prototype, reference=reference(halls=6))
+    assert sorted(paths[0] + paths[1]) == sorted(unsharded.list_data_points())
+    for i, shard_paths in enumerate(paths):
+        assert all(shard_of(p, SHARDS) == i for p in shard_paths)
+
+
+def test_requests_are_redirected_to_their_shard(mockers):
+    clients = [TestClient(MockApp(m, shard_urls=URLS)) for m in mockers]
+    uuid = mockers[1].list_uuids()[0]
+    r = clients[0].get(f"/values/{uuid}", follow_redirects=False)
+    assert r.status_code == 307
+    assert r.headers["location"] == f"{URLS[1]}/values/{uuid}"
+    assert clients[1].get(f"/values/{uuid}").status_code == 200
+    path = mockers[0].list_data_points()[0]
+    r = clients[1].get(f"/points/{path}", follow_redirects=False)
+    assert r.headers["location"] == (f"{URLS[0]}/points/{path}")
+    assert clients[0].get("/shards").json() == dict(shard=0, shards=URLS)
+
+
+def test_sharded_mocker_requires_a_seed(scenario):
+    with pytest.raises(ValueError):
+        Mocker(scenario.root, shards=2)
+    with pytest.raises(ValueError):
+        Mocker(scenario.root, seed=0, shard=2, shards=2)
+
+
+# Numbers of children drawn from ranges, so that the structure of the tree depends on the draws.
+RANGED_SCENARIO = """
+DataHall:
+  $number: 6
+  $type: DataHall
+  Rack:
+    $number: 1-5
+    $type: Rack
+    Server:
+      $number: 1-4
+      $type: Server
+"""
+
+RANGED_USE = """
+- DataHall:
+  - Rack:
+    - ActivePower
+    - Server:
+      - CPUTemperature
+"""
+
+
+@pytest.mark.parametrize("seed, shards", [(1, 3), (3, 2)])
+def test_shards_generate_the_unsharded_tree(load_scenario, seed, shards):
+    root = load_scenario(RANGED_SCENARIO, RANGED_USE).root
+    unsharded = Mocker(root, seed=seed)
+    values = {p: dp.cur_value for p, dp in unsharded.build().list_data_points(False)}
+    entities, sharded_values = set(), {}
+    for i in range(shards):
+        mocker = Mocker(root, seed=seed, shard=i, shards=shards)
+        entities |= set(mocker.list_entities())
+        sharded_values |= {
+            p: dp.cur_value for p, dp in mocker.build().list_data_points(False)
+        }
+    # Paths hold the uuids, so both are the same in the shards and in the unsharded tree.
+    assert entities == set(unsharded.list_entities())
+    assert sharded_values == values
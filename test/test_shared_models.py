@@ -0,0 +1,94 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import scenario_yaml
+
+# The same asset type in two places, with the same and with different data points used.
+SCENARIO = """
+DataHall:
+  $number: 1
+  $type: DataHall
+  Rack:
+    $number: 2
+    $type: Rack
+    Server:
+      $number: 2
+      $type: Server
+  Server:
+    $number: 2
+    $type: Server
+"""
+
+SAME_USE = """
+- DataHall:
+  - Rack:
+    - Server:
+      - ActivePower
+  - Server:
+    - ActivePower
+"""
+
+DIFFERENT_USE = """
+- DataHall:
+  - Rack:
+    - Server:
+      - ActivePower
+  - Server:
+    - HeatLoad
+"""
+
+
+def servers(scenario):
+    data_hall = scenario.root.children["DataHall"]
+    return data_hall.children["Rack"].children["Server"], data_hall.children["Server"]
+
+
+def test_identical_subtrees_share_model(load_scenario):
+    in_rack, in_hall = servers(load_scenario(SCENARIO, SAME_USE))
+    assert in_rack.fingerprint() == in_hall.fingerprint()
+    assert in_rack.model() is in_hall.model()
+
+
+def test_different_subtrees_have_different_names(load_scenario):
+    in_rack, in_hall = servers(load_scenario(SCENARIO, DIFFERENT_USE))
+    assert in_rack.fingerprint() != in_hall.fingerprint()
+    assert in_rack.model().__name__ != in_hall.model().__name__
+
+
+def test_model_names_do_not_depend_on_compile_order(load_scenario):
+    first = load_scenario(SCENARIO, DIFFERENT_USE)
+    in_rack, in_hall = servers(first)
+    names = in_rack.model().__name__, in_hall.model().__name__
+    second = load_scenario(SCENARIO, DIFFERENT_USE)
+    in_rack, in_hall = servers(second)
+    assert (in_rack.model().__name__, in_hall.model().__name__) == names
+    assert first.model().schema() == second.model().schema()
+
+
+def test_schema_is_the_same_in_every_process():
+    code = (
+        "import json, sys\n"
+        "from tiro.core import Scenario\n"
+        "s = Scenario.from_yaml(sys.argv[1], sys.argv[2])\n"
+        "print(json.dumps(s.model().schema(), sort_keys=True))\n"
+    )
+    schemas = {
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                code,
+                scenario_yaml(SCENARIO),
+                DIFFERENT_USE,
+            ],
+            env=os.environ | dict(PYTHONHASHSEED=str(seed)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        for seed in (1, 2)
+    }
+    assert len(schemas) == 1
+    assert json.loads(schemas.pop())["definitions"]
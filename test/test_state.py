@@ -0,0 +1,65 @@
+from pathlib import Path
+
+import pytest
+
+from tiro.core import state as state_module
+from tiro.core.mock import Mocker
+
+
+def values(mocker: Mocker) -> dict:
+    return {path: dp.cur_value for path, dp in mocker.entity.list_data_points(True)}
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_state_is_restored(scenario, tmp_path, vectorized):
+    path = tmp_path / "state.bin"
+    mocker = Mocker(scenario.root, vectorized=vectorized)
+    data = mocker.dict()
+    mocker.save(path)
+    loaded = Mocker(scenario.root, vectorized=vectorized)
+    loaded.load(path)
+    assert loaded.list_entities() == mocker.list_entities()
+    if not vectorized:
+        assert values(loaded) == values(mocker)
+    assert loaded.dict().keys() == data.keys()
+    # Regenerating continues the uuid counters of the saved tree.
+    loaded.dict(regenerate=True)
+    assert "DataHall.data_hall_2" in loaded.list_entities()
+
+
+def test_gzipped_json_without_msgpack(scenario, tmp_path, monkeypatch):
+    monkeypatch.setattr(state_module, "find_spec", lambda name: None)
+    path = tmp_path / "state.json.gz"
+    mocker = Mocker(scenario.root)
+    mocker.dict()
+    mocker.save(path)
+    assert path.read_bytes().startswith(b"\x1f\x8b")
+    loaded = Mocker(scenario.root)
+    loaded.load(path)
+    assert values(loaded) == values(mocker)
+
+
+def test_failed_write_keeps_the_previous_state(scenario, tmp_path, monkeypatch):
+    path = tmp_path / "state.bin"
+    mocker = Mocker(scenario.root)
+    mocker.dict()
+    mocker.save(path)
+    saved = path.read_bytes()
+
+    def write_half(self: Path, data: bytes):
+        with self.open("wb") as f:
+            f.write(data[: len(data) // 2])
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(Path, "write_bytes", write_half)
+    mocker.dict(regenerate=True)
+    with pytest.raises(OSError):
+        mocker.save(path)
+    assert path.read_bytes() == saved
+
+
+def test_other_versions_are_rejected(scenario, tmp_path):
+    path = tmp_path / "state.bin"
+    state_module.write_state(dict(version=0), path)
+    with pytest.raises(ValueError):
+        Mocker(scenario.root).load(path)
@@ -0,0 +1,54 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from tiro.core.mock import MockApp, Mocker, TelemetryStream
+from conftest import reference
+
+PATTERN = "DataHall%Rack%ActivePower"
+
+
+def constant_reference() -> dict:
+    # A value range of a single value, so the values never change while the timestamps do.
+    return reference() | dict(
+        value_range={"DataHall.Rack.ActivePower": {"min": 15, "max": 15}}
+    )
+
+
+def test_poll_sends_changed_values(scenario):
+    mocker = Mocker(scenario.root)
+    paths = mocker.select_data_points(PATTERN)
+    stream = TelemetryStream(mocker, paths)
+    assert [item["path"] for item in stream.poll()] == paths
+    assert len(stream.poll()) == len(paths)
+
+
+def test_poll_skips_unchanged_values(scenario):
+    mocker = Mocker(scenario.root, reference=constant_reference())
+    stream = TelemetryStream(mocker, mocker.select_data_points(PATTERN))
+    first = stream.poll()
+    assert len(first) == 4
+    assert all(item["result"]["value"] == 15 for item in first)
+    assert stream.poll() == []
+
+
+def test_streamed_telemetry_is_sent_once_if_unchanged(scenario):
+    mocker = Mocker(scenario.root, reference=constant_reference())
+    client = TestClient(MockApp(mocker, tick=0.01))
+    r = client.get("/stream", params=dict(pattern=PATTERN, ticks=3))
+    assert r.headers["content-type"] == "application/x-ndjson"
+    items = [json.loads(line) for line in r.text.splitlines()]
+    assert sorted(item["path"] for item in items) == sorted(
+        mocker.select_data_points(PATTERN)
+    )
+
+
+def test_websocket_subscription(scenario):
+    client = TestClient(MockApp(Mocker(scenario.root), tick=0.01))
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json(dict(pattern=""))
+        assert "error" in ws.receive_json()
+        ws.send_json(dict(pattern=PATTERN))
+        items = ws.receive_json()
+        assert len(items) == 6
+        assert all(item["result"]["value"] is not None for item in items)
@@ -0,0 +1,118 @@
+import pytest
+
+from tiro.core.validate import Validator
+
+SERVER = "DataHall.data_hall_0.Rack.rack_0.Server.server_0"
+POWER = f"{SERVER}.Telemetry.ActivePower"
+TEMPERATURE = f"{SERVER}.Telemetry.CPUTemperature"
+
+
+@pytest.fixture
+def data(scenario) -> dict:
+    mocker = scenario.mocker()
+    return {path: mocker.gen_data_point(path) for path in mocker.list_data_points()}
+
+
+def validate(validator: Validator, data: dict) -> tuple[bool, list]:
+    """Validate the data as one period"""
+    validator.reset_data()
+    for path, result in data.items():
+        validator.collect(path, result)
+    res = validator.validate()
+    errors = sorted(e["loc"] for e in res.exception.errors()) if res.exception else []
+    return res.valid, errors
+
+
+def count_validated(validator: Validator, monkeypatch) -> list[str]:
+    """Record the names of the data points validated against their models"""
+    validated = []
+    data_point_error = validator._data_point_error
+
+    def record(entity, dp_name, value):
+        validated.append(dp_name)
+        return data_point_error(entity, dp_name, value)
+
+    monkeypatch.setattr(validator, "_data_point_error", record)
+    return validated
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_same_results_as_the_whole_tree_across_periods(scenario, data, incremental):
+    validator = scenario.validator(cache_subtrees=True, incremental=incremental)
+    periods = [
+        dict(data),
+        dict(data, **{POWER: dict(data[POWER], value="hot")}),
+        dict(data, **{POWER: dict(data[POWER], value="hot")}),
+        {k: v for k, v in data.items() if k != TEMPERATURE},
+        dict(data),
+    ]
+    for period in periods:
+        assert validate(validator, period) == validate(scenario.validator(), period)
+
+
+def test_unchanged_subtrees_are_not_validated_again(scenario, data, monkeypatch):
+    validator = scenario.validator(cache_subtrees=True)
+    validated = count_validated(validator, monkeypatch)
+    assert validate(validator, data) == (True, [])
+    assert len(validated) == len(data)
+
+    validated.clear()
+    assert validate(validator, data) == (True, [])
+    assert validated == []
+
+    validated.clear()
+    changed = dict(data, **{POWER: dict(data[POWER], value=1.0)})
+    assert validate(validator, changed) == (True, [])
+    # Only the data points on the dirty branch, of the rack and the server, are validated again.
+    assert sorted(validated) == ["ActivePower", "ActivePower", "CPUTemperature"]
+
+
+def test_errors_of_unchanged_subtrees_are_reused(scenario, data, monkeypatch):
+    validator = scenario.validator(cache_subtrees=True)
+    data[POWER] = dict(data[POWER], value="hot")
+    first = validate(validator, data)
+    assert first == (False, [(*POWER.split("."), "value")])
+    validated = count_validated(validator, monkeypatch)
+    assert validate(validator, data) == first
+    assert validated == []
+
+
+def test_missing_data_points_are_detected(scenario, data):
+    validator = scenario.validator(cache_subtrees=True)
+    assert validate(validator, data)[0]
+    del data[TEMPERATURE]
+    assert validate(validator, data) == (False, [tuple(TEMPERATURE.split("."))])
+
+
+def test_fixed_data_points_are_valid(scenario, data):
+    validator = scenario.validator(cache_subtrees=True)
+    assert not validate(validator, dict(data, **{POWER: dict(value="hot")}))[0]
+    assert validate(validator, data) == (True, [])
+
+
+def test_cache_requires_a_scenario():
+    with pytest.raises(ValueError):
+        Validator(schema={}, cache_subtrees=True)
+
+
+def test_paths_no_longer_collected_are_forgotten(scenario, data):
+    validator = scenario.validator(cache_subtrees=True)
+    rack = "DataHall.data_hall_0.Rack.rack_9"
+    extra = {f"{rack}.Telemetry.ActivePower": dict(value=1.0)}
+    validate(validator, dict(data, **extra))
+    assert set(extra) <= set(validator._validated)
+    assert tuple(rack.split(".")) in validator._subtrees
+
+    assert validate(validator, data) == validate(scenario.validator(), data)
+    assert set(validator._validated) == set(data)
+    assert tuple(rack.split(".")) not in validator._subtrees
+    assert validator._subtrees[()].validated_paths == frozenset(data)
+
+
+def test_changes_not_validated_are_reset(scenario, data):
+    validator = scenario.validator(cache_subtrees=True)
+    validate(validator, data)
+    validator.collect(POWER, dict(data[POWER], value="hot"))
+    validator.reset_data()
+    assert not validator._pending
+    assert validate(validator, data) == (True, [])
@@ -0,0 +1,49 @@
+from tiro.core.mock import Mocker
+
+PATH = "DataHall.data_hall_0.Rack.rack_0.Server.server_0.Telemetry.CPUTemperature"
+
+
+def leaves(data: dict, prefix=()):
+    for k, v in data.items():
+        if isinstance(v, dict) and "value" in v:
+            yield prefix + (k,), v
+        elif isinstance(v, dict):
+            yield from leaves(v, prefix + (k,))
+
+
+def test_vectorized_output_matches_the_model(scenario):
+    plain = Mocker(scenario.root).dict()
+    vectorized = Mocker(scenario.root, vectorized=True).dict()
+    assert [p for p, _ in leaves(vectorized)] == [p for p, _ in leaves(plain)]
+    scenario.model().parse_obj(vectorized)
+
+
+def test_values_are_within_bounds(scenario):
+    mocker = Mocker(scenario.root, vectorized=True)
+    for _ in range(10):
+        for path, leaf in leaves(mocker.dict()):
+            if path[-1] == "CPUTemperature":
+                assert 0 <= leaf["value"] <= 150
+            assert leaf["timestamp"]
+
+
+def test_seed_makes_values_reproducible(scenario):
+    def values(seed):
+        mocker = Mocker(scenario.root, vectorized=True, seed=seed)
+        return [[leaf["value"] for _, leaf in leaves(mocker.dict())] for _ in range(3)]
+
+    assert values(1) == values(1)
+    assert values(1) != values(2)
+
+
+def test_single_data_point_is_generated_by_the_engine(scenario):
+    mocker = Mocker(scenario.root, vectorized=True)
+    data = mocker.dict()
+    point = mocker.gen_data_point(PATH)
+    assert 0 <= point["value"] <= 150
+    assert (
+        point
+        != data["DataHall"]["data_hall_0"]["Rack"]["rack_0"]["Server"]["server_0"][
+            "Telemetry"
+        ]["CPUTemperature"]
+    )
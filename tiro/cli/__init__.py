@@ -1,13 +1,31 @@
-from typer import Typer
+from importlib import import_module
 
-from . import schema
-from . import mock
-from . import validate
-from . import draft
+import click
+import typer
+from typer.core import TyperGroup
 
-app = Typer()
+# Subcommands, each in its own module; a module is imported only when its subcommand is used.
+SUBCOMMANDS = ("schema", "mock", "validate", "draft")
 
-app.add_typer(schema.app, name="schema")
-app.add_typer(mock.app, name="mock")
-app.add_typer(validate.app, name="validate")
-app.add_typer(draft.app, name="draft")
+
+class LazyGroup(TyperGroup):
+    """Group that imports the module of a subcommand on first use"""
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return list(SUBCOMMANDS)
+
+    def get_command(self, ctx: click.Context, cmd_name: str):
+        if cmd_name not in SUBCOMMANDS:
+            return None
+        module = import_module(f"{__name__}.{cmd_name}")
+        command = typer.main.get_group(module.app)
+        command.name = cmd_name
+        return command
+
+
+app = typer.Typer(cls=LazyGroup)
+
+
+@app.callback()
+def main():
+    pass
@@ -8,8 +8,6 @@ import yaml
 
 from rich import print
 
-from tiro.core.draft import DraftGenerator
-
 app = typer.Typer()
 
 
@@ -19,6 +17,8 @@ def gen_schema(
     output: Optional[Path] = typer.Option(None, "--output", "-o"),
     asset_library: Optional[Path] = typer.Option(None, "--asset-library", "-l"),
 ):
+    from tiro.core.draft import DraftGenerator
+
     draft_gen = DraftGenerator(csv_file=csv_file)
     schema = draft_gen.schema
     if asset_library:
@@ -45,6 +45,8 @@ def gen_uses(
     csv_file: Path,
     output: Optional[Path] = typer.Option(None, "--output", "-o"),
 ):
+    from tiro.core.draft import DraftGenerator
+
     draft_gen = DraftGenerator(csv_file=csv_file)
     out = yaml.dump(draft_gen.uses)
     if output:
@@ -59,6 +61,8 @@ def gen_reference(
     csv_file: Path,
     output: Optional[Path] = typer.Option(None, "--output", "-o"),
 ):
+    from tiro.core.draft import DraftGenerator
+
     draft_gen = DraftGenerator(csv_file=csv_file)
     out = yaml.dump(draft_gen.reference)
     if output:
@@ -1,14 +1,12 @@
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
 
-import httpx
-import time
+import click
 import typer
-import uvicorn
 from rich import print
 
 from tiro.core import Scenario
-from tiro.core.mock import MockApp
 
 app = typer.Typer()
 
@@ -22,14 +20,187 @@ def mock(
     skip_defaults: Optional[bool] = typer.Option(True, "--skip-defaults", "-s"),
     use_defaults: Optional[bool] = typer.Option(True, "--use-defaults", "-u"),
     reference: Optional[Path] = typer.Option(None, "--reference", "-r"),
+    vectorized: bool = typer.Option(False, "--vectorized", "-v"),
+    seed: Optional[int] = typer.Option(None, "--seed"),
+    processes: Optional[int] = typer.Option(
+        None,
+        "--processes",
+        help="Processes generating the top-level subtrees in parallel, with --seed.",
+    ),
+    tick: float = typer.Option(
+        1.0, "--tick", help="Seconds between two pushes of the streaming endpoints."
+    ),
+    shards: int = typer.Option(
+        1,
+        "--shards",
+        help="Serve the tree from this many processes on consecutive ports, each with a share of the top-level subtrees.",
+    ),
+    state: Optional[Path] = typer.Option(
+        None,
+        "--state",
+        help="Load the mocked tree from this file if it exists, and save it there on shutdown.",
+    ),
+    replay: Optional[Path] = typer.Option(
+        None,
+        "--replay",
+        help="Serve the data points recorded in this NDJSON, CSV or Parquet file or directory with their original timestamps.",
+    ),
+    speed: float = typer.Option(
+        1.0, "--speed", help="How many times faster than recorded to replay."
+    ),
+    profile: Optional[Path] = typer.Option(
+        None,
+        "--profile",
+        help="YAML load profile of latency, dropped data points, stale timestamps, malformed responses and bursts to inject.",
+    ),
 ):
+    mocker_args = dict(
+        reference=reference, vectorized=vectorized, seed=seed, processes=processes
+    )
+    app_args = dict(skip_defaults=skip_defaults, use_defaults=use_defaults, tick=tick)
+    replay_args = dict(path=replay, speed=speed) if replay else None
+    if profile is not None:
+        from tiro.core.faults import LoadProfile
+
+        app_args["profile"] = LoadProfile.from_yaml(profile)
+    if shards <= 1:
+        _serve(
+            scenario_path, uses, host, port, mocker_args, app_args, state, replay_args
+        )
+        return
+
+    from multiprocessing import Process
+
+    # All shards must generate the same tree.
+    mocker_args |= dict(seed=seed or 0, shards=shards)
+    app_args |= dict(shard_urls=[f"http://{host}:{port + i}" for i in range(shards)])
+    workers = [
+        Process(
+            target=_serve,
+            args=(
+                scenario_path,
+                uses,
+                host,
+                port + i,
+                mocker_args | dict(shard=i),
+                app_args,
+                # One state file per shard
+                state.with_name(f"{state.stem}-{i}{state.suffix}") if state else None,
+                replay_args,
+            ),
+        )
+        for i in range(shards)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def _serve(
+    scenario_path: Path,
+    uses: list[Path],
+    host: str,
+    port: int,
+    mocker_args: dict,
+    app_args: dict,
+    state: Optional[Path] = None,
+    replay_args: Optional[dict] = None,
+):
+    import uvicorn
+    from tiro.core.mock_app import MockApp
+
     scenario = Scenario.from_yaml(scenario_path, *uses)
-    mock_app = MockApp(
-        scenario.mocker(reference=reference),
-        skip_defaults=skip_defaults,
-        use_defaults=use_defaults,
+    mocker = scenario.mocker(**mocker_args)
+    if state is not None and state.exists():
+        mocker.load(state)
+    else:
+        mocker.build()
+    if replay_args is not None:
+        mocker.replay_recording(**replay_args)
+    try:
+        uvicorn.run(MockApp(mocker, **app_args), host=host, port=port)
+    finally:
+        mocker.close()
+    if state is not None:
+        mocker.save(state)
+
+
+@app.command("serve-sites")
+def serve_sites(
+    config: Path,
+    host: Optional[str] = typer.Option("127.0.0.1", "--host", "-h"),
+    port: Optional[int] = typer.Option(8000, "--port", "-p"),
+    skip_defaults: Optional[bool] = typer.Option(True, "--skip-defaults", "-s"),
+    use_defaults: Optional[bool] = typer.Option(True, "--use-defaults", "-u"),
+    vectorized: bool = typer.Option(False, "--vectorized", "-v"),
+    tick: float = typer.Option(
+        1.0, "--tick", help="Seconds between two pushes of the streaming endpoints."
+    ),
+):
+    """
+    Serve the scenarios of many sites in one process, each under /{site}, as configured in a YAML file.
+    The reference, seed, processes, vectorized, skip_defaults, use_defaults and tick of a site in the file
+    override the options.
+    """
+    import uvicorn
+    from tiro.core.mock_app import MockApp
+    from tiro.core.multi_site import MultiSiteApp, site_options
+
+    # Options of every site in the config override these.
+    mocker_args = dict(reference=None, vectorized=vectorized, seed=None, processes=None)
+    app_args = dict(skip_defaults=skip_defaults, use_defaults=use_defaults, tick=tick)
+
+    def create_app(site: str, scenario: Scenario, options: dict) -> MockApp:
+        try:
+            options = site_options(site, options, mocker_args | app_args)
+        except ValueError as e:
+            raise typer.BadParameter(str(e), param_hint="config")
+        mocker = scenario.mocker(**{k: options[k] for k in mocker_args})
+        mocker.build()
+        return MockApp(mocker, **{k: options[k] for k in app_args})
+
+    sites = MultiSiteApp.from_config(config, create_app)
+    try:
+        uvicorn.run(sites, host=host, port=port)
+    finally:
+        for site in sites.sites.values():
+            site.mocker.close()
+
+
+@app.command("backfill")
+def backfill(
+    scenario_path: Path,
+    uses: list[Path],
+    output: Path = typer.Option(..., "--output", "-o"),
+    start: datetime = typer.Option(..., "--start"),
+    stop: Optional[datetime] = typer.Option(None, "--stop"),
+    step: float = typer.Option(60, "--step", help="Seconds between two samples."),
+    format: str = typer.Option(
+        "parquet",
+        "--format",
+        "-f",
+        click_type=click.Choice(["parquet", "csv", "influx"]),
+    ),
+    chunk_size: int = typer.Option(100_000, "--chunk-size"),
+    skip_defaults: Optional[bool] = typer.Option(True, "--skip-defaults", "-s"),
+    reference: Optional[Path] = typer.Option(None, "--reference", "-r"),
+    seed: Optional[int] = typer.Option(None, "--seed"),
+):
+    """Generate historical data between start and stop into partitioned Parquet or CSV files, or line protocol."""
+    from tiro.core.history import write_history
+
+    scenario = Scenario.from_yaml(scenario_path, *uses)
+    mocker = scenario.mocker(reference=reference, vectorized=True, seed=seed)
+    frames = mocker.generate_history(
+        start,
+        stop or datetime.now(),
+        timedelta(seconds=step),
+        chunk_size=chunk_size,
+        skip_default=skip_defaults,
     )
-    uvicorn.run(mock_app, host=host, port=port)
+    rows = write_history(frames, output, format=format)
+    print(f"Wrote {rows} rows to {output}")
 
 
 @app.command("push")
@@ -39,14 +210,32 @@ def push(
     data_address: str = typer.Option("127.0.0.1:8000", "--data-addr", "-d"),
     receiver_ssl: bool = typer.Option(False, "-receiver-ssl", "-e"),
     receiver_address: str = typer.Option("127.0.0.1:8001", "--recv-addr", "-r"),
+    concurrency: int = typer.Option(
+        16, "--concurrency", "-c", help="Requests in flight at the same time."
+    ),
+    rate: Optional[float] = typer.Option(
+        None, "--rate", help="Target data points per second, unlimited by default."
+    ),
+    batch_size: int = typer.Option(
+        100, "--batch-size", "-b", help="Data points fetched and pushed together."
+    ),
+    cycles: Optional[int] = typer.Option(
+        None, "--cycles", help="Stop after pushing all data points this many times."
+    ),
 ):
-    while True:
-        data_url = f"http{'s' if data_ssl else ''}://{data_address}"
-        receiver_url = f"http{'s' if receiver_ssl else ''}://{receiver_address}"
-        r = httpx.get(f"{data_url}/points/")
-        print(r)
-        for path in r.json():
-            r = httpx.get(f"{data_url}/points/{path}")
-            print(f"Forwarding {path}")
-            r = httpx.post(f"{receiver_url}/points/{path}", json=r.json())
-        time.sleep(collect_interval)
+    """Fetch all data points from a mocking service and push them to a receiver, every collect interval."""
+    import asyncio
+    from tiro.core.push import Pusher
+
+    pusher = Pusher(
+        f"http{'s' if data_ssl else ''}://{data_address}",
+        f"http{'s' if receiver_ssl else ''}://{receiver_address}",
+        concurrency=concurrency,
+        rate=rate,
+        batch_size=batch_size,
+        interval=collect_interval,
+    )
+    try:
+        asyncio.run(pusher.run(cycles=cycles))
+    except KeyboardInterrupt:
+        pass
@@ -3,10 +3,8 @@ from pathlib import Path
 from rich import print
 
 import typer
-import uvicorn
 
 from tiro.core import Scenario
-from tiro.core.validate import RestfulValidationApp
 
 app = typer.Typer()
 
@@ -19,15 +17,84 @@ def serve(
     port: int = typer.Option(8001, "--port", "-p"),
     log_size: int = typer.Option(10, "--log-size", "-l"),
     retention: int = typer.Option(60, "--retention", "-r"),
+    incremental: bool = typer.Option(
+        False,
+        "--incremental",
+        "-i",
+        help="Validate every data point when collected, instead of the whole tree at the end of the retention.",
+    ),
+    cache_subtrees: bool = typer.Option(
+        False,
+        "--cache-subtrees",
+        "-c",
+        help="Only re-validate the subtrees whose data points changed since their last validation.",
+    ),
 ):
+    import uvicorn
+    from tiro.core.validate_app import RestfulValidationApp
+
     print(f"[green]CONF[/green]:     Retention: {retention}")
     print(f"[green]CONF[/green]:     Log Size: {log_size}")
     scenario = Scenario.from_yaml(scenario_path, *uses)
-    validator = scenario.validator(retention=retention, log=True, log_size=log_size)
+    validator = scenario.validator(
+        retention=retention,
+        log=True,
+        log_size=log_size,
+        incremental=incremental,
+        cache_subtrees=cache_subtrees,
+    )
     validate_app = RestfulValidationApp(validator)
     uvicorn.run(validate_app, host=host, port=port)
 
 
+@app.command("serve-sites")
+def serve_sites(
+    config: Path,
+    host: str = typer.Option("127.0.0.1", "--host", "-h"),
+    port: int = typer.Option(8001, "--port", "-p"),
+    log_size: int = typer.Option(10, "--log-size", "-l"),
+    retention: int = typer.Option(60, "--retention", "-r"),
+    incremental: bool = typer.Option(
+        False,
+        "--incremental",
+        "-i",
+        help="Validate every data point when collected, instead of the whole tree at the end of the retention.",
+    ),
+    cache_subtrees: bool = typer.Option(
+        False,
+        "--cache-subtrees",
+        "-c",
+        help="Only re-validate the subtrees whose data points changed since their last validation.",
+    ),
+):
+    """
+    Validate the scenarios of many sites in one process, each under /{site}, as configured in a YAML file.
+    The retention, log_size, incremental and cache_subtrees of a site in the file override the options.
+    """
+    import uvicorn
+    from tiro.core.multi_site import MultiSiteApp, site_options
+    from tiro.core.validate_app import RestfulValidationApp
+
+    # Options of every site in the config override these.
+    defaults = dict(
+        retention=retention,
+        log_size=log_size,
+        incremental=incremental,
+        cache_subtrees=cache_subtrees,
+    )
+
+    def create_app(site: str, scenario: Scenario, options: dict):
+        try:
+            options = site_options(site, options, defaults)
+        except ValueError as e:
+            raise typer.BadParameter(str(e), param_hint="config")
+        return RestfulValidationApp(scenario.validator(log=True, **options))
+
+    print(f"[green]CONF[/green]:     Retention: {retention}")
+    print(f"[green]CONF[/green]:     Log Size: {log_size}")
+    uvicorn.run(MultiSiteApp.from_config(config, create_app), host=host, port=port)
+
+
 @app.command("test")
 def test(scenario_path: Path, uses: list[Path], input: Path):
     scenario = Scenario.from_yaml(scenario_path, *uses)
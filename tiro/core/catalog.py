@@ -0,0 +1,79 @@
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from .utils import DataPointTypes
+
+if TYPE_CHECKING:
+    from .model import Entity
+
+STRING_COLUMNS = (
+    "path",
+    "name",
+    "entity_type",
+    "category",
+    "type",
+    "unit",
+    "default_text",
+)
+FLOAT_COLUMNS = ("default", "ge", "le", "gt", "lt")
+
+
+def _type_name(dp_type) -> str:
+    for base in DataPointTypes:
+        if isinstance(dp_type, type) and issubclass(dp_type, base):
+            return base.__name__
+    return getattr(dp_type, "__name__", str(dp_type))
+
+
+def _as_float(value) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return np.nan
+
+
+def compile_catalog(entity: "Entity") -> np.ndarray:
+    """
+    Compile all required data points in the tree into a structured array, one row per data point.
+    Missing numbers (defaults or constraint bounds) are NaN and missing strings are empty.
+    """
+    rows = []
+    for node in entity.path_index().root.data_point_nodes():
+        info = node.info
+        default = info.default
+        rows.append(
+            dict(
+                path=node.path,
+                name=node.name,
+                entity_type=node.entity.type_name,
+                category=node.category,
+                type=_type_name(info.type),
+                unit=info.unit or "",
+                default_text="" if default is None else str(default),
+                default=_as_float(default),
+                ge=_as_float(getattr(info.type, "ge", None)),
+                le=_as_float(getattr(info.type, "le", None)),
+                gt=_as_float(getattr(info.type, "gt", None)),
+                lt=_as_float(getattr(info.type, "lt", None)),
+            )
+        )
+    dtype = [
+        (k, f"U{max([len(row[k]) for row in rows] + [1])}") for k in STRING_COLUMNS
+    ] + [(k, "f8") for k in FLOAT_COLUMNS]
+    return np.array(
+        [tuple(row[k] for k, _ in dtype) for row in rows], dtype=np.dtype(dtype)
+    )
+
+
+def save_catalog(catalog: np.ndarray, path: Path) -> None:
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("wb") as f:
+        np.save(f, catalog)
+    os.replace(tmp_path, path)
+
+
+def load_catalog(path: Path) -> np.ndarray:
+    """Memory-map a saved catalog, so that it is only paged in when accessed."""
+    return np.load(path, mmap_mode="r")
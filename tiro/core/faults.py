@@ -0,0 +1,126 @@
+import random
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+import yaml
+from pydantic import BaseModel
+
+from .utils import parse_isoformat
+
+
+class Latency(BaseModel):
+    """Normal distribution of the latency (in seconds) of responses, capped by max"""
+
+    mean: float = 0.0
+    std: float = 0.0
+    max: Optional[float] = None
+
+
+class Burst(BaseModel):
+    """Bursts of duration seconds every period seconds, in which streams push factor times as often"""
+
+    period: float
+    duration: float
+    factor: float = 10.0
+
+
+class LoadProfile(BaseModel):
+    """
+    Faults of field gateways under stress, injected by a MockApp and its mocker:
+    - latency: latency of the endpoints starting with a path, e.g. /points, or of all endpoints by "default"
+    - drop_rate: probability that a data point is missing from a response
+    - stale_rate: probability that a data point is served with a stale timestamp, moved back by 1 to stale_factor
+      times its time_var (or seconds if the time_var is 0)
+    - malformed_rate: probability that a response body is truncated into malformed JSON
+    - burst: bursts of the update rate of the streaming endpoints
+    The same seed and the same sequence of requests always inject the same faults.
+    """
+
+    seed: Optional[int] = None
+    latency: dict[str, Latency] = {}
+    drop_rate: float = 0.0
+    stale_rate: float = 0.0
+    stale_factor: float = 10.0
+    malformed_rate: float = 0.0
+    burst: Optional[Burst] = None
+
+    @classmethod
+    def from_yaml(cls, path: Path) -> "LoadProfile":
+        return cls.parse_obj(yaml.safe_load(path.open()) or {})
+
+
+class FaultInjector:
+    """Draws the faults of a load profile, with a separate random generator for every kind of fault"""
+
+    def __init__(self, profile: LoadProfile):
+        self.profile: LoadProfile = profile
+        self.rngs: dict[str, random.Random] = {
+            kind: random.Random(
+                f"{profile.seed}:{kind}" if profile.seed is not None else None
+            )
+            for kind in ("latency", "drop", "stale", "malformed")
+        }
+        # Longest prefixes first, so that the most specific latency applies
+        self.latency_prefixes: list[str] = sorted(
+            (k for k in profile.latency if k != "default"), key=len, reverse=True
+        )
+
+    def latency(self, endpoint: str) -> float:
+        """Latency (in seconds) of a response of the endpoint at path"""
+        latency = next(
+            (
+                self.profile.latency[k]
+                for k in self.latency_prefixes
+                if endpoint.startswith(k)
+            ),
+            self.profile.latency.get("default"),
+        )
+        if latency is None or (latency.mean <= 0 and latency.std <= 0):
+            return 0.0
+        delay = max(0.0, self.rngs["latency"].gauss(latency.mean, latency.std))
+        return min(delay, latency.max) if latency.max is not None else delay
+
+    def drops(self) -> bool:
+        """Whether a data point is missing from a response"""
+        return (
+            self.profile.drop_rate > 0
+            and self.rngs["drop"].random() < self.profile.drop_rate
+        )
+
+    def stale(self, result: dict, time_var: timedelta) -> dict:
+        """The result of a data point, with a timestamp made stale at the stale rate"""
+        if not (
+            self.profile.stale_rate > 0
+            and self.rngs["stale"].random() < self.profile.stale_rate
+        ):
+            return result
+        timestamp = result.get("timestamp")
+        if not isinstance(timestamp, str):
+            return result
+        time_var = max(time_var, timedelta(seconds=1))
+        age = time_var * self.rngs["stale"].uniform(1, self.profile.stale_factor)
+        stale = parse_isoformat(timestamp) - age
+        return result | dict(timestamp=stale.isoformat())
+
+    def malforms(self) -> bool:
+        """Whether a response is malformed"""
+        return (
+            self.profile.malformed_rate > 0
+            and self.rngs["malformed"].random() < self.profile.malformed_rate
+        )
+
+    def malformed(self, content: bytes) -> bytes:
+        """The content of a response truncated at random"""
+        return (
+            content[: self.rngs["malformed"].randrange(len(content))]
+            if content
+            else content
+        )
+
+    def interval(self, interval: float, now: float) -> float:
+        """Interval between two pushes of a stream at time now (in seconds)"""
+        burst = self.profile.burst
+        if burst is not None and now % burst.period < burst.duration:
+            return interval / burst.factor
+        return interval
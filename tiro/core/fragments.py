@@ -0,0 +1,86 @@
+import json
+from typing import Callable
+
+from .mock import MockedEntity
+from .model import DataPointInfo
+from .utils import camel_to_snake
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Values of a category of data points in an entity: (entity, category, skip_default) -> {name: value}
+CategoryValues = Callable[[MockedEntity, str, bool], dict]
+
+
+def dumps(obj) -> bytes:
+    """Encode obj as compact JSON, with orjson if it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # orjson rejects what the json module may still encode, e.g. integers beyond 64 bits.
+            pass
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def data_point_values(entity: MockedEntity, category: str, skip_default: bool) -> dict:
+    """Current values of a category of data points in an entity, in the same form as MockedEntity.dict"""
+    return {
+        k: v.dict()
+        for k, v in getattr(entity, category).items()
+        if not skip_default or v.prototype.default is None
+    }
+
+
+def encode_tree(
+    entity: MockedEntity, values: CategoryValues, skip_default: bool = True
+) -> bytes:
+    """
+    Encode the tree of entity as JSON, in the same form as MockedEntity.dict with data points.
+
+    Each entity caches the encoded fragments of its subtree and of its categories of data points,
+    along with the epoch in which they were encoded. Only the fragments of entities marked changed
+    in or after that epoch (see MockedEntity.mark_changed) are encoded again, and the others are reused.
+    """
+    MockedEntity.epoch += 1
+    categories = [camel_to_snake(t.__name__) for t in DataPointInfo.SUB_CLASSES]
+    return _encode(entity, values, skip_default, categories) or b"{}"
+
+
+def _encode(
+    entity: MockedEntity,
+    values: CategoryValues,
+    skip_default: bool,
+    categories: list[str],
+) -> bytes:
+    epoch = MockedEntity.epoch
+    cached = entity.fragments.get(skip_default)
+    if cached is not None and cached[0] > entity.changed_at:
+        return cached[1]
+
+    parts = []
+    for k, v in entity.children.items():
+        items = []
+        for uuid, c in v.items():
+            fragment = _encode(c, values, skip_default, categories)
+            if fragment:
+                items.append(dumps(uuid) + b":" + fragment)
+        if items:
+            parts.append(dumps(k) + b":{" + b",".join(items) + b"}")
+    for category in categories:
+        if not getattr(entity, category):
+            continue
+        key = category, skip_default
+        cached = entity.fragments.get(key)
+        if cached is None or cached[0] <= entity.category_changed_at.get(category, -1):
+            _values = values(entity, category, skip_default)
+            fragment = dumps(category) + b":" + dumps(_values) if _values else b""
+            cached = entity.fragments[key] = epoch, fragment
+        if cached[1]:
+            parts.append(cached[1])
+
+    fragment = b"{" + b",".join(parts) + b"}" if parts else b""
+    entity.fragments[skip_default] = epoch, fragment
+    return fragment
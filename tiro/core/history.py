@@ -0,0 +1,117 @@
+import json
+import math
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Iterable, Literal, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+HistoryFormat = Literal["parquet", "csv", "influx"]
+
+# Columns of history frames which are not tags in the InfluxDB line protocol.
+NON_TAG_COLUMNS = ("field", "value", "timestamp", "date")
+
+
+def _with_date(frame: "pd.DataFrame") -> "pd.DataFrame":
+    return frame.assign(date=frame.timestamp.dt.strftime("%Y-%m-%d"))
+
+
+def write_parquet(frames: Iterable["pd.DataFrame"], directory: Path) -> int:
+    """Write frames into a Parquet dataset in directory, partitioned by date. Return the number of rows written."""
+    if find_spec("pyarrow") is None:
+        raise RuntimeError("Writing Parquet files requires pyarrow.")
+    directory.mkdir(parents=True, exist_ok=True)
+    rows = 0
+    for frame in frames:
+        _with_date(frame).to_parquet(directory, partition_cols=["date"], index=False)
+        rows += len(frame)
+    return rows
+
+
+def write_csv(frames: Iterable["pd.DataFrame"], directory: Path) -> int:
+    """Append frames to one CSV file per date in directory. Return the number of rows written."""
+    directory.mkdir(parents=True, exist_ok=True)
+    rows = 0
+    for frame in frames:
+        for date, df in _with_date(frame).groupby("date"):
+            file = directory / f"{date}.csv"
+            df.drop(columns="date").to_csv(
+                file, mode="a", header=not file.exists(), index=False
+            )
+        rows += len(frame)
+    return rows
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(",", r"\,")
+        .replace("=", r"\=")
+        .replace(" ", r"\ ")
+    )
+
+
+def _field_value(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return f"{value}i"
+    if isinstance(value, float):
+        return repr(value)
+    if not isinstance(value, str):
+        value = json.dumps(value)
+    return '"' + value.replace("\\", "\\\\").replace('"', r"\"") + '"'
+
+
+def to_line_protocol(
+    frame: "pd.DataFrame", measurement: str = "tiro_telemetry"
+) -> Iterable[str]:
+    """
+    Encode rows of a history frame as InfluxDB line protocol, in the same layout as the karez
+    influx_line_protocol converter: the field name is taken from the field column and all other columns are tags.
+    """
+    tag_columns = [c for c in frame.columns if c not in NON_TAG_COLUMNS]
+    measurement = _escape(measurement)
+    timestamps = frame.timestamp.values.astype("int64").tolist()
+    tags = frame[tag_columns].to_dict(orient="records")
+    for row_tags, field, value, timestamp in zip(
+        tags, frame.field.tolist(), frame.value.tolist(), timestamps
+    ):
+        if value is None or isinstance(value, float) and math.isnan(value):
+            continue
+        tag_str = "".join(
+            f",{_escape(k)}={_escape(str(v))}"
+            for k, v in row_tags.items()
+            if isinstance(v, str) and v
+        )
+        yield f"{measurement}{tag_str} {_escape(field)}={_field_value(value)} {timestamp}"
+
+
+def write_line_protocol(
+    frames: Iterable["pd.DataFrame"], file: Path, measurement: str = "tiro_telemetry"
+) -> int:
+    """Write frames into file as InfluxDB line protocol. Return the number of rows written."""
+    file.parent.mkdir(parents=True, exist_ok=True)
+    rows = 0
+    with file.open("w") as f:
+        for frame in frames:
+            # Rows without a value are skipped, so only the lines written are counted.
+            for line in to_line_protocol(frame, measurement):
+                f.write(line)
+                f.write("\n")
+                rows += 1
+    return rows
+
+
+def write_history(
+    frames: Iterable["pd.DataFrame"], output: Path, format: HistoryFormat = "parquet"
+) -> int:
+    """Write history frames generated by Mocker.generate_history into output. Return the number of rows written."""
+    if format == "parquet":
+        return write_parquet(frames, output)
+    elif format == "csv":
+        return write_csv(frames, output)
+    elif format == "influx":
+        return write_line_protocol(frames, output)
+    raise ValueError(f"Unknown history format {format}")
@@ -0,0 +1,95 @@
+from typing import Optional, Generator, TYPE_CHECKING
+
+from .utils import split_path, concat_path, compile_pattern, literal_prefix
+
+if TYPE_CHECKING:
+    from .model import Entity, DataPointInfo
+
+
+class PathNode:
+    """A node in the path index, representing either an entity or a data point."""
+
+    __slots__ = ("name", "path", "entity", "info", "children")
+
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        entity: "Entity",
+        info: Optional["DataPointInfo"] = None,
+    ):
+        self.name = name
+        self.path = path
+        # For a data point, the entity owning it.
+        self.entity = entity
+        self.info = info
+        self.children: dict[str, PathNode] = {}
+
+    @property
+    def is_data_point(self) -> bool:
+        return self.info is not None
+
+    @property
+    def category(self) -> Optional[str]:
+        if self.info is not None:
+            return self.info.__class__.__name__
+
+    @property
+    def default(self):
+        if self.info is not None:
+            return self.info.default
+
+    def data_point_nodes(self) -> Generator["PathNode", None, None]:
+        """All data points in the subtree, children first and data points in the order of definition."""
+        for child in self.children.values():
+            if child.is_data_point:
+                yield child
+            else:
+                yield from child.data_point_nodes()
+
+
+class PathIndex:
+    """Trie of the required paths of an entity tree, with the data point info at the leaves."""
+
+    def __init__(self, entity: "Entity"):
+        self.root = PathNode("", "", entity)
+        self._insert(entity, self.root)
+        self.paths: list[str] = [node.path for node in self.root.data_point_nodes()]
+
+    def _insert(self, entity: "Entity", node: PathNode) -> None:
+        for name, child in entity.children.items():
+            sub_node = PathNode(name, concat_path(node.path, name), child)
+            node.children[name] = sub_node
+            self._insert(child, sub_node)
+        for dp_name in entity.data_points():
+            node.children[dp_name] = PathNode(
+                dp_name,
+                concat_path(node.path, dp_name),
+                entity,
+                info=entity.data_point_info[dp_name],
+            )
+
+    def lookup(self, path: str | list[str]) -> Optional[PathNode]:
+        node = self.root
+        for component in split_path(path):
+            node = node.children.get(component)
+            if node is None:
+                return None
+        return node
+
+    def match(self, pattern: str) -> Generator[str, None, None]:
+        """
+        Yield the required data point paths matching the pattern.
+        Only the subtree under the literal prefix of the pattern is scanned.
+        """
+        node = self.lookup(literal_prefix(pattern))
+        if node is None:
+            return
+        regex = compile_pattern(pattern)
+        if node.is_data_point:
+            candidates = [node]
+        else:
+            candidates = node.data_point_nodes()
+        for dp_node in candidates:
+            if regex.fullmatch(dp_node.path):
+                yield dp_node.path
@@ -1,38 +1,88 @@
 import json
 import logging
+import math
 import re
+from datetime import datetime, timedelta
 from pathlib import Path
-from random import uniform
-from typing import Optional, Generator
+from random import Random
+from typing import (
+    Any,
+    Callable,
+    Optional,
+    Generator,
+    Iterable,
+    NamedTuple,
+    Sequence,
+    TYPE_CHECKING,
+)
 
 import yaml
-from faker import Faker
-from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
+from pydantic.types import ConstrainedFloat, ConstrainedInt
 
-from .utils import camel_to_snake, PATH_SEP, concat_path, split_path
-from .model import Entity, DataPointInfo, Telemetry
+from .utils import (
+    camel_to_snake,
+    PATH_SEP,
+    split_path,
+    insert_data_point_to_dict,
+    shard_of,
+)
+from .model import Entity, DataPointInfo, Telemetry, Attribute
+from .registry import PathRegistry, PathLike
+
+if TYPE_CHECKING:
+    from multiprocessing.pool import Pool
+
+    import pandas as pd
+
+    from .faults import FaultInjector, LoadProfile
+    from .replay import Replay
+    from .vectorized import VectorizedMockEngine
+
+
+class DataPointHandle(NamedTuple):
+    """A data point of the reference resolved from its uuid"""
+
+    path: str
+    asset_path: str
+    name: str
+    type_path: str
 
 
 class Reference:
+    """
+    Reference of the mocked tree, compiled into flat lookup tables: the node of every path in the tree,
+    the (min, max) value range of every type path, and the resolved data point of every uuid.
+    """
+
     def __init__(self, reference=None):
         reference = reference or {}
         self.tree = reference.get("tree", None)
         self.value_range = reference.get("value_range", None)
         self.uuid_map = reference.get("uuid_map", None)
+        self.nodes: dict[str, dict] = {}
+        if self.tree:
+            self._compile_tree("", self.tree)
+        self.ranges: dict[str, tuple[float, float]] = {
+            k: (v["min"], v["max"]) for k, v in (self.value_range or {}).items()
+        }
+        self.handles: dict[str, DataPointHandle] = {}
+        for uuid, path in (self.uuid_map or {}).items():
+            asset_path, _, name = path.rpartition(PATH_SEP)
+            type_path = PATH_SEP.join(split_path(asset_path)[0::2] + [name])
+            self.handles[uuid] = DataPointHandle(path, asset_path, name, type_path)
+
+    def _compile_tree(self, path: str, node: dict) -> None:
+        self.nodes[path] = node
+        for k, v in node.items():
+            if k != "DataPoints" and isinstance(v, dict):
+                self._compile_tree(f"{path}{PATH_SEP}{k}" if path else k, v)
 
-    def get_children(self, path, tree=None):
+    def get_children(self, path):
         if self.tree:
-            if tree is None:
-                tree = self.tree
-            path = split_path(path)
-            if path:
-                component = path.pop(0)
-                if component in tree:
-                    return self.get_children(path, tree[component])
-                return {}
-            else:
-                return tree
+            if not isinstance(path, str):
+                path = PATH_SEP.join(path)
+            return self.nodes.get(path, {})
 
     def get_data_points(self, path):
         item = self.get_children(path)
@@ -46,6 +96,9 @@ class Reference:
             return self.uuid_map.get(uuid, None)
         return None
 
+    def resolve_uuid(self, uuid: str) -> Optional[DataPointHandle]:
+        return self.handles.get(uuid)
+
     def list_uuids(self):
         if self.uuid_map:
             return list(self.uuid_map.keys())
@@ -53,49 +106,111 @@ class Reference:
             return []
 
     def get_value_range(self, path, name):
+        path = split_path(path)
+        path = [path[i] for i in range(0, len(path), 2)]
+        path.append(name)
+        return self.value_range_of(PATH_SEP.join(path))
+
+    def value_range_of(self, type_path: str):
         if self.value_range:
-            path = split_path(path)
-            path = [path[i] for i in range(0, len(path), 2)]
-            path.append(name)
-            return self.value_range.get(PATH_SEP.join(path), None)
+            return self.value_range.get(type_path, None)
 
+    def range_of(self, type_path: str) -> Optional[tuple[float, float]]:
+        """The (min, max) value range of a type path, or None if not given"""
+        return self.ranges.get(type_path)
+
+
+def value_bounds(dp: "MockedDataPoint") -> Optional[tuple[type, float, float]]:
+    """
+    The kind (float or int) and the range of the values of a data point, taken from the reference
+    if the reference gives a range, otherwise from the constraints of a confloat/conint type.
+    None if the values can only be drawn by the faker of the data point.
+    """
+    if dp.value_range is not None:
+        return float, *dp.value_range
+    dp_type = dp.prototype.type
+    if not isinstance(dp_type, type):
+        return None
+    if issubclass(dp_type, ConstrainedInt):
+        low = dp_type.ge if dp_type.gt is None else dp_type.gt + 1
+        high = dp_type.le if dp_type.lt is None else dp_type.lt - 1
+        if low is not None and high is not None:
+            return int, low, high
+    elif issubclass(dp_type, ConstrainedFloat):
+        low = dp_type.ge if dp_type.gt is None else math.nextafter(dp_type.gt, math.inf)
+        high = dp_type.le if dp_type.lt is None else dp_type.lt
+        if low is not None and high is not None:
+            return float, low, high
+    return None
+
+
+def seed_fakers(seed: int) -> None:
+    """
+    Seed the random generator shared by Faker instances, so that the values drawn next by the fakers of data points
+    are reproducible. Fakers with their own generator (see Faker.seed_instance) or not using Faker are not seeded.
+    """
+    MockedDataPoint.faker().random.seed(seed)
 
-class MockedItem:
-    _name_count = {}
 
+class MockedItem:
     def __init__(
         self,
         prototype: Entity | DataPointInfo,
         reference: Reference,
         parent: Optional["MockedEntity"] = None,
+        registry: Optional[PathRegistry] = None,
+        name_count: Optional[dict[str, int]] = None,
+        random: Optional[Random] = None,
+        values: Optional[Random] = None,
     ):
         self.prototype = prototype
         self.reference = reference
         self.parent = parent
+        if registry is None:
+            registry = parent.registry if parent else PathRegistry()
+        self.registry: PathRegistry = registry
+        # Counters of generated uuids by name, shared by the whole tree
+        if name_count is None:
+            name_count = parent.name_count if parent else {}
+        self.name_count: dict[str, int] = name_count
+        # Random generators of the structure and of the values of a seeded tree, shared by the whole tree.
+        # They are kept apart so that the structure does not depend on which values are drawn, e.g. by shards.
+        # None if the tree is not seeded.
+        if random is None and parent is not None:
+            random = parent.random
+        self.random: Optional[Random] = random
+        if values is None and parent is not None:
+            values = parent.values
+        self.values: Optional[Random] = values
 
     def gen_uuid(self):
         name = self.prototype.__class__.__name__.split("_")[-1]
         name = re.sub("(.)([A-Z][a-z]+)", r"\1_\2", name)
         name = re.sub("([a-z0-9])([A-Z])", r"\1_\2", name).lower()
-        if name not in MockedItem._name_count:
-            MockedItem._name_count[name] = 0
-        no = MockedItem._name_count[name]
-        uuid = f"{name}_{no}"
-        MockedItem._name_count[name] += 1
-        return uuid
+        no = self.name_count.get(name, 0)
+        self.name_count[name] = no + 1
+        return f"{name}_{no}"
 
 
 class MockedEntity(MockedItem):
     """Mock data generator for an entity class"""
 
+    # Incremented on every encoding of a tree from cached JSON fragments, see fragments.encode_tree
+    epoch = 0
+
     def __init__(self, entity_type: Optional[str], *args, uuid=None, **kwargs):
         super(MockedEntity, self).__init__(*args, **kwargs)
         self.children: dict[str, dict[str, MockedEntity]] = {}
         # self.uuid: Optional[str] = uuid or str(uuid1())
         self.uuid: Optional[str] = uuid or self.gen_uuid()
+        self.generated_uuid: bool = uuid is None
         self.entity_type: str = entity_type
         self._initialised: bool = False
-        self._path: Optional[str] = None
+        self._path_id: Optional[int] = None
+        # Epochs in which the subtree and each category of data points last changed, and the cached JSON fragments
+        self.changed_at: int = -1
+        self.category_changed_at: dict[str, int] = {}
+        self.fragments: dict[bool | tuple[str, bool], tuple[int, bytes]] = {}
 
         for dp_type in DataPointInfo.SUB_CLASSES:
             setattr(self, camel_to_snake(dp_type.__name__), {})
@@ -119,14 +234,19 @@ class MockedEntity(MockedItem):
         include_data_points: bool,
         change_attrs: bool,
         use_default: bool,
+        recursive: bool = True,
     ) -> "MockedEntity":
+        """
+        Generate the children and, if include_data_points, the data points of the entity.
+        If not recursive, the children are created but their subtrees are left to be generated later.
+        """
         if not self._initialised or regenerate:
             self.children = {}
             for k, v in self.prototype.children.items():
                 _children = {}
                 entity_type = camel_to_snake(k)
                 prototype = self.prototype.child_info[k]
-                number = prototype.number_faker()
+                number = prototype.fake_number(self.random)
                 if prototype.ids and number > len(prototype.ids):
                     logging.warning(
                         f"Faking number ({number})is greater the length of predefined IDs ({len(prototype.ids)}."
@@ -152,20 +272,92 @@ class MockedEntity(MockedItem):
                         reference=self.reference,
                         uuid=uuid,
                     )
-                    _children[entity.uuid] = entity.generate(
-                        regenerate=regenerate,
-                        include_data_points=include_data_points,
-                        change_attrs=change_attrs,
-                        use_default=use_default,
-                    )
+                    if recursive:
+                        entity.generate(
+                            regenerate=regenerate,
+                            include_data_points=include_data_points,
+                            change_attrs=change_attrs,
+                            use_default=use_default,
+                        )
+                    _children[entity.uuid] = entity
                 self.children[entity_type] = _children
             self._initialised = True
+            self.mark_changed()
         if include_data_points:
             self._generate_data_points(
                 change_attrs=change_attrs or regenerate, use_default=use_default
             )
         return self
 
+    def skeleton(self) -> dict:
+        """Entity types and uuids of the subtree, with None for generated uuids, from which build recreates it"""
+        return {
+            k: [
+                (None if c.generated_uuid else c.uuid, c.skeleton()) for c in v.values()
+            ]
+            for k, v in self.children.items()
+        }
+
+    def build(self, skeleton: dict) -> "MockedEntity":
+        """Create the subtree from a skeleton instead of faking the numbers of children"""
+        self.children = {}
+        for k, v in self.prototype.children.items():
+            entity_type = camel_to_snake(k)
+            _children = {}
+            for uuid, sub_skeleton in skeleton.get(entity_type, ()):
+                entity = self._create_child(entity_type, v, uuid)
+                _children[entity.uuid] = entity.build(sub_skeleton)
+            self.children[entity_type] = _children
+        self._initialised = True
+        self.mark_changed()
+        return self
+
+    def state(self, value_of: Callable[["MockedDataPoint"], tuple]) -> dict:
+        """Uuid, children and current (value, timestamp) of data points of the subtree, from which restore recreates it"""
+        data_points = {}
+        for dp_type in DataPointInfo.SUB_CLASSES:
+            for k, v in getattr(self, camel_to_snake(dp_type.__name__)).items():
+                value, timestamp = value_of(v)
+                if value is not None:
+                    data_points[k] = [value, timestamp]
+        return dict(
+            uuid=self.uuid,
+            data_points=data_points,
+            children={
+                k: [c.state(value_of) for c in v.values()]
+                for k, v in self.children.items()
+            },
+        )
+
+    def restore(self, state: dict) -> "MockedEntity":
+        """Recreate the subtree and the values of its data points from a state"""
+        for k, (value, timestamp) in state["data_points"].items():
+            dp = self.find_data_point(k)
+            if dp is not None:
+                dp.cur_value, dp.gen_timestamp = value, timestamp
+        self.children = {}
+        for k, v in self.prototype.children.items():
+            entity_type = camel_to_snake(k)
+            _children = {}
+            for sub_state in state["children"].get(entity_type, ()):
+                entity = self._create_child(entity_type, v, sub_state["uuid"])
+                _children[entity.uuid] = entity.restore(sub_state)
+            self.children[entity_type] = _children
+        self._initialised = True
+        self.mark_changed()
+        return self
+
+    def _create_child(
+        self, entity_type: str, prototype: Entity, uuid: Optional[str]
+    ) -> "MockedEntity":
+        return MockedEntity(
+            entity_type=entity_type,
+            prototype=prototype,
+            parent=self,
+            reference=self.reference,
+            uuid=uuid,
+        )
+
     def dict(
         self, regenerate, include_data_points, change_attrs, skip_default, use_default
     ) -> dict:
@@ -208,6 +400,17 @@ class MockedEntity(MockedItem):
                     res |= {dp_type_name: list(dps.keys())}
         return res
 
+    def mark_changed(self, category: Optional[str] = None) -> None:
+        """Mark the subtree, and a category of its data points if given, as changed since its last encoding."""
+        epoch = MockedEntity.epoch
+        if category is not None:
+            self.category_changed_at[category] = epoch
+        entity = self
+        # Ancestors of an entity already marked in this epoch are marked as well.
+        while entity is not None and entity.changed_at != epoch:
+            entity.changed_at = epoch
+            entity = entity.parent
+
     def _generate_data_points(self, use_default, **kwargs) -> None:
         for dp_type in DataPointInfo.SUB_CLASSES:
             dps = getattr(self, camel_to_snake(dp_type.__name__))
@@ -215,6 +418,13 @@ class MockedEntity(MockedItem):
             for v in dps.values():
                 v.generate(use_default=use_default, **kwargs)
 
+    def find_data_point(self, dp_name: str) -> Optional["MockedDataPoint"]:
+        for dp_type in DataPointInfo.SUB_CLASSES:
+            dps = getattr(self, camel_to_snake(dp_type.__name__))
+            if dp_name in dps:
+                return dps[dp_name]
+        return None
+
     def search_entity(self, uuid: str) -> Optional["MockedEntity"]:
         if uuid == self.uuid:
             return self
@@ -226,13 +436,28 @@ class MockedEntity(MockedItem):
                         return entity
 
     @property
-    def path(self) -> str:
-        if self._path is None:
+    def path_id(self) -> int:
+        if self._path_id is None:
             if not self.parent:
-                self._path = ""
+                self._path_id = self.registry.register("")
             else:
-                self._path = concat_path(self.parent.path, self.entity_type, self.uuid)
-        return self._path
+                self._path_id = self.registry.child(
+                    self.parent.path_id, self.entity_type, self.uuid
+                )
+        return self._path_id
+
+    @property
+    def path(self) -> str:
+        return self.registry[self.path_id]
+
+    def rebind(self, registry: PathRegistry) -> None:
+        """Register the entity and its data points in another registry, the children are left to be recreated"""
+        self.registry = registry
+        self._path_id = None
+        for dp_type in DataPointInfo.SUB_CLASSES:
+            for dp in getattr(self, camel_to_snake(dp_type.__name__)).values():
+                dp.registry = registry
+                dp.path_id = registry.child(self.path_id, dp.category, dp.name)
 
     def list_entities(self) -> Generator[tuple[str, "MockedEntity"], None, None]:
         self.generate(
@@ -260,7 +485,7 @@ class MockedEntity(MockedItem):
             dps = getattr(self, dp_type_name)
             for k, v in dps.items():
                 if not skip_default or v.prototype.default is None:
-                    yield concat_path(self.path, dp_type_name, k), v
+                    yield self.registry[v.path_id], v
         for v in self.children.values():
             for c in v.values():
                 yield from c.list_data_points(skip_default)
@@ -274,35 +499,38 @@ class MockedEntity(MockedItem):
             change_attrs=change_attrs,
             use_default=use_default,
         )
-        dp = None
-        for dp_type in DataPointInfo.SUB_CLASSES:
-            dps = getattr(self, camel_to_snake(dp_type.__name__))
-            if dp_name in dps:
-                dp = dps[dp_name]
-                break
+        dp = self.find_data_point(dp_name)
         if dp is None:
             raise KeyError(
                 f"Cannot find data points {dp_name} in {self.prototype.unique_name}"
             )
         return dp.generate(change_attrs=change_attrs, use_default=use_default).dict()
 
-    def get_child(self, path: str) -> "MockedEntity":
-        if path:
-            c_type, _, path = path.partition(PATH_SEP)
-            c_uuid, _, path = path.partition(PATH_SEP)
-            return self.children[c_type][c_uuid].get_child(path)
-        else:
-            return self
+    def get_child(self, path: str | Sequence[str]) -> "MockedEntity":
+        path = split_path(path)
+        if len(path) % 2:
+            raise KeyError(f"Incomplete entity path {PATH_SEP.join(path)}")
+        entity = self
+        for i in range(0, len(path), 2):
+            entity = entity.children[path[i]][path[i + 1]]
+        return entity
 
 
 class MockedDataPoint(MockedItem):
-    _faker = Faker()
+    _faker = None
 
     def __init__(self, name, *args, **kwargs):
         super(MockedDataPoint, self).__init__(*args, **kwargs)
         self.cur_value = None
         self.gen_timestamp = None
         self.name = name
+        self.category: str = camel_to_snake(self.prototype.__class__.__name__)
+        self.path_id: int = self.registry.child(
+            self.parent.path_id, self.category, name
+        )
+        self.value_range: Optional[tuple[float, float]] = self.reference.range_of(
+            self.registry.type_path(self.path_id)
+        )
 
     def generate(self, change_attrs, use_default) -> "MockedDataPoint":
         if (
@@ -313,24 +541,49 @@ class MockedDataPoint(MockedItem):
             if use_default and self.prototype.default is not None:
                 self.cur_value = self.prototype.default
             else:
-                value_range = self.reference.get_value_range(
-                    self.parent.path, self.name
-                )
-                if value_range is not None:
-                    self.cur_value = uniform(value_range["min"], value_range["max"])
-
-                    # pyfloat bug!
-                    # self.cur_value = self._faker.pyfloat(min_value=value_range["min"],
-                    #                                      max_value=value_range["max"])
-                else:
-                    self.cur_value = self.prototype.faker()
-                    if isinstance(self.cur_value, BaseModel):
-                        self.cur_value = self.cur_value.dict()
-            self.gen_timestamp = self._faker.past_datetime(
-                -self.prototype.time_var
-            ).isoformat()
+                self.cur_value = self.fake_value()
+            self.gen_timestamp = self.fake_timestamp().isoformat()
+            self.parent.mark_changed(self.category)
         return self
 
+    def fake_value(self):
+        """
+        A new value of the data point. A seeded tree draws values within known bounds (see value_bounds)
+        from its own random generator. Other values are drawn by the faker of the data point, which in a
+        seeded tree draws from the generator shared by Faker instances, seeded from the tree for every value.
+        """
+        if self.values is not None:
+            bounds = value_bounds(self)
+            if bounds is not None:
+                kind, low, high = bounds
+                if kind is int:
+                    return self.values.randint(low, high)
+                return self.values.uniform(low, high)
+            seed_fakers(self.values.getrandbits(64))
+        elif self.value_range is not None:
+            # pyfloat bug!
+            # self.cur_value = self._faker.pyfloat(min_value=value_range["min"],
+            #                                      max_value=value_range["max"])
+            return self.faker().random.uniform(*self.value_range)
+        value = self.prototype.faker()
+        if isinstance(value, BaseModel):
+            value = value.dict()
+        return value
+
+    def fake_timestamp(self) -> datetime:
+        """A timestamp within time_var before now"""
+        if self.values is not None:
+            return datetime.now() - self.prototype.time_var * self.values.random()
+        return self.faker().past_datetime(-self.prototype.time_var)
+
+    @classmethod
+    def faker(cls):
+        if cls._faker is None:
+            from faker import Faker
+
+            cls._faker = Faker()
+        return cls._faker
+
     def dict(self) -> dict:
         res = dict(value=self.cur_value, timestamp=self.gen_timestamp)
         if self.prototype.unit is not None:
@@ -338,16 +591,246 @@ class MockedDataPoint(MockedItem):
         return res
 
 
+class TelemetryStream:
+    """Telemetry of a selection of data points, emitting on each poll only the data points that changed"""
+
+    def __init__(
+        self, mocker: "Mocker", paths: Iterable[PathLike], use_default: bool = True
+    ):
+        self.mocker = mocker
+        self.use_default = use_default
+        telemetry = camel_to_snake(Telemetry.__name__)
+        # Paths are only looked up, so that paths requested by clients are never registered.
+        self.paths: list[str] = []
+        for path in paths:
+            dp = mocker.find_data_point(path)
+            if dp is not None and dp.category == telemetry:
+                self.paths.append(mocker.registry[dp.path_id])
+        # Last value sent of each path. Results carry a fresh timestamp, so only their values are compared.
+        self.last: dict[str, Any] = {}
+
+    def poll(self) -> list[dict]:
+        """Generate the selected telemetry and return {path, result} of those whose value changed since the last poll."""
+        changed = []
+        for path, result in self.mocker.gen_data_points(
+            self.paths, use_default=self.use_default
+        ):
+            if result is None:
+                continue
+            value = result.get("value")
+            if path not in self.last or self.last[path] != value:
+                self.last[path] = value
+                changed.append(dict(path=path, result=result))
+        return changed
+
+
+class MockIndex:
+    """Lookup tables over a generated mock tree, built once per generation of the tree"""
+
+    def __init__(self, entity: MockedEntity):
+        self.entities: dict[str, MockedEntity] = {}
+        self.entities_by_uuid: dict[str, MockedEntity] = {}
+        for path, e in entity.list_entities():
+            self.entities[path] = e
+            self.entities_by_uuid.setdefault(e.uuid, e)
+        self.data_points: dict[int, MockedDataPoint] = {}
+        self.paths: list[str] = []
+        self.paths_without_default: list[str] = []
+        for path, dp in entity.list_data_points(skip_default=False):
+            self.data_points[dp.path_id] = dp
+            self.paths.append(path)
+            if dp.prototype.default is None:
+                self.paths_without_default.append(path)
+        self.data_points_by_uuid: dict[str, MockedDataPoint] = {}
+        # Uuids of the reference whose entities are in the tree, i.e., in the shard of a sharded tree
+        self.uuids: list[str] = []
+        for uuid, handle in entity.reference.handles.items():
+            if handle.asset_path in self.entities:
+                self.uuids.append(uuid)
+                dp = self.entities[handle.asset_path].find_data_point(handle.name)
+                if dp is not None:
+                    self.data_points_by_uuid[uuid] = dp
+        self._encoded: dict[str, bytes] = {}
+
+    def list_data_points(self, skip_default: bool = True) -> list[str]:
+        return self.paths_without_default if skip_default else self.paths
+
+    def encoded(self, name: str, items: list) -> bytes:
+        """The JSON encoding of a list, cached by name"""
+        if name not in self._encoded:
+            self._encoded[name] = json.dumps(items).encode()
+        return self._encoded[name]
+
+
 class Mocker:
     def __init__(
-        self, entity: Optional[Entity] = None, reference: Optional[Path | dict] = None
+        self,
+        entity: Optional[Entity] = None,
+        reference: Optional[Path | dict] = None,
+        registry: Optional[PathRegistry] = None,
+        vectorized: bool = False,
+        seed: Optional[int] = None,
+        processes: Optional[int] = None,
+        shard: int = 0,
+        shards: int = 1,
     ):
+        """
+        If vectorized, values and timestamps of all data points are kept and refreshed in NumPy arrays by a
+        VectorizedMockEngine, which is much faster for large trees.
+        If seed is given, the tree has its own random generators, so the same seed always gives the same tree and
+        the same values (see parallel.generate_seeded). Values within known bounds (see value_bounds) are drawn
+        by the tree, other values by the fakers of the data points, seeded from the tree (see seed_fakers).
+        With processes > 1, the top-level subtrees are generated in parallel by
+        a process pool, forked here so that it is started before serving. Call close to stop it.
+        With shards > 1, only the top-level subtrees in the given shard (see utils.shard_of) are kept. Mockers of all
+        shards must have the same seed, so that they agree on the tree.
+        """
+        if shards > 1 and seed is None:
+            raise ValueError("A sharded mocker requires a seed.")
+        if not 0 <= shard < shards:
+            raise ValueError(f"Shard {shard} is out of range of {shards} shards.")
         if isinstance(reference, Path):
             reference = yaml.safe_load(reference.open())
+        self.registry: PathRegistry = registry or PathRegistry()
         self.entity: MockedEntity = MockedEntity(
-            entity_type=None, prototype=entity, reference=Reference(reference)
+            entity_type=None,
+            prototype=entity,
+            reference=Reference(reference),
+            registry=self.registry,
+            name_count={},
+            random=Random(seed) if seed is not None else None,
+            values=Random(seed) if seed is not None else None,
         )
-        self.entity_cache: Optional[dict[str, MockedEntity]] = None
+        self._index: Optional[MockIndex] = None
+        # Incremented whenever the tree is regenerated or attributes are changed, so that cached responses can be invalidated.
+        self.structure_version: int = 0
+        self.attrs_version: int = 0
+        self.vectorized: bool = vectorized
+        self.seed: Optional[int] = seed
+        self.processes: Optional[int] = processes
+        self.pool: Optional["Pool"] = None
+        if seed is not None:
+            from .parallel import start_pool
+
+            self.pool = start_pool(self.entity, processes)
+        self.shard: int = shard
+        self.shards: int = shards
+        self.engine: Optional["VectorizedMockEngine"] = None
+        self.replay: Optional["Replay"] = None
+        self.faults: Optional["FaultInjector"] = None
+
+    def build(self, regenerate: bool = False) -> MockedEntity:
+        """
+        Generate the tree if not generated yet or if regenerate.
+        With a seed, the seeded generation also generates all data points, except for the vectorized engine.
+        """
+        if self.seed is None:
+            self.entity.generate(
+                regenerate=regenerate,
+                include_data_points=False,
+                change_attrs=False,
+                use_default=True,
+            )
+        elif regenerate or not self.entity._initialised:
+            from .parallel import generate_seeded
+
+            generate_seeded(
+                self.entity,
+                self.seed,
+                pool=self.pool,
+                include_data_points=not self.vectorized,
+                keep=self.owns if self.shards > 1 else None,
+            )
+        return self.entity
+
+    def close(self) -> None:
+        """Stop the processes generating the tree, if any"""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    def owns(self, entity: MockedEntity) -> bool:
+        return shard_of(entity.path, self.shards) == self.shard
+
+    def shard_of(self, path_or_uuid: str) -> Optional[int]:
+        """Shard of a path, or of a uuid in the reference. None for unknown uuids."""
+        if self.shards <= 1:
+            return 0
+        handle = self.entity.reference.resolve_uuid(path_or_uuid)
+        if handle is not None:
+            return shard_of(handle.path, self.shards)
+        if PATH_SEP in path_or_uuid:
+            return shard_of(path_or_uuid, self.shards)
+        return None
+
+    def get_engine(self, regenerate: bool = False) -> "VectorizedMockEngine":
+        """The vectorized engine over the current tree, rebuilt when the tree is regenerated."""
+        if regenerate or self.engine is None:
+            from .vectorized import VectorizedMockEngine
+
+            self.build(regenerate)
+            self.engine = VectorizedMockEngine(self.entity, seed=self.seed)
+        return self.engine
+
+    def replay_recording(
+        self, path: Path, speed: float = 1.0, chunk_size: int = 100_000
+    ) -> "Replay":
+        """
+        Serve the data points recorded in path (see replay.read_recording) with their original timestamps,
+        replayed speed times faster than they were recorded. Data points not in the recording are still mocked.
+        """
+        from .replay import Replay, read_recording
+
+        self.replay = Replay(
+            read_recording(path, chunk_size=chunk_size),
+            speed=speed,
+            resolve=self._path_of_uuid,
+            is_attribute=self._is_attribute,
+        )
+        return self.replay
+
+    def advance_replay(self) -> None:
+        """Advance the replay, if any, and invalidate cached attributes if replayed attributes changed"""
+        if self.replay is None:
+            return
+        attributes = self.replay.attributes
+        self.replay.advance()
+        if self.replay.attributes != attributes:
+            self.attrs_version += 1
+
+    def _path_of_uuid(self, uuid: str) -> Optional[str]:
+        dp = self.index.data_points_by_uuid.get(uuid)
+        return self.registry[dp.path_id] if dp is not None else None
+
+    def _is_attribute(self, path: str) -> bool:
+        dp = self.find_data_point(path)
+        return dp is not None and isinstance(dp.prototype, Attribute)
+
+    def _replayed(self, dp: MockedDataPoint) -> Optional[dict]:
+        return self.replay.get(self.registry[dp.path_id])
+
+    def inject_faults(self, profile: "LoadProfile") -> "FaultInjector":
+        """
+        Inject the data point faults of a load profile into the generated data points: drop data points,
+        which are then not found, and make their timestamps stale.
+        """
+        from .faults import FaultInjector
+
+        self.faults = FaultInjector(profile)
+        return self.faults
+
+    def _with_faults(self, dp: MockedDataPoint, result: dict) -> Optional[dict]:
+        if self.faults.drops():
+            return None
+        return self.faults.stale(result, dp.prototype.time_var)
+
+    @property
+    def index(self) -> MockIndex:
+        """Lookup tables of the entities and data points, rebuilt when the tree is regenerated."""
+        if self._index is None:
+            self.build()
+            self._index = MockIndex(self.entity)
+        return self._index
 
     def dict(
         self,
@@ -358,8 +841,16 @@ class Mocker:
         use_default: bool = True,
     ) -> dict:
         """Generate a complete dictionary for the tree starting from the given entity."""
-        if regenerate:
-            self.entity_cache = None
+        self._update_versions(regenerate, change_attrs)
+        if self.vectorized and include_data_points:
+            return self.get_engine(regenerate).dict(
+                change_attrs=change_attrs,
+                skip_default=skip_default,
+                use_default=use_default,
+            )
+        if self.seed is not None:
+            self.build(regenerate)
+            regenerate = False
         return self.entity.dict(
             regenerate=regenerate,
             include_data_points=include_data_points,
@@ -368,6 +859,44 @@ class Mocker:
             use_default=use_default,
         )
 
+    def _update_versions(self, regenerate: bool, change_attrs: bool) -> None:
+        if regenerate:
+            self._index = None
+            # The regenerated tree has new uuids, so its paths are registered anew instead of piling up.
+            self.registry = PathRegistry()
+            self.entity.rebind(self.registry)
+            self.engine = None
+            self.structure_version += 1
+        if regenerate or change_attrs:
+            self.attrs_version += 1
+
+    def dumps(
+        self,
+        regenerate: bool = False,
+        change_attrs: bool = False,
+        skip_default: bool = True,
+        use_default: bool = True,
+    ) -> bytes:
+        """
+        Generate the complete tree with data points and return it encoded as compact JSON.
+        The output is stitched from cached fragments, so only subtrees with regenerated data points are encoded.
+        """
+        from .fragments import encode_tree, data_point_values
+
+        self._update_versions(regenerate, change_attrs)
+        if self.vectorized:
+            engine = self.get_engine(regenerate)
+            engine.refresh(change_attrs=change_attrs, use_default=use_default)
+            return encode_tree(self.entity, engine.category_values, skip_default)
+        self.build(regenerate)
+        if self.seed is not None:
+            regenerate = False
+        for entity in self.index.entities.values():
+            entity._generate_data_points(
+                change_attrs=change_attrs or regenerate, use_default=use_default
+            )
+        return encode_tree(self.entity, data_point_values, skip_default)
+
     def json(
         self,
         regenerate: bool = False,
@@ -377,7 +906,17 @@ class Mocker:
         use_default: bool = True,
         **kwargs,
     ) -> str:
-        """Generate a complete dictionary for the tree starting from the entity and return the coded json string."""
+        """
+        Generate a complete dictionary for the tree starting from the entity and return the coded json string.
+        Without data points or extra arguments to json.dumps, the compact output of dumps is returned.
+        """
+        if include_data_points and not kwargs:
+            return self.dumps(
+                regenerate=regenerate,
+                change_attrs=change_attrs,
+                skip_default=skip_default,
+                use_default=use_default,
+            ).decode()
         d = self.dict(
             regenerate=regenerate,
             include_data_points=include_data_points,
@@ -387,20 +926,47 @@ class Mocker:
         )
         return json.dumps(d, **kwargs)
 
+    def find_data_point(self, path: PathLike) -> Optional[MockedDataPoint]:
+        """The mocked data point by its path or path ID, or None if not found"""
+        # The tree is generated first, so that its paths are registered.
+        data_points = self.index.data_points
+        path_id = path if isinstance(path, int) else self.registry.get_id(path)
+        return data_points.get(path_id)
+
+    def search_entity(self, uuid: str) -> Optional[MockedEntity]:
+        return self.index.entities_by_uuid.get(uuid)
+
     def gen_data_point(
-        self, path: str, change_attr: bool = False, use_default: bool = True
+        self, path: PathLike, change_attr: bool = False, use_default: bool = True
     ) -> dict:
-        self.entity.generate(
-            regenerate=False,
-            include_data_points=False,
-            change_attrs=change_attr,
-            use_default=use_default,
-        )
-        path, _, dp_name = path.rpartition(PATH_SEP)
-        path, _, _ = path.rpartition(PATH_SEP)
-        return self.entity.get_child(path).gen_data_point(
-            dp_name, change_attrs=change_attr, use_default=use_default
-        )
+        """Generate the data point by its path or path ID"""
+        dp = self.find_data_point(path)
+        if dp is None:
+            raise KeyError(f"Cannot find data point {path}")
+        return self._gen_data_point(dp, change_attr, use_default)
+
+    def _gen_data_point(
+        self, dp: MockedDataPoint, change_attr: bool, use_default: bool
+    ) -> dict:
+        if change_attr:
+            self.attrs_version += 1
+        result = None
+        if self.replay is not None:
+            self.advance_replay()
+            result = self._replayed(dp)
+        if result is None and self.vectorized:
+            result = self.get_engine().gen_data_point(
+                dp, change_attrs=change_attr, use_default=use_default
+            )
+        elif result is None:
+            result = dp.generate(
+                change_attrs=change_attr, use_default=use_default
+            ).dict()
+        if self.faults is not None:
+            result = self._with_faults(dp, result)
+            if result is None:
+                raise KeyError(f"Data point {self.registry[dp.path_id]} is dropped")
+        return result
 
     def gen_value_by_uuid(
         self,
@@ -409,18 +975,9 @@ class Mocker:
         use_default: bool = True,
         value_only: bool = False,
     ) -> dict:
-        self.entity.generate(
-            regenerate=False,
-            include_data_points=False,
-            change_attrs=change_attr,
-            use_default=use_default,
-        )
-        path = self.entity.reference.search_by_uuid(uuid)
-        if path is not None:
-            path, _, dp_name = path.rpartition(PATH_SEP)
-            dp = self.entity.get_child(path).gen_data_point(
-                dp_name, change_attrs=change_attr, use_default=use_default
-            )
+        dp = self.index.data_points_by_uuid.get(uuid)
+        if dp is not None:
+            dp = self._gen_data_point(dp, change_attr, use_default)
             if value_only:
                 return dp["value"]
             else:
@@ -428,63 +985,221 @@ class Mocker:
         else:
             raise KeyError
 
+    def gen_data_points(
+        self,
+        paths: Iterable[PathLike],
+        change_attr: bool = False,
+        use_default: bool = True,
+    ) -> Generator[tuple[str, Optional[dict]], None, None]:
+        """Generate many data points by their paths or path IDs, yielding (path, None) for paths not found"""
+        targets = [
+            (
+                path
+                if isinstance(path, str)
+                else self.registry[path]
+                if isinstance(path, int)
+                else PATH_SEP.join(path),
+                self.find_data_point(path),
+            )
+            for path in paths
+        ]
+        yield from self._gen_many(targets, change_attr, use_default)
+
+    def gen_values_by_uuids(
+        self,
+        uuids: Iterable[str],
+        change_attr: bool = False,
+        use_default: bool = True,
+    ) -> Generator[tuple[str, Optional[dict]], None, None]:
+        """Generate many data points by their uuids, yielding (uuid, None) for uuids not found"""
+        targets = [(uuid, self.index.data_points_by_uuid.get(uuid)) for uuid in uuids]
+        yield from self._gen_many(targets, change_attr, use_default)
+
+    def _gen_many(
+        self,
+        targets: list[tuple[str, Optional[MockedDataPoint]]],
+        change_attr: bool,
+        use_default: bool,
+    ) -> Generator[tuple[str, Optional[dict]], None, None]:
+        if change_attr:
+            self.attrs_version += 1
+        results = self._replay_many(targets, change_attr, use_default)
+        if self.faults is None:
+            yield from results
+            return
+        for (key, result), (_, dp) in zip(results, targets):
+            yield key, self._with_faults(dp, result) if result is not None else None
+
+    def _replay_many(
+        self,
+        targets: list[tuple[str, Optional[MockedDataPoint]]],
+        change_attr: bool,
+        use_default: bool,
+    ) -> Generator[tuple[str, Optional[dict]], None, None]:
+        if self.replay is None:
+            yield from self._generate_many(targets, change_attr, use_default)
+            return
+        # Replayed data points are served from the recording, and the others are generated together.
+        self.advance_replay()
+        replayed = [self._replayed(dp) if dp is not None else None for _, dp in targets]
+        generated = self._generate_many(
+            [t for t, r in zip(targets, replayed) if r is None],
+            change_attr,
+            use_default,
+        )
+        for (key, _), result in zip(targets, replayed):
+            yield (key, result) if result is not None else next(generated)
+
+    def _generate_many(
+        self,
+        targets: list[tuple[str, Optional[MockedDataPoint]]],
+        change_attr: bool,
+        use_default: bool,
+    ) -> Generator[tuple[str, Optional[dict]], None, None]:
+        if self.vectorized:
+            # All data points are refreshed together with one call to the engine.
+            engine = self.get_engine()
+            indices = [
+                engine.index[dp.path_id] if dp is not None else None
+                for _, dp in targets
+            ]
+            engine.refresh(
+                change_attrs=change_attr,
+                use_default=use_default,
+                indices=[i for i in indices if i is not None],
+            )
+            for (key, _), i in zip(targets, indices):
+                yield key, engine.point(i) if i is not None else None
+        else:
+            for key, dp in targets:
+                if dp is not None:
+                    dp = dp.generate(
+                        change_attrs=change_attr, use_default=use_default
+                    ).dict()
+                yield key, dp
+
+    def attributes(
+        self, path: str = "", skip_default: bool = True, use_default: bool = True
+    ) -> dict:
+        """Attributes of the entity subtree at path, as a dict nested in the same way as dict()"""
+        entity = self.index.entities.get(path)
+        if entity is None:
+            raise KeyError(f"Cannot find entity {path}")
+        targets = [
+            (dp_path, dp)
+            for dp_path, dp in entity.list_data_points(skip_default=skip_default)
+            if isinstance(dp.prototype, Attribute)
+        ]
+        res = {}
+        prefix = len(path) + 1 if path else 0
+        for dp_path, result in self._gen_many(
+            targets, change_attr=False, use_default=use_default
+        ):
+            # Attributes dropped by injected faults are left out.
+            if result is not None:
+                insert_data_point_to_dict(dp_path[prefix:], result, res)
+        return res
+
+    def select_data_points(
+        self, pattern_or_uses: str | list, skip_default: bool = True
+    ) -> list[str]:
+        """Paths of the mocked data points whose type paths match a pattern or uses"""
+        type_paths = set(self.entity.prototype.match_data_points(pattern_or_uses))
+        return [
+            path
+            for path in self.list_data_points(skip_default=skip_default)
+            if self.registry.type_path(path) in type_paths
+        ]
+
+    def generate_history(
+        self,
+        start: datetime,
+        stop: datetime,
+        step: timedelta,
+        chunk_size: int = 100_000,
+        skip_default: bool = True,
+    ) -> Generator["pd.DataFrame", None, None]:
+        """
+        Generate the values of all data points at every step from start to stop with the vectorized engine,
+        decomposed into rows tagged as by Scenario.decompose_data, and yield them as data frames of at most chunk_size rows.
+        """
+        yield from self.get_engine().history(
+            start, stop, step, chunk_size=chunk_size, skip_default=skip_default
+        )
+
+    def state(self) -> dict:
+        """Structure, uuids and current values of the tree, to be restored by load_state"""
+        from .state import STATE_VERSION
+
+        self.build()
+        if self.vectorized:
+            engine = self.get_engine()
+            timestamps = engine.timestamp_strings()
+
+            def value_of(dp: MockedDataPoint) -> tuple:
+                i = engine.index[dp.path_id]
+                return engine.values[i], timestamps[i] if engine.generated[i] else None
+
+        else:
+
+            def value_of(dp: MockedDataPoint) -> tuple:
+                return dp.cur_value, dp.gen_timestamp
+
+        return dict(
+            version=STATE_VERSION,
+            entity=self.entity.prototype.unique_name,
+            name_count=self.entity.name_count,
+            tree=self.entity.state(value_of),
+        )
+
+    def load_state(self, state: dict) -> None:
+        """Replace the tree with a state of a mocker of the same scenario"""
+        if state["entity"] != self.entity.prototype.unique_name:
+            raise ValueError(
+                f"The state is of {state['entity']}, not {self.entity.prototype.unique_name}."
+            )
+        self._update_versions(regenerate=True, change_attrs=False)
+        self.engine = None
+        self.entity.restore(state["tree"])
+        self.entity.name_count.clear()
+        self.entity.name_count.update(state["name_count"])
+
+    def save(self, path: Path) -> None:
+        """Save the state of the mocker into path, see state.write_state"""
+        from .state import write_state
+
+        write_state(self.state(), path)
+
+    def load(self, path: Path) -> None:
+        """Load the state saved by save into the mocker"""
+        from .state import read_state
+
+        self.load_state(read_state(path))
+
     def list_entities(self) -> list[str]:
-        return [k for k, _ in self.entity.list_entities()]
+        return list(self.index.entities.keys())
 
     def list_data_points(self, skip_default=True) -> list[str]:
-        return [k for k, _ in self.entity.list_data_points(skip_default=skip_default)]
+        return list(self.index.list_data_points(skip_default=skip_default))
 
     def list_uuids(self) -> list[str]:
-        return self.entity.reference.list_uuids()
+        return list(self.index.uuids)
 
+    def list_data_points_json(self, skip_default=True) -> bytes:
+        """JSON encoded list of data point paths, cached until the tree is regenerated"""
+        return self.index.encoded(
+            f"data_points:{skip_default}",
+            self.index.list_data_points(skip_default=skip_default),
+        )
 
-class MockApp(FastAPI):
-    def __init__(
-        self,
-        mocker: Mocker,
-        *args,
-        skip_defaults: bool = True,
-        use_defaults: bool = True,
-        **kwargs,
-    ):
-        super(MockApp, self).__init__(*args, **kwargs)
-        self.mocker: Mocker = mocker
-        self.skip_defaults: bool = skip_defaults
-        self.use_defaults: bool = use_defaults
-
-        @self.get("/hierarchy")
-        async def get_hierarchy():
-            return self.mocker.dict(include_data_points=False)
-
-        @self.get("/sample")
-        async def get_sample(change_attrs: bool = False):
-            return self.mocker.dict(change_attrs=change_attrs)
-
-        @self.get("/points/")
-        async def list_points():
-            return self.mocker.list_data_points(skip_default=self.skip_defaults)
-
-        @self.get("/values/")
-        async def list_uuids():
-            return self.mocker.list_uuids()
-
-        @self.get("/points/{path:str}")
-        async def get_point(path):
-            try:
-                return self.mocker.gen_data_point(path, use_default=self.use_defaults)
-            except KeyError as e:
-                raise HTTPException(
-                    status_code=404, detail=f"Cannot find path {path}"
-                ) from e
-
-        @self.get("/values/{uuid:str}")
-        async def get_value_by_uuid(uuid):
-            try:
-                return self.mocker.gen_value_by_uuid(
-                    uuid, use_default=self.use_defaults, value_only=True
-                )
-            except KeyError as e:
-                logging.error(f"{type(e)}:{e}")
-                raise HTTPException(
-                    status_code=404, detail=f"Cannot find uuid {uuid}"
-                ) from e
+    def list_uuids_json(self) -> bytes:
+        return self.index.encoded("uuids", self.index.uuids)
+
+
+def __getattr__(name):
+    # The web application is kept in a separate module, so that FastAPI is only imported when needed.
+    if name == "MockApp":
+        from .mock_app import MockApp
+
+        return MockApp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,375 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Optional, Iterable, AsyncIterable, Callable
+
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import (
+    JSONResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
+from pydantic import BaseModel
+
+from .faults import FaultInjector, LoadProfile
+from .mock import Mocker, TelemetryStream
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class PointsSelector(BaseModel):
+    """Data points selected by explicit paths, or by a pattern or uses matched against their type paths"""
+
+    paths: Optional[list[str]] = None
+    pattern: Optional[str] = None
+    uses: Optional[list] = None
+
+
+class StreamSelector(PointsSelector):
+    """Selector of a WebSocket subscriber, with the interval (in seconds) between two pushes"""
+
+    interval: Optional[float] = None
+
+
+class UuidsSelector(BaseModel):
+    uuids: list[str]
+
+
+def ndjson_chunks(items: Iterable[dict], chunk_size: int = 1000) -> Iterable[str]:
+    """Encode items as newline delimited JSON, grouped into chunks of chunk_size lines."""
+    lines = []
+    for item in items:
+        lines.append(json.dumps(item))
+        if len(lines) >= chunk_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+class MockApp(FastAPI):
+    def __init__(
+        self,
+        mocker: Mocker,
+        *args,
+        skip_defaults: bool = True,
+        use_defaults: bool = True,
+        tick: float = 1.0,
+        shard_urls: Optional[list[str]] = None,
+        profile: Optional[LoadProfile] = None,
+        **kwargs,
+    ):
+        """
+        shard_urls are the base URLs of all shards, if the mocker is one shard of a sharded tree.
+        If a load profile is given, its faults are injected into the responses and the data points of the mocker.
+        """
+        super(MockApp, self).__init__(*args, **kwargs)
+        self.mocker: Mocker = mocker
+        self.skip_defaults: bool = skip_defaults
+        self.use_defaults: bool = use_defaults
+        # Default interval (in seconds) between two pushes of the streaming endpoints.
+        self.tick: float = tick
+        # Encoded responses with their ETags, by name, valid as long as the versions of the mocker are unchanged.
+        self.response_cache: dict[str, tuple[tuple, bytes, str]] = {}
+        self.shard_urls: list[str] = shard_urls or []
+        self.faults: Optional[FaultInjector] = None
+        if profile is not None:
+            self.faults = self.mocker.inject_faults(profile)
+
+            @self.middleware("http")
+            async def inject_faults(request: Request, call_next):
+                delay = self.faults.latency(request.scope["path"])
+                if delay:
+                    await asyncio.sleep(delay)
+                response = await call_next(request)
+                # Streamed responses, without a length, are left intact.
+                if (
+                    "content-length" not in response.headers
+                    or not self.faults.malforms()
+                ):
+                    return response
+                content = b"".join([chunk async for chunk in response.body_iterator])
+                headers = {
+                    k: v for k, v in response.headers.items() if k != "content-length"
+                }
+                return Response(
+                    self.faults.malformed(content),
+                    status_code=response.status_code,
+                    headers=headers,
+                )
+
+        @self.get("/hierarchy")
+        async def get_hierarchy(request: Request):
+            return self.cached_response(
+                request,
+                "hierarchy",
+                (self.mocker.structure_version,),
+                lambda: json.dumps(
+                    self.mocker.dict(include_data_points=False)
+                ).encode(),
+            )
+
+        @self.get("/shards")
+        async def get_shards():
+            """The shard of this server and the base URLs of all shards, which are empty if the tree is not sharded"""
+            return dict(shard=self.mocker.shard, shards=self.shard_urls)
+
+        @self.get("/attributes/{path:path}")
+        async def get_attributes(request: Request, path: str = ""):
+            """Attributes of the entity at path, or of the whole tree if path is empty"""
+            redirect = self.redirect_to_shard(request, path)
+            if redirect is not None:
+                return redirect
+            # Attributes replayed since the last request change the version of the attributes.
+            self.mocker.advance_replay()
+            try:
+                return self.cached_response(
+                    request,
+                    f"attributes:{path}",
+                    (self.mocker.structure_version, self.mocker.attrs_version),
+                    lambda: json.dumps(
+                        self.mocker.attributes(
+                            path,
+                            skip_default=self.skip_defaults,
+                            use_default=self.use_defaults,
+                        )
+                    ).encode(),
+                    cache=self.faults is None,
+                )
+            except KeyError as e:
+                raise HTTPException(
+                    status_code=404, detail=f"Cannot find entity {path}"
+                ) from e
+
+        @self.get("/sample")
+        async def get_sample(change_attrs: bool = False):
+            return Response(
+                self.mocker.dumps(change_attrs=change_attrs),
+                media_type="application/json",
+            )
+
+        @self.get("/points/")
+        async def list_points(request: Request):
+            return self.cached_response(
+                request,
+                "points",
+                (self.mocker.structure_version,),
+                lambda: self.mocker.list_data_points_json(
+                    skip_default=self.skip_defaults
+                ),
+                cache=self.faults is None,
+            )
+
+        @self.get("/values/")
+        async def list_uuids(request: Request):
+            return self.cached_response(
+                request,
+                "uuids",
+                (self.mocker.structure_version,),
+                self.mocker.list_uuids_json,
+            )
+
+        @self.post("/points/batch")
+        async def get_points(selector: PointsSelector, stream: bool = False):
+            """
+            Generate many data points in one request, as a list of {path, result}. Paths not found are
+            returned as {path, error}. With stream, the items are sent as chunked newline delimited JSON.
+            """
+            paths = self.select_paths(selector)
+            items = (
+                dict(path=path, result=result)
+                if result is not None
+                else dict(path=path, error=f"Cannot find path {path}")
+                for path, result in self.mocker.gen_data_points(
+                    paths, use_default=self.use_defaults
+                )
+            )
+            return self.batch_response(items, stream)
+
+        @self.post("/values/batch")
+        async def get_values_by_uuids(selector: UuidsSelector, stream: bool = False):
+            """Generate many values in one request, as a list of {name, value}. Uuids not found are returned as {name, error}."""
+            items = (
+                dict(name=uuid, value=result["value"])
+                if result is not None
+                else dict(name=uuid, error=f"Cannot find uuid {uuid}")
+                for uuid, result in self.mocker.gen_values_by_uuids(
+                    selector.uuids, use_default=self.use_defaults
+                )
+            )
+            return self.batch_response(items, stream)
+
+        @self.get("/stream")
+        async def stream_telemetry(
+            pattern: Optional[str] = None,
+            paths: Optional[list[str]] = Query(None),
+            interval: Optional[float] = None,
+            ticks: Optional[int] = None,
+        ):
+            """
+            Push the selected telemetry as newline delimited JSON {path, result} items. Every interval seconds
+            (the tick of the app by default), only the data points changed since the last push are sent.
+            All data points are selected if neither pattern nor paths is given. The stream ends after ticks pushes, if given.
+            """
+            selector = PointsSelector(paths=paths, pattern=pattern or "%%")
+            stream = TelemetryStream(
+                self.mocker, self.select_paths(selector), self.use_defaults
+            )
+            return StreamingResponse(
+                self.push(stream, interval or self.tick, ticks),
+                media_type=NDJSON_MEDIA_TYPE,
+            )
+
+        @self.websocket("/ws")
+        async def websocket_telemetry(websocket: WebSocket):
+            """
+            Push the selected telemetry over a WebSocket. The subscriber sends a selector ({paths}, {pattern} or {uses},
+            with an optional interval), and may send a new one at any time. Every interval, the server sends the list
+            of {path, result} changed since the last push, if any.
+            """
+            await websocket.accept()
+            stream, interval = None, self.tick
+            receiving = asyncio.ensure_future(websocket.receive_json())
+            try:
+                while True:
+                    done, _ = await asyncio.wait(
+                        [receiving],
+                        timeout=self.push_interval(interval) if stream else None,
+                    )
+                    if done:
+                        try:
+                            selector = StreamSelector.parse_obj(receiving.result())
+                            stream = TelemetryStream(
+                                self.mocker,
+                                self.select_paths(selector),
+                                self.use_defaults,
+                            )
+                            interval = selector.interval or self.tick
+                        except HTTPException as e:
+                            await websocket.send_json(dict(error=e.detail))
+                        except ValueError as e:
+                            # Invalid JSON or selector
+                            await websocket.send_json(dict(error=str(e)))
+                        receiving = asyncio.ensure_future(websocket.receive_json())
+                    if stream is not None:
+                        changed = stream.poll()
+                        if changed:
+                            await websocket.send_json(changed)
+            except WebSocketDisconnect:
+                pass
+            finally:
+                receiving.cancel()
+
+        @self.get("/points/{path:str}")
+        async def get_point(request: Request, path: str):
+            redirect = self.redirect_to_shard(request, path)
+            if redirect is not None:
+                return redirect
+            try:
+                return self.mocker.gen_data_point(path, use_default=self.use_defaults)
+            except KeyError as e:
+                raise HTTPException(
+                    status_code=404, detail=f"Cannot find path {path}"
+                ) from e
+
+        @self.get("/values/{uuid:str}")
+        async def get_value_by_uuid(request: Request, uuid: str):
+            redirect = self.redirect_to_shard(request, uuid)
+            if redirect is not None:
+                return redirect
+            try:
+                return self.mocker.gen_value_by_uuid(
+                    uuid, use_default=self.use_defaults, value_only=True
+                )
+            except KeyError as e:
+                logging.error(f"{type(e)}:{e}")
+                raise HTTPException(
+                    status_code=404, detail=f"Cannot find uuid {uuid}"
+                ) from e
+
+    def cached_response(
+        self,
+        request: Request,
+        name: str,
+        versions: tuple,
+        encode: Callable[[], bytes],
+        cache: bool = True,
+    ) -> Response:
+        """
+        Response of pre-encoded JSON, re-encoded only when the versions change. The response carries an ETag
+        of its content, and is 304 (Not Modified) if the request has a matching If-None-Match header.
+        If not cache, e.g. when injected faults change every response, the content is encoded for every request.
+        """
+        if not cache:
+            return Response(encode(), media_type="application/json")
+        cached = self.response_cache.get(name)
+        if cached is None or cached[0] != versions:
+            content = encode()
+            etag = f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+            cached = self.response_cache[name] = versions, content, etag
+        _, content, etag = cached
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag in map(str.strip, if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+        return Response(content, media_type="application/json", headers=headers)
+
+    def redirect_to_shard(
+        self, request: Request, path_or_uuid: str
+    ) -> Optional[RedirectResponse]:
+        """Redirect (307) to the shard serving path_or_uuid, if it is served by another shard"""
+        if not self.shard_urls:
+            return None
+        shard = self.mocker.shard_of(path_or_uuid)
+        if shard is None or shard == self.mocker.shard:
+            return None
+        url = f"{self.shard_urls[shard]}{request.url.path}"
+        if request.url.query:
+            url = f"{url}?{request.url.query}"
+        return RedirectResponse(url, status_code=307)
+
+    def select_paths(self, selector: PointsSelector) -> list[str]:
+        if selector.paths:
+            return selector.paths
+        # An empty pattern or uses selects nothing, and is rejected like a missing one.
+        for pattern_or_uses in (selector.pattern, selector.uses):
+            if pattern_or_uses:
+                return self.mocker.select_data_points(
+                    pattern_or_uses, skip_default=self.skip_defaults
+                )
+        raise HTTPException(
+            status_code=422, detail="Either paths, pattern or uses is required"
+        )
+
+    def push_interval(self, interval: float) -> float:
+        """Interval until the next push of a stream, shortened in the bursts of the load profile"""
+        if self.faults is None:
+            return interval
+        return self.faults.interval(interval, time.time())
+
+    async def push(
+        self, stream: TelemetryStream, interval: float, ticks: Optional[int]
+    ) -> AsyncIterable[str]:
+        tick = 0
+        while ticks is None or tick < ticks:
+            if tick:
+                await asyncio.sleep(self.push_interval(interval))
+            for chunk in ndjson_chunks(stream.poll()):
+                yield chunk
+            tick += 1
+
+    @staticmethod
+    def batch_response(items: Iterable[dict], stream: bool):
+        if stream:
+            return StreamingResponse(ndjson_chunks(items), media_type=NDJSON_MEDIA_TYPE)
+        return JSONResponse(list(items))
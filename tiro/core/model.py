@@ -1,12 +1,14 @@
+import hashlib
 import re
 import sys
 from collections.abc import Iterable
+from copy import copy
 from datetime import datetime, timedelta
 from functools import partial
 from importlib import import_module
 from inspect import get_annotations
 from pathlib import Path
-from random import randint
+from random import Random, randint
 from typing import (
     TypeVar,
     Generic,
@@ -23,6 +25,7 @@ from pydantic import BaseModel, create_model, Field
 from pydantic.generics import GenericModel
 from yaml import safe_load
 
+from .index import PathIndex
 from .utils import (
     camel_to_snake,
     DataPointTypes,
@@ -31,11 +34,73 @@ from .utils import (
     YAML_META_CHAR,
     split_path,
     decouple_uses,
-    format_regex,
+    compile_pattern,
+    compact_id_pattern,
 )
 
 DPT = TypeVar("DPT", *DataPointTypes)
 
+# With more predefined ids than this, entity keys are checked against a frozenset instead of a Literal.
+LITERAL_IDS_LIMIT = 64
+# Maximal number of models kept in each cache of models shared by all entities, the oldest are dropped first.
+SHARED_MODELS_LIMIT = 1024
+
+
+def _short_hash(signature: str) -> str:
+    return hashlib.blake2b(signature.encode(), digest_size=6).hexdigest()
+
+
+def _type_signature(tp: Any) -> str:
+    """Description of a data point type which is the same in every process, including constraints, e.g. of confloat"""
+    if not isinstance(tp, type):
+        return repr(tp)
+    constraints = sorted(
+        (k, repr(v))
+        for k, v in vars(tp).items()
+        if not k.startswith("_")
+        and not callable(v)
+        and not isinstance(v, (classmethod, staticmethod, property))
+    )
+    return f"{tp.__module__}.{tp.__qualname__}{constraints}"
+
+
+def _cache_model(cache: dict, key: str, model: Any) -> Any:
+    cache[key] = model
+    if len(cache) > SHARED_MODELS_LIMIT:
+        del cache[next(iter(cache))]
+    return model
+
+
+class IdSet(str):
+    """
+    Key type accepting only the predefined ids of an entity list, checked with a set lookup.
+    In JSON schema, the ids are represented by a compact pattern instead of an enumeration.
+    """
+
+    ids: frozenset = frozenset()
+    regex: Optional[re.Pattern] = None
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, value):
+        if value not in cls.ids:
+            raise ValueError(
+                f"unexpected id {value!r}, not in the {len(cls.ids)} predefined ids"
+            )
+        return value
+
+    @classmethod
+    def of(cls, ids: Iterable) -> Type["IdSet"]:
+        ids = frozenset(ids)
+        return type(
+            cls.__name__,
+            (cls,),
+            dict(ids=ids, regex=re.compile(compact_id_pattern(sorted(map(str, ids))))),
+        )
+
 
 class EntityList:
     """Holding the information of a list of entity with the same type"""
@@ -43,11 +108,15 @@ class EntityList:
     def __init__(
         self,
         cls: Type["Entity"],
-        faking_number: Optional[Callable | int] = None,
+        faking_number: Optional[Callable | int | tuple[int, int]] = None,
         ids: Optional[list[str]] = None,
     ):
+        """faking_number is the number of entities, a (min, max) range of it, or a function returning it."""
         self.cls = cls
         self.ids = ids
+        # Meta entries of the scenario definition this list was created from, if any.
+        self.definition: Optional[dict] = None
+        self._key_type: Optional[type] = None
         if self.ids is not None:
             if faking_number is None:
                 faking_number = len(self.ids)
@@ -55,15 +124,38 @@ class EntityList:
                 raise RuntimeError(
                     "When ids is provided, faking_number must be less than the length of ids."
                 )
+        # Range of the number of entities, drawn by the random generator of a seeded tree
+        self.number_range: Optional[tuple[int, int]] = None
         if isinstance(faking_number, int):
             self.number_faker = lambda: faking_number
+        elif isinstance(faking_number, tuple):
+            self.number_range = faking_number
+            self.number_faker = partial(randint, *faking_number)
         else:
             self.number_faker = faking_number
 
+    def fake_number(self, random: Optional[Random] = None) -> int:
+        """Number of entities to generate, drawn from random if given and the number is a range"""
+        if random is not None and self.number_range is not None:
+            return random.randint(*self.number_range)
+        return self.number_faker()
+
     def new_entity(self, parent: Optional["Entity"] = None) -> "Entity":
         """Generate an entity instance"""
         return self.cls(parent)
 
+    @property
+    def key_type(self) -> type:
+        """Type of the keys (ids) in the dictionary holding the entities"""
+        if self._key_type is None:
+            if not self.ids:
+                self._key_type = str
+            elif len(self.ids) > LITERAL_IDS_LIMIT:
+                self._key_type = IdSet.of(self.ids)
+            else:
+                self._key_type = Literal[tuple(self.ids)]
+        return self._key_type
+
 
 class DataPoint(GenericModel, Generic[DPT]):
     """Base Pydantic Model to representing a data point"""
@@ -81,7 +173,8 @@ class DataPoint(GenericModel, Generic[DPT]):
 
 
 class DataPointInfo:
-    SUB_CLASSES = set()
+    # Ordered by definition, so that data points are iterated in the same order in every process
+    SUB_CLASSES: dict[type, None] = {}
     SUB_CLASS_NAMES = set()
 
     def __init__(
@@ -99,7 +192,7 @@ class DataPointInfo:
         self.default = default
 
     def __init_subclass__(cls, **kwargs):
-        cls.SUB_CLASSES.add(cls)
+        cls.SUB_CLASSES[cls] = None
         cls.SUB_CLASS_NAMES.add(cls.__name__)
 
     def default_object(
@@ -169,13 +262,22 @@ class Entity:
             schema.pop("title", None)
             for p in schema["properties"].values():
                 p.pop("title", None)
+                if "patternProperties" in p:
+                    # Keys are predefined ids, summarised by the pattern.
+                    p["additionalProperties"] = False
 
     data_point_info: dict[str, DataPointInfo] = {}
+    # Bumped whenever defaults change, so that compiled models built with stale defaults are not reused.
+    _defaults_revision: int = 0
+    # Models shared by all entities, keyed by the hash of their structure rather than by position in the tree.
+    cached_data_point_model: dict[str, Type[DataPoint]] = {}
+    _shared_models: dict[str, tuple[Type[BaseModel], bool]] = {}
 
     def __init_subclass__(cls, **kwargs):
         super(Entity, cls).__init_subclass__(**kwargs)
         cls.data_point_info = {}
-        for c in cls.__mro__:
+        # Infos of the nearest class win, e.g. those with defaults updated by update_defaults.
+        for c in reversed(cls.__mro__):
             if issubclass(c, Entity):
                 cls.data_point_info |= c.data_point_info
         cls.child_info: dict[str, EntityList] = {}
@@ -192,7 +294,6 @@ class Entity:
                 cls.child_info[k] = v
                 if hasattr(cls, k):
                     delattr(cls, k)
-        cls.cached_data_point_model = {}
 
     def __init__(
         self,
@@ -202,6 +303,9 @@ class Entity:
         self.parent: Optional[Entity] = parent
         self._used_data_points: set[str] = set()
         self.uses = set()
+        self._compiled_models: dict[tuple, tuple[Type[BaseModel], bool]] = {}
+        self._fingerprint: Optional[tuple[int, str]] = None
+        self._path_index: Optional[PathIndex] = None
 
     @classmethod
     def many(cls, *args, **kwargs) -> EntityList:
@@ -220,6 +324,52 @@ class Entity:
             unique_name = self.name
         return unique_name
 
+    @property
+    def type_name(self) -> str:
+        """Name of the asset type, without the prefix of the parents."""
+        return self.name.split("_")[-1]
+
+    def fingerprint(self) -> str:
+        """
+        Hash of the structure of the subtree starting from current entity, the same in every process.
+        Entities with the same fingerprint compile to the same Pydantic model.
+        """
+        if (
+            self._fingerprint is None
+            or self._fingerprint[0] != Entity._defaults_revision
+        ):
+            data_points = tuple(
+                (
+                    k,
+                    self._data_point_signature(k),
+                    repr(self.data_point_info[k].default),
+                )
+                for k in sorted(self._used_data_points)
+            )
+            children = tuple(
+                (
+                    name,
+                    tuple(self.child_info[name].ids or ()),
+                    self.children[name].fingerprint(),
+                )
+                for name in sorted(self.children)
+            )
+            self._fingerprint = (
+                Entity._defaults_revision,
+                _short_hash(repr((self.type_name, data_points, children))),
+            )
+        return self._fingerprint[1]
+
+    def _data_point_signature(self, dp_name: str) -> str:
+        dp_info = self.data_point_info[dp_name]
+        return repr(
+            (
+                dp_info.__class__.__name__,
+                _type_signature(dp_info.type),
+                dp_info.unit,
+            )
+        )
+
     def _parse_use_yaml(self, d, prefix="") -> Generator[str, None, None]:
         if isinstance(d, list):
             for item in d:
@@ -253,15 +403,28 @@ class Entity:
                     self._used_data_points.add(path)
                 elif path in self.child_info and path not in self.children:
                     self.children[path] = self.child_info[path].new_entity(self)
+        self._clear_compiled()
         return self
 
+    def _clear_compiled(self) -> None:
+        """Drop compiled artifacts of this entity and all its ancestors, as their trees have changed."""
+        entity = self
+        while entity is not None:
+            entity._compiled_models.clear()
+            entity._fingerprint = None
+            entity._path_index = None
+            entity = entity.parent
+
     @classmethod
     def update_defaults(cls, **defaults):
+        # The infos are shared with the base classes, which must keep their defaults.
         for key, value in defaults.items():
+            cls.data_point_info[key] = copy(cls.data_point_info[key])
             cls.data_point_info[key].default = value
+        Entity._defaults_revision += 1
 
     def _create_date_points_model(
-        self, dp_category: Type[DataPoint], hide_dp_values: bool
+        self, name: str, dp_category: Type[DataPoint], hide_dp_values: bool
     ) -> tuple[Optional[Type[BaseModel]], bool]:
         """Dynamically generate Pydantic model for all data points in the entity."""
         info = {
@@ -274,18 +437,7 @@ class Entity:
         sub_models: dict[str, tuple[type, Any]] = {}
         is_optional = True
         for dp_name, dp_info in info.items():
-            dp_model_name = f"{self.name}_{dp_name}"
-            if hide_dp_values:
-                dp_type = dict
-            else:
-                model_cache = self.__class__.cached_data_point_model
-                if dp_model_name not in model_cache:
-                    model_cache[dp_model_name] = type(
-                        f"{self.name}_{dp_name}",
-                        (DataPoint[dp_info.type],),
-                        dict(_unit=dp_info.unit),
-                    )
-                dp_type = model_cache[dp_model_name]
+            dp_type = dict if hide_dp_values else self.data_point_model(dp_name)
             if dp_info.default is not None and not hide_dp_values:
                 sub_models[camel_to_snake(dp_name)] = Optional[
                     dp_type
@@ -294,10 +446,29 @@ class Entity:
                 is_optional = False
                 sub_models[camel_to_snake(dp_name)] = dp_type, ...
         return (
-            create_model(f"{self.unique_name}_{dp_category.__name__}", **sub_models),
+            create_model(f"{name}_{dp_category.__name__}", **sub_models),
             is_optional,
         )
 
+    def data_point_model(self, dp_name: str) -> Type[DataPoint]:
+        """Pydantic model of a data point of the entity, shared by all entities of the same type."""
+        dp_info = self.data_point_info[dp_name]
+        model_cache = Entity.cached_data_point_model
+        dp_model_key = _short_hash(
+            repr((self.type_name, dp_name, self._data_point_signature(dp_name)))
+        )
+        if dp_model_key not in model_cache:
+            return _cache_model(
+                model_cache,
+                dp_model_key,
+                type(
+                    f"{self.type_name}_{dp_name}_{dp_model_key}",
+                    (DataPoint[dp_info.type],),
+                    dict(_unit=dp_info.unit),
+                ),
+            )
+        return model_cache[dp_model_key]
+
     def _create_entities_model(
         self, hide_dp_values: bool, require_all_children: bool
     ) -> tuple[dict[str, tuple[type, Any]], bool]:
@@ -308,13 +479,7 @@ class Entity:
             sub_model_list_values, sub_is_optional = ins._model(
                 hide_dp_values=hide_dp_values, require_all_children=require_all_children
             )
-            child_info = self.child_info[name]
-            if child_info.ids:
-                sub_model_list = dict[
-                    Literal[tuple(child_info.ids)], sub_model_list_values
-                ]
-            else:
-                sub_model_list = dict[str, sub_model_list_values]
+            sub_model_list = dict[self.child_info[name].key_type, sub_model_list_values]
             if sub_is_optional and not require_all_children:
                 fields[camel_to_snake(name)] = Optional[sub_model_list], {}
             else:
@@ -326,12 +491,38 @@ class Entity:
         self, hide_dp_values: bool, require_all_children: bool
     ) -> tuple[Type[BaseModel], bool]:
         """Generate a complete Pydantic model for a model tree staring from current entity."""
+        key = (
+            frozenset(self.uses),
+            hide_dp_values,
+            require_all_children,
+            Entity._defaults_revision,
+        )
+        if key not in self._compiled_models:
+            shared_key = _short_hash(
+                f"{self.fingerprint()}:{hide_dp_values}:{require_all_children}"
+            )
+            if shared_key not in Entity._shared_models:
+                _cache_model(
+                    Entity._shared_models,
+                    shared_key,
+                    self._compile_model(
+                        f"{self.type_name}_{shared_key}",
+                        hide_dp_values=hide_dp_values,
+                        require_all_children=require_all_children,
+                    ),
+                )
+            self._compiled_models[key] = Entity._shared_models[shared_key]
+        return self._compiled_models[key]
+
+    def _compile_model(
+        self, name: str, hide_dp_values: bool, require_all_children: bool
+    ) -> tuple[Type[BaseModel], bool]:
         fields, is_optional = self._create_entities_model(
             hide_dp_values=hide_dp_values, require_all_children=require_all_children
         )
         for dp_category in DataPointInfo.SUB_CLASSES:
             dp_model, sub_is_optional = self._create_date_points_model(
-                dp_category, hide_dp_values=hide_dp_values
+                name, dp_category, hide_dp_values=hide_dp_values
             )
             if dp_model:
                 if sub_is_optional:
@@ -341,7 +532,7 @@ class Entity:
                 else:
                     fields |= {camel_to_snake(dp_category.__name__): (dp_model, ...)}
                 is_optional &= sub_is_optional
-        return create_model(self.unique_name, config=self.Config, **fields), is_optional
+        return create_model(name, __config__=self.Config, **fields), is_optional
 
     def model(self, hide_dp_values: bool = False, require_all_children: bool = True):
         return self._model(
@@ -353,34 +544,44 @@ class Entity:
 
     def data_points(self, used_only: bool = True) -> list[str]:
         if used_only:
-            return list(self._used_data_points)
+            # In the order of definition, as the set of used data points has no stable order.
+            return [k for k in self.data_point_info if k in self._used_data_points]
         else:
             return list(self.data_point_info.keys())
 
+    def path_index(self) -> PathIndex:
+        """Index of all required paths in the tree, built once until the tree changes."""
+        if self._path_index is None:
+            self._path_index = PathIndex(self)
+        return self._path_index
+
     def query_data_point_info(self, path: str | list[str]):
-        path = split_path(path)
+        node = self.path_index().lookup(path)
+        if node is not None and node.is_data_point:
+            return node.info
+        return self._search_data_point_info(split_path(path))
+
+    def _search_data_point_info(self, path: list[str]):
+        """Search also the data points which are not required."""
         if path:
             if path[0] in self.children.keys():
-                return self.children[path[0]].query_data_point_info(path[1:])
+                return self.children[path[0]]._search_data_point_info(path[1:])
             elif path[0] in self.data_point_info:
                 return self.data_point_info[path[0]]
 
     def default_values(self, path: str | list[str]):
-        path = split_path(path)
-        if path:
-            if path[0] in self.children.keys():
-                return self.children[path[0]].default_values(path[1:])
-            else:
-                return {}
-        else:
-            res = {}
-            for k in self._used_data_points:
-                dp_info = self.data_point_info[k]
-                if dp_info.default:
-                    res[k] = dp_info.default_object() | dict(
-                        type=dp_info.__class__.__name__
-                    )
-            return res
+        node = self.path_index().lookup(path)
+        if node is None or node.is_data_point:
+            return {}
+        entity = node.entity
+        res = {}
+        for k in entity._used_data_points:
+            dp_info = entity.data_point_info[k]
+            if dp_info.default:
+                res[k] = dp_info.default_object() | dict(
+                    type=dp_info.__class__.__name__
+                )
+        return res
 
     @classmethod
     def use_selection_model(cls, name_prefix=""):
@@ -429,18 +630,17 @@ class Entity:
         self, pattern_or_uses: str | dict | Path, paths: list[str] = None
     ) -> Iterable[str]:
         if isinstance(pattern_or_uses, str):
-            return filter(
-                partial(self.path_match, pattern_or_uses),
-                paths or self.all_required_paths(),
-            )
+            if not paths:
+                return self.path_index().match(pattern_or_uses)
+            return filter(partial(self.path_match, pattern_or_uses), paths)
         else:
             valid_paths = set(decouple_uses(pattern_or_uses))
-            return filter(valid_paths.__contains__, paths or self.all_required_paths())
+            return filter(valid_paths.__contains__, paths or self.path_index().paths)
 
     @staticmethod
     def path_match(pattern: str, path: str) -> bool:
         if pattern is not None:
-            return bool(re.fullmatch(format_regex(pattern), path))
+            return bool(compile_pattern(pattern).fullmatch(path))
         else:
             return True
 
@@ -515,14 +715,17 @@ class Entity:
             asset_library_name=asset_library_name,
             **children,
         )
+        return entity._many_from_definition(defs)
+
+    @classmethod
+    def _many_from_definition(cls, defs: dict) -> EntityList:
+        """Create the entity list according to the meta entries ($number, $ids, $defaults) of a definition"""
         list_args = {}
         if f"{YAML_META_CHAR}number" in defs:
             number = defs[f"{YAML_META_CHAR}number"]
             if isinstance(number, str) and "-" in number:
                 min_num, max_num = number.split("-")
-                list_args["faking_number"] = partial(
-                    randint, int(min_num), int(max_num)
-                )
+                list_args["faking_number"] = int(min_num), int(max_num)
             else:
                 list_args["faking_number"] = int(number)
         else:
@@ -530,8 +733,66 @@ class Entity:
         if f"{YAML_META_CHAR}ids" in defs:
             list_args["ids"] = defs[f"{YAML_META_CHAR}ids"]
         if f"{YAML_META_CHAR}defaults" in defs:
-            entity.update_defaults(**defs[f"{YAML_META_CHAR}defaults"])
-        return entity.many(**list_args)
+            cls.update_defaults(**defs[f"{YAML_META_CHAR}defaults"])
+        entity_list = cls.many(**list_args)
+        entity_list.definition = {
+            k: v
+            for k, v in defs.items()
+            if k.startswith(YAML_META_CHAR) and k != f"{YAML_META_CHAR}type"
+        }
+        return entity_list
+
+    @classmethod
+    def compile_definition(cls) -> dict:
+        """
+        Serialise the resolved class tree, with base classes already looked up in the asset library.
+        Only entity lists created from a scenario definition can be serialised.
+        """
+        children = {}
+        for k, v in cls.child_info.items():
+            if v.definition is None:
+                raise ValueError(
+                    f"{cls.__name__}.{k} is not created from a scenario definition."
+                )
+            children[k] = dict(meta=v.definition, entity=v.cls.compile_definition())
+        return dict(
+            name=cls.__name__,
+            bases=[[b.__module__, b.__qualname__] for b in cls.__bases__],
+            children=children,
+        )
+
+    @classmethod
+    def create_from_compiled(cls, compiled: dict) -> Type["Entity"]:
+        """Rebuild the entity class from the result of compile_definition."""
+        bases = []
+        for module_name, qualname in compiled["bases"]:
+            base = import_module(module_name)
+            for attr in qualname.split("."):
+                base = getattr(base, attr)
+            bases.append(base)
+        ann = {
+            k: cls.create_from_compiled(v["entity"])._many_from_definition(v["meta"])
+            for k, v in compiled["children"].items()
+        }
+        return type(compiled["name"], tuple(bases), dict(__annotations__=ann))
+
+    def required_tree(self) -> dict:
+        """Serialise the required children and data points, as set up by requires()."""
+        return dict(
+            uses=list(self.uses),
+            data_points=list(self._used_data_points),
+            children={k: v.required_tree() for k, v in self.children.items()},
+        )
+
+    def restore_required(self, tree: dict) -> "Entity":
+        """Restore the result of required_tree without replaying the paths."""
+        self.uses = set(tree["uses"])
+        self._used_data_points = set(tree["data_points"])
+        self.children = {}
+        for k, v in tree["children"].items():
+            self.children[k] = self.child_info[k].new_entity(self).restore_required(v)
+        self._clear_compiled()
+        return self
 
     def to_compact(self, data):
         res = {
@@ -0,0 +1,77 @@
+from pathlib import Path
+from typing import Callable
+
+import yaml
+from fastapi import FastAPI
+
+from .scenario import Scenario
+
+
+def load_sites(config: Path) -> dict[str, tuple[Scenario, dict]]:
+    """
+    Load the scenarios of the sites in a YAML config, mapping each site to its scenario, uses and options, e.g.:
+
+        site-a:
+          scenario: scenario.yaml
+          uses: [use-srv1.yaml, use-srv2.yaml]
+          reference: reference-a.yaml
+
+    Relative paths are relative to the config. Return the scenario and the remaining options of every site.
+    Sites with the same scenario definition share its entity classes (see Scenario.from_yaml).
+    """
+    sites = {}
+    for site, options in yaml.safe_load(config.open()).items():
+        options = dict(options)
+        scenario_path = config.parent / options.pop("scenario")
+        uses = [config.parent / use for use in options.pop("uses", [])]
+        if "reference" in options:
+            options["reference"] = config.parent / options["reference"]
+        sites[site] = Scenario.from_yaml(scenario_path, *uses, shared=True), options
+    return sites
+
+
+def site_options(site: str, options: dict, defaults: dict) -> dict:
+    """Return the defaults overridden by the options of a site, raising ValueError for options without a default."""
+    unknown = sorted(set(options) - set(defaults))
+    if unknown:
+        raise ValueError(f"Unknown options of site {site}: {', '.join(unknown)}")
+    return defaults | options
+
+
+class MultiSiteApp(FastAPI):
+    def __init__(
+        self,
+        sites: dict[str, FastAPI],
+        *args,
+        **kwargs,
+    ):
+        """Serve the app of every site under /{site}, e.g., a MockApp or RestfulValidationApp per site."""
+        super(MultiSiteApp, self).__init__(*args, **kwargs)
+        self.sites: dict[str, FastAPI] = sites
+        for site, app in sites.items():
+            self.mount(f"/{site}", app)
+
+        @self.get("/sites")
+        async def list_sites():
+            return list(self.sites)
+
+    @classmethod
+    def from_config(
+        cls,
+        config: Path,
+        create_app: Callable[[str, Scenario, dict], FastAPI],
+        *args,
+        **kwargs,
+    ) -> "MultiSiteApp":
+        """
+        Create the app of every site in config (see load_sites) by create_app(site, scenario, options).
+        create_app should apply the options, or reject those it does not know (see site_options).
+        """
+        return cls(
+            {
+                site: create_app(site, scenario, options)
+                for site, (scenario, options) in load_sites(config).items()
+            },
+            *args,
+            **kwargs,
+        )
@@ -0,0 +1,145 @@
+import hashlib
+import multiprocessing
+from multiprocessing.pool import Pool
+from typing import Callable, Optional
+
+from .mock import MockedEntity
+from .registry import PathRegistry
+from .utils import PATH_SEP, camel_to_snake
+
+# Root of the tree generated by a worker, set when the worker is forked
+_root: Optional[MockedEntity] = None
+# Suffix of the paths from which the seeds of the value generators of subtrees are derived
+VALUES = "$values"
+
+
+def subtree_seed(seed: int, path: str) -> int:
+    """Seed of the subtree at path, derived from the seed of the tree"""
+    digest = hashlib.blake2b(f"{seed}:{path}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def start_pool(root: MockedEntity, processes: Optional[int]) -> Optional[Pool]:
+    """
+    Fork the workers generating the subtrees of root, or return None if there is nothing to parallelize.
+    The pool should be started before any threads, e.g. before serving, and can be reused for every generation.
+    """
+    if (
+        processes is None
+        or processes <= 1
+        or "fork" not in multiprocessing.get_all_start_methods()
+    ):
+        return None
+    return multiprocessing.get_context("fork").Pool(
+        processes, initializer=_init_worker, initargs=(root,)
+    )
+
+
+def _init_worker(root: MockedEntity) -> None:
+    global _root
+
+    _root = root
+
+
+def _generate_subtree(
+    entity: MockedEntity, seed: int, include_data_points: bool, use_default: bool
+) -> None:
+    # The numbers of children and the values are drawn from the generators of the tree, seeded apart so that
+    # the structure is the same whether the data points are generated or not.
+    entity.random.seed(subtree_seed(seed, entity.path))
+    entity.values.seed(subtree_seed(seed, f"{entity.path}{PATH_SEP}{VALUES}"))
+    entity.generate(
+        regenerate=False,
+        include_data_points=include_data_points,
+        change_attrs=False,
+        use_default=use_default,
+    )
+
+
+def _generate_in_worker(args: tuple) -> tuple[dict, list]:
+    entity_type, uuid, seed, include_data_points, use_default = args
+    # Only the paths of this subtree are registered, instead of piling up with every generation.
+    _root.rebind(PathRegistry())
+    prototypes = {camel_to_snake(k): v for k, v in _root.prototype.children.items()}
+    entity = _root._create_child(entity_type, prototypes[entity_type], uuid)
+    _generate_subtree(entity, seed, include_data_points, use_default)
+    values = (
+        [
+            (dp.cur_value, dp.gen_timestamp)
+            for _, dp in entity.list_data_points(skip_default=False)
+        ]
+        if include_data_points
+        else []
+    )
+    return entity.skeleton(), values
+
+
+def generate_seeded(
+    root: MockedEntity,
+    seed: int,
+    pool: Optional[Pool] = None,
+    include_data_points: bool = True,
+    use_default: bool = True,
+    keep: Optional[Callable[[MockedEntity], bool]] = None,
+) -> None:
+    """
+    (Re)generate the tree of root, so that the same seed always gives the same tree.
+    The tree must have its own random generators (see MockedItem.random and MockedItem.values).
+    If keep is given, only the top-level subtrees it keeps are generated with data points and kept in the tree,
+    the others are generated without data points for consistent uuids, then removed.
+
+    The children of root are generated first, then every top-level subtree is generated with a seed
+    derived from its path. Uuids are numbered by the counters of the tree in the order of the subtrees.
+    With a pool (see start_pool), the subtrees are generated in parallel by its workers, which send back
+    the skeletons and values of the subtrees to be rebuilt in this process.
+    """
+    root.random.seed(subtree_seed(seed, root.path))
+    root.values.seed(subtree_seed(seed, f"{root.path}{PATH_SEP}{VALUES}"))
+    root.generate(
+        regenerate=True,
+        include_data_points=include_data_points,
+        change_attrs=True,
+        use_default=use_default,
+        recursive=False,
+    )
+    subtrees = [c for v in root.children.values() for c in v.values()]
+    with_data_points = [
+        include_data_points and (keep is None or keep(c)) for c in subtrees
+    ]
+    if pool is None or len(subtrees) <= 1:
+        for entity, _include_data_points in zip(subtrees, with_data_points):
+            _generate_subtree(entity, seed, _include_data_points, use_default)
+    else:
+        _generate_in_pool(pool, subtrees, seed, with_data_points, use_default)
+    if keep is not None:
+        for k, v in root.children.items():
+            root.children[k] = {uuid: c for uuid, c in v.items() if keep(c)}
+        root.mark_changed()
+    # Values drawn afterwards must not depend on how the subtrees were generated.
+    root.values.seed(subtree_seed(seed, f"{root.path}{PATH_SEP}"))
+
+
+def _generate_in_pool(
+    pool: Pool,
+    subtrees: list[MockedEntity],
+    seed: int,
+    with_data_points: list[bool],
+    use_default: bool,
+) -> None:
+    results = pool.imap(
+        _generate_in_worker,
+        [
+            (c.entity_type, c.uuid, seed, _include_data_points, use_default)
+            for c, _include_data_points in zip(subtrees, with_data_points)
+        ],
+    )
+    for entity, _include_data_points, (skeleton, values) in zip(
+        subtrees, with_data_points, results
+    ):
+        entity.build(skeleton)
+        if _include_data_points:
+            for (_, dp), (value, timestamp) in zip(
+                entity.list_data_points(skip_default=False), values
+            ):
+                dp.cur_value = value
+                dp.gen_timestamp = timestamp
@@ -0,0 +1,284 @@
+import asyncio
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Optional
+
+import httpx
+from rich.live import Live
+from rich.table import Table
+
+# Upper bounds (in milliseconds) of the buckets of latency histograms, the last bucket is unbounded.
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class LatencyHistogram:
+    """Histogram of the latencies of requests of a stage (fetch or push), with the points and errors"""
+
+    def __init__(self):
+        self.counts: list[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.requests: int = 0
+        self.errors: int = 0
+        self.points: int = 0
+
+    def record(self, latency: float, points: int, ok: bool = True) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, latency * 1000)] += 1
+        self.requests += 1
+        if ok:
+            self.points += points
+        else:
+            self.errors += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound (in milliseconds) of the bucket of the q-th percentile, inf for the unbounded bucket"""
+        if not self.requests:
+            return None
+        rank, seen = q / 100 * self.requests, 0
+        for bound, count in zip((*LATENCY_BUCKETS, float("inf")), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Pusher:
+    """
+    Load generator fetching data points from a mocking service and pushing them to a receiver, e.g., the
+    validation service, with up to concurrency requests in flight over pooled connections.
+
+    Every cycle, the data points of the source are listed, then fetched and pushed in batches of batch_size,
+    paced at rate points per second if given. Batches are fetched with POST /points/batch and pushed with
+    POST /points/batch if the source and the receiver support it, otherwise one request is sent per data point.
+    A transport, e.g. an httpx.ASGITransport, can be given to send the requests to an app in this process.
+    """
+
+    def __init__(
+        self,
+        source_url: str,
+        receiver_url: str,
+        concurrency: int = 16,
+        rate: Optional[float] = None,
+        batch_size: int = 100,
+        interval: float = 60,
+        timeout: float = 30,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.source_url: str = source_url.rstrip("/")
+        self.receiver_url: str = receiver_url.rstrip("/")
+        self.concurrency: int = concurrency
+        self.rate: Optional[float] = rate
+        self.batch_size: int = batch_size
+        self.interval: float = interval
+        self.timeout: float = timeout
+        self.transport: Optional[httpx.AsyncBaseTransport] = transport
+        self.stats: dict[str, LatencyHistogram] = dict(
+            fetch=LatencyHistogram(), push=LatencyHistogram()
+        )
+        self.started: Optional[float] = None
+        self.source_batch: bool = False
+        self.receiver_batch: bool = False
+        # Requests in flight, bounded by the connections of the pool
+        self._requests: Optional[asyncio.Semaphore] = None
+        # Batches in flight, so that fetched data points do not pile up waiting to be pushed
+        self._batches: Optional[asyncio.Semaphore] = None
+        self._next_send: float = 0.0
+
+    async def run(self, cycles: Optional[int] = None, live: bool = True) -> None:
+        """Push all data points every interval seconds, for the given number of cycles or forever"""
+        limits = httpx.Limits(
+            max_connections=self.concurrency,
+            max_keepalive_connections=self.concurrency,
+        )
+        self._requests = asyncio.Semaphore(self.concurrency)
+        self._batches = asyncio.Semaphore(self.concurrency)
+        async with httpx.AsyncClient(
+            limits=limits, timeout=self.timeout, transport=self.transport
+        ) as client:
+            # The mocking service rejects empty selectors, so the source is probed with a data point.
+            paths = await self._list_paths(client)
+            self.source_batch = await self._supports_batch(
+                client, f"{self.source_url}/points/batch", dict(paths=paths[:1])
+            )
+            self.receiver_batch = await self._supports_batch(
+                client, f"{self.receiver_url}/points/batch", []
+            )
+            self.started = self._next_send = time.perf_counter()
+            view = Live(self.summary(), refresh_per_second=2) if live else None
+            with view or nullcontext():
+                refreshing = (
+                    asyncio.ensure_future(self._refresh(view)) if view else None
+                )
+                try:
+                    cycle = 0
+                    while cycles is None or cycle < cycles:
+                        if cycle:
+                            await asyncio.sleep(self.interval)
+                            # The tree of the source may change between cycles.
+                            paths = await self._list_paths(client)
+                        await self.push_all(client, paths)
+                        cycle += 1
+                finally:
+                    if view is not None:
+                        refreshing.cancel()
+                        view.update(self.summary())
+
+    async def _list_paths(
+        self, client: httpx.AsyncClient, retries: int = 5
+    ) -> list[str]:
+        """Paths of all data points of the source, retried if the response is malformed, e.g., by a load profile"""
+        for attempt in range(retries):
+            r = await client.get(f"{self.source_url}/points/")
+            r.raise_for_status()
+            try:
+                return r.json()
+            except ValueError:
+                if attempt == retries - 1:
+                    raise
+
+    @staticmethod
+    async def _supports_batch(client: httpx.AsyncClient, url: str, empty) -> bool:
+        try:
+            r = await client.post(url, json=empty)
+        except httpx.HTTPError:
+            return False
+        return r.is_success
+
+    async def _refresh(self, view: Live) -> None:
+        while True:
+            await asyncio.sleep(0.5)
+            view.update(self.summary())
+
+    async def push_all(self, client: httpx.AsyncClient, paths: list[str]) -> None:
+        """Fetch and push the data points at paths once, in concurrent batches"""
+        tasks = []
+        for i in range(0, len(paths), self.batch_size):
+            batch = paths[i : i + self.batch_size]
+            await self._pace(len(batch))
+            await self._batches.acquire()
+            task = asyncio.ensure_future(self._forward(client, batch))
+            task.add_done_callback(lambda _: self._batches.release())
+            tasks.append(task)
+        await asyncio.gather(*tasks)
+
+    async def _pace(self, points: int) -> None:
+        if self.rate is None:
+            return
+        now = time.perf_counter()
+        if self._next_send > now:
+            await asyncio.sleep(self._next_send - now)
+        self._next_send = max(self._next_send, now) + points / self.rate
+
+    async def _forward(self, client: httpx.AsyncClient, paths: list[str]) -> None:
+        items = await self._fetch(client, paths)
+        if items:
+            await self._push(client, items)
+
+    async def _timed(
+        self, stage: str, points: int, request, url: str, decode: bool = False, **kwargs
+    ):
+        """
+        Send a request, once less than concurrency requests are in flight, and record its latency in the
+        histogram of stage. Return the response, or its JSON if decode, or None if the request failed or
+        the JSON is malformed.
+        """
+        async with self._requests:
+            start = time.perf_counter()
+            try:
+                r = await request(url, **kwargs)
+                ok = r.is_success
+                if ok and decode:
+                    r = r.json()
+            except (httpx.HTTPError, ValueError):
+                r, ok = None, False
+            self.stats[stage].record(time.perf_counter() - start, points, ok)
+        return r if ok else None
+
+    async def _fetch(self, client: httpx.AsyncClient, paths: list[str]) -> list[dict]:
+        if self.source_batch:
+            items = await self._timed(
+                "fetch",
+                len(paths),
+                client.post,
+                f"{self.source_url}/points/batch",
+                decode=True,
+                json=dict(paths=paths),
+            )
+            return [i for i in items if "result" in i] if items is not None else []
+        results = await asyncio.gather(
+            *(
+                self._timed(
+                    "fetch",
+                    1,
+                    client.get,
+                    f"{self.source_url}/points/{path}",
+                    decode=True,
+                )
+                for path in paths
+            )
+        )
+        return [
+            dict(path=path, result=result)
+            for path, result in zip(paths, results)
+            if result is not None
+        ]
+
+    async def _push(self, client: httpx.AsyncClient, items: list[dict]) -> None:
+        if self.receiver_batch:
+            await self._timed(
+                "push",
+                len(items),
+                client.post,
+                f"{self.receiver_url}/points/batch",
+                json=items,
+            )
+            return
+        await asyncio.gather(
+            *(
+                self._timed(
+                    "push",
+                    1,
+                    client.post,
+                    f"{self.receiver_url}/points/{item['path']}",
+                    json=item["result"],
+                )
+                for item in items
+            )
+        )
+
+    def summary(self) -> Table:
+        """Table of the throughput and the latency histogram of every stage"""
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        table = Table(
+            title=f"Pushing {self.source_url} -> {self.receiver_url} ({elapsed:.0f}s)"
+        )
+        table.add_column("Latency")
+        for stage in self.stats:
+            table.add_column(stage.capitalize(), justify="right")
+        bounds = [f"<= {b} ms" for b in LATENCY_BUCKETS] + [
+            f"> {LATENCY_BUCKETS[-1]} ms"
+        ]
+        for i, bound in enumerate(bounds):
+            table.add_row(bound, *(str(h.counts[i]) for h in self.stats.values()))
+        table.add_section()
+        for q in (50, 90, 99):
+            table.add_row(
+                f"p{q} (ms)",
+                *(_format_ms(h.percentile(q)) for h in self.stats.values()),
+            )
+        table.add_row("Requests", *(str(h.requests) for h in self.stats.values()))
+        table.add_row("Errors", *(str(h.errors) for h in self.stats.values()))
+        table.add_row("Points", *(str(h.points) for h in self.stats.values()))
+        table.add_row(
+            "Points/s",
+            *(
+                f"{h.points / elapsed:.1f}" if elapsed else "-"
+                for h in self.stats.values()
+            ),
+        )
+        return table
+
+
+def _format_ms(value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    return f"<= {value:g}" if value != float("inf") else f"> {LATENCY_BUCKETS[-1]}"
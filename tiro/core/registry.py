@@ -0,0 +1,130 @@
+import sys
+from typing import Optional, Sequence
+
+from .model import DataPointInfo
+from .utils import PATH_SEP
+
+PathLike = int | str | Sequence[str]
+
+
+class PathRegistry:
+    """
+    Registry of asset and data point paths.
+    Every path gets a stable integer ID in the order of registration, and keeps its interned,
+    pre-split components. Type paths and tags are computed once per path and then reused.
+    The parts, type paths and tags of paths not registered, e.g. requested by clients, are computed
+    without registering them, so that the registry does not grow with them.
+    """
+
+    ROOT = 0
+
+    def __init__(self):
+        self._ids: dict[str, int] = {}
+        self._paths: list[str] = []
+        self._parts: list[tuple[str, ...]] = []
+        self._type_paths: list[Optional[str]] = []
+        self._tags: list[Optional[dict]] = []
+        self._add("", ())
+
+    def _add(self, path: str, parts: tuple[str, ...]) -> int:
+        path_id = len(self._paths)
+        path = sys.intern(path)
+        self._ids[path] = path_id
+        self._paths.append(path)
+        self._parts.append(parts)
+        self._type_paths.append(None)
+        self._tags.append(None)
+        return path_id
+
+    def register(self, path: PathLike) -> int:
+        """Return the ID of the path, registering it if it is new."""
+        if isinstance(path, int):
+            return path
+        if not isinstance(path, str):
+            path = PATH_SEP.join(path)
+        path_id = self._ids.get(path)
+        if path_id is None:
+            parts = tuple(sys.intern(c) for c in path.split(PATH_SEP)) if path else ()
+            path_id = self._add(path, parts)
+        return path_id
+
+    def child(self, parent: PathLike, *components: str) -> int:
+        """Return the ID of a path under the parent, without splitting or parsing the parent again."""
+        parent_id = self.register(parent)
+        parent_path = self._paths[parent_id]
+        tail = PATH_SEP.join(components)
+        path = f"{parent_path}{PATH_SEP}{tail}" if parent_path else tail
+        path_id = self._ids.get(path)
+        if path_id is None:
+            parts = self._parts[parent_id] + tuple(sys.intern(c) for c in components)
+            path_id = self._add(path, parts)
+        return path_id
+
+    def get_id(self, path: str | Sequence[str]) -> Optional[int]:
+        """Return the ID of the path, or None if it is not registered."""
+        if not isinstance(path, str):
+            path = PATH_SEP.join(path)
+        return self._ids.get(path)
+
+    def __getitem__(self, path_id: int) -> str:
+        return self._paths[path_id]
+
+    def __contains__(self, path: str | Sequence[str]) -> bool:
+        return self.get_id(path) is not None
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def _find(self, path: PathLike) -> Optional[int]:
+        return path if isinstance(path, int) else self.get_id(path)
+
+    def parts(self, path: PathLike) -> tuple[str, ...]:
+        path_id = self._find(path)
+        if path_id is not None:
+            return self._parts[path_id]
+        if isinstance(path, str):
+            return tuple(path.split(PATH_SEP)) if path else ()
+        return tuple(path)
+
+    def is_data_point(self, path: PathLike) -> bool:
+        return self._is_data_point(self.parts(path))
+
+    @staticmethod
+    def _is_data_point(parts: tuple[str, ...]) -> bool:
+        return len(parts) >= 2 and parts[-2] in DataPointInfo.SUB_CLASS_NAMES
+
+    def type_path(self, path: PathLike) -> str:
+        """Path with the uuids removed, e.g., Room.Rack.Temperature for Room.room_0.Rack.rack_0.Telemetry.Temperature"""
+        path_id = self._find(path)
+        if path_id is None:
+            return self._type_path(self.parts(path))
+        type_path = self._type_paths[path_id]
+        if type_path is None:
+            type_path = sys.intern(self._type_path(self._parts[path_id]))
+            self._type_paths[path_id] = type_path
+        return type_path
+
+    @classmethod
+    def _type_path(cls, parts: tuple[str, ...]) -> str:
+        if cls._is_data_point(parts):
+            return PATH_SEP.join(parts[0 : len(parts) - 2 : 2] + parts[-1:])
+        return PATH_SEP.join(parts[0::2])
+
+    def tags(self, path: PathLike) -> dict:
+        """Tags of a data point path, the same as Scenario.data_point_path_to_tags"""
+        path_id = self._find(path)
+        if path_id is None:
+            return self._tags_of(self.parts(path))
+        tags = self._tags[path_id]
+        if tags is None:
+            tags = self._tags[path_id] = self._tags_of(self._parts[path_id])
+        return dict(tags)
+
+    @classmethod
+    def _tags_of(cls, parts: tuple[str, ...]) -> dict:
+        tags = dict(path=cls._type_path(parts), asset_path=PATH_SEP.join(parts))
+        for i in range(0, len(parts) - 2, 2):
+            tags[parts[i]] = parts[i + 1]
+        if cls._is_data_point(parts):
+            tags |= dict(type=parts[-2], field=parts[-1])
+        return tags
@@ -0,0 +1,162 @@
+import json
+import math
+import time
+from datetime import datetime, timedelta
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+from .utils import concat_path, parse_timestamp
+
+# A replayed data point: the time it was recorded, its path, and its result in the data collection protocol
+Record = tuple[datetime, str, dict]
+
+
+def _read_ndjson(path: Path) -> Iterator[dict]:
+    with path.open() as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _read_csv(path: Path, chunk_size: int) -> Iterator[dict]:
+    import pandas as pd
+
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        yield from chunk.astype(object).where(chunk.notna(), None).to_dict(
+            orient="records"
+        )
+
+
+def _read_parquet(path: Path, chunk_size: int) -> Iterator[dict]:
+    if find_spec("pyarrow") is None:
+        raise RuntimeError("Reading Parquet files requires pyarrow.")
+    import pyarrow.dataset as ds
+
+    # Batches are read one at a time, so recordings larger than memory can be replayed.
+    dataset = ds.dataset(path, format="parquet", partitioning="hive")
+    for batch in dataset.to_batches(batch_size=chunk_size):
+        yield from batch.to_pylist()
+
+
+def _row_to_item(row: dict) -> dict:
+    """
+    Convert a row of a CSV or Parquet recording to an item of the data collection protocol.
+    Rows are either identified by a name (uuid), or located by asset_path, type and field, as written by
+    tiro mock backfill, or by a full data point path.
+    """
+    value = row.get("value")
+    if isinstance(value, float) and math.isnan(value):
+        value = None
+    if row.get("name") is not None:
+        return dict(name=row["name"], value=value, timestamp=row["timestamp"])
+    if all(row.get(k) is not None for k in ("asset_path", "type", "field")):
+        path = concat_path(row["asset_path"], row["type"], row["field"])
+    else:
+        path = row["path"]
+    result = dict(value=value, timestamp=row["timestamp"])
+    if row.get("unit") is not None:
+        result["unit"] = row["unit"]
+    return dict(path=path, result=result)
+
+
+def read_recording(path: Path, chunk_size: int = 100_000) -> Iterator[dict]:
+    """
+    Stream the items of a recording, in the data collection protocol format ({path, result} or {name, value, timestamp}).
+    The recording is an NDJSON file of items, a CSV file, or a Parquet file or (partitioned) dataset directory.
+    """
+    if path.is_dir() or path.suffix == ".parquet":
+        rows = _read_parquet(path, chunk_size)
+    elif path.suffix == ".csv":
+        rows = _read_csv(path, chunk_size)
+    elif path.suffix in (".ndjson", ".jsonl", ".json"):
+        return _read_ndjson(path)
+    else:
+        raise ValueError(f"Unknown format of recording {path}")
+    return map(_row_to_item, rows)
+
+
+def _timestamp(value) -> tuple[datetime, str]:
+    """The time of a recorded timestamp, in UTC so that all timestamps compare, and the timestamp to serve"""
+    if isinstance(value, datetime):
+        return parse_timestamp(value), value.isoformat()
+    return parse_timestamp(value), value
+
+
+class Replay:
+    """
+    Replay of recorded data points along their original timestamps, sped up by speed.
+
+    The clock of the replay starts at the first recorded timestamp when the replay is first advanced.
+    Records are consumed from the stream as the clock passes their timestamps, keeping only the latest
+    result of every data point, so the recording never has to fit in memory.
+    Items identified by name are located by resolve(name), or kept by their name if it is not resolved.
+    Records of the paths for which is_attribute(path) is true are counted in attributes, so that attributes
+    served from the replay can be invalidated when they change.
+    """
+
+    def __init__(
+        self,
+        items: Iterable[dict],
+        speed: float = 1.0,
+        resolve: Optional[Callable[[str], Optional[str]]] = None,
+        is_attribute: Optional[Callable[[str], bool]] = None,
+    ):
+        if speed <= 0:
+            raise ValueError("The speed of a replay must be positive.")
+        self.speed: float = speed
+        self.resolve = resolve
+        self.is_attribute = is_attribute
+        self.records: Iterator[Record] = map(self._record, items)
+        self.pending: Optional[Record] = next(self.records, None)
+        self.origin: Optional[datetime] = self.pending[0] if self.pending else None
+        self.started: Optional[float] = None
+        # Latest replayed result by path
+        self.current: dict[str, dict] = {}
+        # Number of attribute records consumed
+        self.attributes: int = 0
+
+    def _record(self, item: dict) -> Record:
+        if "path" in item:
+            result = dict(item["result"])
+            if result.get("timestamp") is None:
+                raise ValueError(
+                    f"Item {item['path']} of the recording has no timestamp."
+                )
+            recorded, result["timestamp"] = _timestamp(result["timestamp"])
+            return recorded, item["path"], result
+        if item.get("timestamp") is None:
+            raise ValueError(f"Item {item['name']} of the recording has no timestamp.")
+        recorded, timestamp = _timestamp(item["timestamp"])
+        key = (self.resolve(item["name"]) if self.resolve else None) or item["name"]
+        return recorded, key, dict(value=item["value"], timestamp=timestamp)
+
+    @property
+    def finished(self) -> bool:
+        return self.pending is None
+
+    def now(self, wall_time: Optional[float] = None) -> Optional[datetime]:
+        """The time of the replay, or None if the recording is empty"""
+        if self.origin is None:
+            return None
+        wall_time = time.monotonic() if wall_time is None else wall_time
+        if self.started is None:
+            self.started = wall_time
+        return self.origin + timedelta(seconds=(wall_time - self.started) * self.speed)
+
+    def advance(self, wall_time: Optional[float] = None) -> int:
+        """Consume the records up to the time of the replay. Return the number of records consumed."""
+        now = self.now(wall_time)
+        consumed = 0
+        while self.pending is not None and self.pending[0] <= now:
+            _, key, result = self.pending
+            self.current[key] = result
+            if self.is_attribute is not None and self.is_attribute(key):
+                self.attributes += 1
+            self.pending = next(self.records, None)
+            consumed += 1
+        return consumed
+
+    def get(self, path: str) -> Optional[dict]:
+        """The latest replayed result of the data point, or None if it has not been replayed yet"""
+        return self.current.get(path)
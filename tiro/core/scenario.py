@@ -1,10 +1,18 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+from importlib import import_module
 from pathlib import Path
-from typing import Type, Optional, Generator
+from typing import Type, Optional, Generator, TYPE_CHECKING
 
 from yaml import safe_load
 
 from .mock import Mocker
-from .model import DataPointInfo, Entity
+from .index import PathIndex
+from .model import DataPointInfo, Entity, EntityList
+from .registry import PathRegistry
 from .utils import (
     split_path,
     concat_path,
@@ -15,8 +23,17 @@ from .utils import (
 )
 from .validate import Validator
 
+if TYPE_CHECKING:
+    import numpy as np
+
+# Version of the compiled scenario artifact format, bump it when the format changes.
+ARTIFACT_VERSION = 1
+
 
 class Scenario:
+    # Entity lists created from scenario definitions, by digest of the definition, shared by scenarios loaded with shared.
+    _shared_definitions: dict[str, dict[str, EntityList]] = {}
+
     def __init__(
         self,
         *entities: Entity | Type[Entity],
@@ -32,11 +49,49 @@ class Scenario:
             asset_library_name=asset_library_name,
             **kw_entities,
         )()
+        self.path_registry: PathRegistry = PathRegistry()
+        self._catalog: Optional[tuple[PathIndex, "np.ndarray"]] = None
 
     @classmethod
-    def from_yaml(cls, scenario_data: Path | str, *uses: Path | str):
+    def from_yaml(
+        cls,
+        scenario_data: Path | str,
+        *uses: Path | str,
+        cache_dir: Optional[Path | str] = None,
+        shared: bool = False,
+    ):
+        """
+        Create the scenario from the scenario definition and the uses.
+        If cache_dir (or the environment variable TIRO_CACHE_DIR) is set, the resolved scenario is
+        stored there as a compiled artifact and loaded from it as long as the inputs are unchanged.
+        If shared, the entity classes are reused from an earlier scenario loaded with shared from the same
+        definition, so that many scenarios (e.g., one per site) in a process only differ in their uses.
+        """
         if isinstance(scenario_data, Path):
             scenario_data = scenario_data.open().read()
+        uses = [use.open().read() if isinstance(use, Path) else use for use in uses]
+        if shared:
+            key = cls.digest(scenario_data)
+            if key not in cls._shared_definitions:
+                ins = cls.from_yaml(scenario_data, cache_dir=cache_dir)
+                cls._shared_definitions[key] = dict(ins.root.child_info)
+            ins = cls(**cls._shared_definitions[key])
+            for use in uses:
+                ins.requires(yaml=use)
+            return ins
+        cache_dir = cache_dir or os.environ.get("TIRO_CACHE_DIR")
+        artifact_path = None
+        if cache_dir:
+            artifact_path = Path(cache_dir) / f"{cls.digest(scenario_data, *uses)}.json"
+            if artifact_path.exists():
+                try:
+                    ins = cls.from_artifact(json.loads(artifact_path.read_text()))
+                except Exception as e:
+                    # A truncated or corrupted artifact is recompiled rather than failing the start.
+                    logging.warning(f"Ignoring invalid artifact {artifact_path}: {e!r}")
+                    ins = None
+                if ins is not None:
+                    return ins
         defs = safe_load(scenario_data)
         asset_library_path = defs.get(f"{YAML_META_CHAR}asset_library_path", None)
         asset_library_name = defs.get(
@@ -56,14 +111,127 @@ class Scenario:
             }
         )
         for use in uses:
-            if isinstance(use, Path):
-                use = use.open().read()
             ins.requires(yaml=use)
+        if artifact_path:
+            ins.save_artifact(artifact_path, asset_library_path=asset_library_path)
+        return ins
+
+    @staticmethod
+    def digest(scenario_data: str, *uses: str) -> str:
+        """Content hash of the scenario definition and the uses, used to name compiled artifacts."""
+        h = hashlib.sha256(f"tiro-artifact-v{ARTIFACT_VERSION}".encode())
+        for content in (scenario_data, *uses):
+            h.update(b"\0")
+            h.update(content.encode())
+        return h.hexdigest()
+
+    @staticmethod
+    def _library_modules(entity_cls: Type[Entity]) -> set[str]:
+        """Modules of the asset library where the entity classes in the tree come from."""
+        modules = set()
+        for base in entity_cls.__mro__[1:]:
+            if base.__module__ not in ("builtins", Entity.__module__):
+                modules.add(base.__module__)
+        for child in entity_cls.child_info.values():
+            modules |= Scenario._library_modules(child.cls)
+        return modules
+
+    @staticmethod
+    def _library_digest(modules: list[str]) -> str:
+        h = hashlib.sha256()
+        for name in modules:
+            h.update(name.encode())
+            filename = getattr(sys.modules.get(name), "__file__", None)
+            if filename and Path(filename).exists():
+                h.update(Path(filename).read_bytes())
+        return h.hexdigest()
+
+    def artifact(self, asset_library_path: Optional[str] = None) -> dict:
+        """Compile the resolved scenario into a JSON serialisable artifact."""
+        modules = sorted(self._library_modules(self.root.__class__))
+        return dict(
+            version=ARTIFACT_VERSION,
+            asset_library_path=asset_library_path,
+            library_modules=modules,
+            library_digest=self._library_digest(modules),
+            definition=self.root.__class__.compile_definition(),
+            required=self.root.required_tree(),
+        )
+
+    def save_artifact(
+        self, path: Path, asset_library_path: Optional[str] = None
+    ) -> None:
+        try:
+            content = json.dumps(self.artifact(asset_library_path=asset_library_path))
+        except (TypeError, ValueError) as e:
+            logging.warning(f"Scenario cannot be compiled into an artifact: {e}")
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(content)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_artifact(cls, artifact: dict) -> Optional["Scenario"]:
+        """
+        Rebuild the scenario from a compiled artifact without parsing any YAML.
+        Return None if the artifact is outdated, e.g., the asset library has changed since compiled.
+        """
+        if artifact.get("version") != ARTIFACT_VERSION:
+            return None
+        asset_library_path = artifact["asset_library_path"]
+        if asset_library_path and asset_library_path not in sys.path:
+            sys.path.insert(0, asset_library_path)
+        # Checked before rebuilding the classes, which applies the defaults of the definition.
+        for name in artifact["library_modules"]:
+            import_module(name)
+        if (
+            cls._library_digest(artifact["library_modules"])
+            != artifact["library_digest"]
+        ):
+            return None
+        ins = cls(
+            **{
+                k: Entity.create_from_compiled(v["entity"])._many_from_definition(
+                    v["meta"]
+                )
+                for k, v in artifact["definition"]["children"].items()
+            }
+        )
+        ins.root.restore_required(artifact["required"])
         return ins
 
     def __getattr__(self, key):
         return getattr(self.root, key)
 
+    def catalog(self, path: Optional[Path | str] = None) -> "np.ndarray":
+        """
+        Columnar catalog of all required data points, as a NumPy structured array with the columns
+        path, name, entity_type, category, type, unit, default_text, default, ge, le, gt and lt.
+        If path is given, the catalog is saved to a file named after path and the fingerprint of the scenario,
+        e.g. catalog.3fa2c07d1e9b.npy for catalog.npy, at the first call and memory-mapped from it afterwards.
+        When the scenario or its uses change, the catalog is saved again and the outdated files are removed.
+        """
+        from .catalog import compile_catalog, save_catalog, load_catalog
+
+        if path is not None:
+            path = Path(path)
+            saved = path.with_name(
+                f"{path.stem}.{self.root.fingerprint()}{path.suffix}"
+            )
+            if not saved.exists():
+                fingerprint = "[0-9a-f]" * len(self.root.fingerprint())
+                for outdated in path.parent.glob(
+                    f"{path.stem}.{fingerprint}{path.suffix}"
+                ):
+                    outdated.unlink(missing_ok=True)
+                save_catalog(self.catalog(), saved)
+            return load_catalog(saved)
+        index = self.root.path_index()
+        if self._catalog is None or self._catalog[0] is not index:
+            self._catalog = index, compile_catalog(self.root)
+        return self._catalog[1]
+
     def mocker(self, *args, **kwargs):
         return Mocker(self.root, *args, **kwargs)
 
@@ -156,7 +324,7 @@ class Scenario:
     @classmethod
     def data_point_path_to_tags(cls, path: str | list[str], tags=None) -> dict:
         tags = tags or dict(path=cls.data_point_path_to_path(path), asset_path=path)
-        path = split_path(path)
+        path = list(split_path(path))
         component = path.pop(0)
         if component in DataPointInfo.SUB_CLASS_NAMES:
             tags |= dict(type=component, field=path[-1])
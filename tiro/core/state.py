@@ -0,0 +1,43 @@
+import gzip
+import json
+import os
+from importlib.util import find_spec
+from pathlib import Path
+
+# Version of the state format written by Mocker.save
+STATE_VERSION = 1
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def write_state(state: dict, path: Path) -> None:
+    """
+    Write the state of a mocker into path, as msgpack if it is installed, otherwise as gzipped JSON.
+    The state is written into a temporary file first, so that path always holds a complete state.
+    """
+    if find_spec("msgpack") is not None:
+        import msgpack
+
+        data = msgpack.packb(state, default=str)
+    else:
+        data = gzip.compress(json.dumps(state, default=str).encode(), compresslevel=1)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def read_state(path: Path) -> dict:
+    """Read the state of a mocker written by write_state."""
+    data = path.read_bytes()
+    if data.startswith(_GZIP_MAGIC):
+        state = json.loads(gzip.decompress(data))
+    elif find_spec("msgpack") is not None:
+        import msgpack
+
+        state = msgpack.unpackb(data)
+    else:
+        raise RuntimeError(f"Reading the state in {path} requires msgpack.")
+    if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+        raise ValueError(f"{path} is not a mocker state of version {STATE_VERSION}.")
+    return state
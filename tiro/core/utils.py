@@ -1,6 +1,11 @@
+import os
+import re
+import zlib
 from copy import copy
+from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterable, Sequence
 
 import yaml
 
@@ -12,7 +17,7 @@ def concat_path(*components):
     return PATH_SEP.join(components).strip(PATH_SEP)
 
 
-def split_path(path: str | list[str]) -> list[str]:
+def split_path(path: str | Sequence[str]) -> Sequence[str]:
     if isinstance(path, str):
         if path:
             path = path.split(PATH_SEP)
@@ -21,6 +26,31 @@ def split_path(path: str | list[str]) -> list[str]:
     return path
 
 
+def shard_of(path: str | Sequence[str], shards: int) -> int:
+    """Shard of a path among shards, by the hash of its top-level subtree, so that each subtree stays in one shard."""
+    if shards <= 1:
+        return 0
+    subtree = PATH_SEP.join(split_path(path)[:2])
+    return zlib.crc32(subtree.encode()) % shards
+
+
+def parse_isoformat(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp, also with the Z suffix, which datetime.fromisoformat only accepts from Python 3.11"""
+    value = value.strip()
+    if value[-1:] in ("Z", "z"):
+        value = f"{value[:-1]}+00:00"
+    return datetime.fromisoformat(value)
+
+
+def parse_timestamp(value: str | datetime) -> datetime:
+    """An ISO 8601 timestamp or a datetime as an aware datetime in UTC. Timestamps without a time zone are taken as UTC."""
+    if not isinstance(value, datetime):
+        value = parse_isoformat(value)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
 def snake_to_camel(name: str) -> str:
     # Not doing anything, need to fix or change the function name.
     return name
@@ -34,15 +64,11 @@ def camel_to_snake(name: str) -> str:
 DataPointTypes = int, float, str
 
 
-def insert_data_point_to_dict(path: str | list[str], value: Any, data: dict):
-    path = split_path(path)
-    component = path.pop(0)
-    if not path:
-        data[component] = copy(value)
-    else:
-        if component not in data:
-            data[component] = {}
-        insert_data_point_to_dict(path, value, data[component])
+def insert_data_point_to_dict(path: str | Sequence[str], value: Any, data: dict):
+    *parents, component = split_path(path)
+    for parent in parents:
+        data = data.setdefault(parent, {})
+    data[component] = copy(value)
 
 
 def decouple_uses(uses_data: str | dict | Path) -> Iterable[str]:
@@ -61,3 +87,74 @@ def format_regex(pattern):
     pattern = pattern.replace("%%", ".*")
     pattern = pattern.replace("%", "\.")
     return f"^{pattern}$"
+
+
+@lru_cache(maxsize=1024)
+def compile_pattern(pattern: str) -> re.Pattern:
+    return re.compile(format_regex(pattern))
+
+
+REGEX_META_CHARS = set(".^$*+?{}[]\\|()")
+
+
+def literal_prefix(pattern: str) -> list[str]:
+    """Leading path components which a pattern can only match literally."""
+    depth = 0
+    escaped = False
+    for c in pattern:
+        if escaped:
+            escaped = False
+        elif c == "\\":
+            escaped = True
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and depth == 0:
+            # A top-level alternative may start with anything.
+            return []
+    prefix = []
+    rest = pattern
+    while rest:
+        head, _, rest = rest.partition("%")
+        if not head or REGEX_META_CHARS.intersection(head) or rest.startswith("%"):
+            break
+        prefix.append(head)
+    return prefix
+
+
+def _char_class(chars: set[str]) -> str:
+    """Regex character class for the characters, with consecutive characters merged into ranges."""
+    codes = sorted(ord(c) for c in chars)
+    ranges = []
+    for code in codes:
+        if ranges and ranges[-1][1] == code - 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    escape = lambda code: re.escape(chr(code)) if chr(code) in "\\]^-[" else chr(code)
+    return "".join(
+        escape(lo) if lo == hi else f"{escape(lo)}-{escape(hi)}" for lo, hi in ranges
+    )
+
+
+def compact_id_pattern(ids: Iterable) -> str:
+    """
+    A short regex matching all the given ids (and possibly some more),
+    e.g., ^rack_[0-9]{3}$ for rack_000, rack_001, ..., rack_999.
+    """
+    ids = [str(i) for i in ids]
+    prefix = os.path.commonprefix(ids)
+    suffix = os.path.commonprefix([i[len(prefix) :][::-1] for i in ids])[::-1]
+    middles = [i[len(prefix) : len(i) - len(suffix)] for i in ids]
+    pattern = re.escape(prefix)
+    chars = set("".join(middles))
+    if chars:
+        min_len = min(len(m) for m in middles)
+        max_len = max(len(m) for m in middles)
+        if min_len != max_len:
+            repeat = f"{{{min_len},{max_len}}}"
+        else:
+            repeat = f"{{{min_len}}}" if min_len > 1 else ""
+        pattern += f"[{_char_class(chars)}]{repeat}"
+    return f"^{pattern}{re.escape(suffix)}$"
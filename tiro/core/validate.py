@@ -1,16 +1,15 @@
 import json
 from collections import deque
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Any, Type, Optional
+from typing import Any, Iterable, Type, Optional
 
-from fastapi import FastAPI
-from fastapi.responses import PlainTextResponse
-from jsonschema import validate, ValidationError as JSONSchemaValidatorError
 from pydantic import BaseModel, ValidationError as PydanticValidationError
+from pydantic.error_wrappers import ErrorWrapper
+from pydantic.errors import DictError, MissingError
 
-from .model import Entity
-from .utils import insert_data_point_to_dict
+from .model import DataPointInfo, Entity
+from .utils import camel_to_snake, concat_path, insert_data_point_to_dict, split_path
 
 
 @dataclass
@@ -18,7 +17,8 @@ class ValidationResult:
     start: datetime
     end: datetime
     valid: bool
-    exception: Optional[JSONSchemaValidatorError | PydanticValidationError]
+    # Either a pydantic or a jsonschema ValidationError
+    exception: Optional[Exception]
 
     def __str__(self):
         msg = f"Validation Period: {self.start} -- {self.end}\n"
@@ -44,12 +44,31 @@ class ValidationResult:
             return None
         elif isinstance(self.exception, PydanticValidationError):
             return self.exception.errors()
-        elif isinstance(self.exception, JSONSchemaValidatorError):
-            return dict(
-                message=self.exception.message,
-                path=self.exception.json_path,
-                description=str(self.exception),
-            )
+        else:
+            from jsonschema import ValidationError as JSONSchemaValidatorError
+
+            if isinstance(self.exception, JSONSchemaValidatorError):
+                return dict(
+                    message=self.exception.message,
+                    path=self.exception.json_path,
+                    description=str(self.exception),
+                )
+
+
+# Marks a data point which has never been validated, as its value may be None
+_NOT_VALIDATED = object()
+
+
+@dataclass
+class _Subtree:
+    """Dirty tracking of the subtree of an entity instance, with the errors of its last validation"""
+
+    # Paths collected under the subtree in the current period
+    paths: set[str] = field(default_factory=set)
+    # paths when the subtree was last validated, or None if it has never been validated
+    validated_paths: Optional[frozenset[str]] = None
+    dirty: bool = True
+    errors: list[ErrorWrapper] = field(default_factory=list)
 
 
 class Validator:
@@ -57,6 +76,15 @@ class Validator:
     Validator receives data points and
     validate the JSON combined from all received data points in a short period
     against the given scenario or JSON schema.
+
+    If incremental (only with a scenario), every collected data point is validated immediately against
+    the model of the data point, and validate() only checks that no required path is missing and combines
+    the errors of the data points, instead of validating the whole combined JSON.
+
+    If cache_subtrees (only with a scenario), the subtree of every entity instance is marked dirty when a
+    collected data point under it differs from the one last validated, e.g. in the previous period, and keeps
+    the errors of its last validation. validate() then only re-validates the dirty subtrees, and reuses the
+    errors of the others.
     """
 
     def __init__(
@@ -68,7 +96,27 @@ class Validator:
         log_size: int = 100,
         validate_path_only: bool = False,
         require_all_children: bool = True,
+        incremental: bool = False,
+        cache_subtrees: bool = False,
     ):
+        if incremental and not entity:
+            raise ValueError("Incremental validation requires a scenario.")
+        if cache_subtrees and not entity:
+            raise ValueError("Caching the validation of subtrees requires a scenario.")
+        self.entity: Optional[Entity] = entity
+        self.hide_dp_values: bool = validate_path_only
+        self.require_all_children: bool = require_all_children
+        self.incremental: bool = incremental
+        # Errors of the data points collected in incremental mode, by path
+        self._leaf_errors: dict[str, PydanticValidationError] = {}
+        self.cache_subtrees: bool = cache_subtrees
+        # Subtrees of the entity instances by location, kept across periods if cache_subtrees
+        self._subtrees: dict[tuple, _Subtree] = {}
+        # Paths collected in the current period
+        self._collected: set[str] = set()
+        # Values of the data points at their last validation, and the changed values to validate next
+        self._validated: dict[str, Any] = {}
+        self._pending: dict[str, Any] = {}
         if entity:
             self.model: Type[BaseModel] = entity.model(
                 hide_dp_values=validate_path_only,
@@ -89,6 +137,12 @@ class Validator:
     def reset_data(self) -> None:
         self._collect_count = 0
         self._data = {}
+        self._leaf_errors = {}
+        self._collected = set()
+        # Changes not validated are found again against the values last validated.
+        self._pending = {}
+        for subtree in self._subtrees.values():
+            subtree.paths = set()
         if self.retention:
             self.data_create_time = datetime.now()
 
@@ -106,18 +160,63 @@ class Validator:
 
     def collect(self, path: str, value: Any):
         self.validate_retention()
+        if self.cache_subtrees:
+            self._mark_dirty(path, value)
         insert_data_point_to_dict(path, value, self._data)
+        if self.incremental:
+            self._validate_data_point(path, value)
         self._collect_count += 1
 
+    def _validate_data_point(self, path: str, value: Any) -> None:
+        """Validate a collected data point against its model, keeping the error of the latest value of the path"""
+        self._leaf_errors.pop(path, None)
+        parts = split_path(path)
+        entity, i = self.entity, 0
+        while i < len(parts) and parts[i] in entity.children:
+            entity, i = entity.children[parts[i]], i + 2
+        if i + 2 != len(parts) or parts[i + 1] not in entity._used_data_points:
+            # Not a required data point, which the model of the scenario ignores as well.
+            return
+        category, dp_name = parts[i:]
+        dp_info = entity.data_point_info[dp_name]
+        if category != camel_to_snake(dp_info.__class__.__name__):
+            return
+        e = self._data_point_error(entity, dp_name, value)
+        if e is not None:
+            self._leaf_errors[path] = e
+
+    def _data_point_error(
+        self, entity: Entity, dp_name: str, value: Any
+    ) -> Optional[PydanticValidationError]:
+        """Validate the value of a data point of the entity against its model"""
+        if self.hide_dp_values:
+            # Only the paths are validated, but a data point is still a dict.
+            if not isinstance(value, dict):
+                return PydanticValidationError(
+                    [ErrorWrapper(DictError(), loc=())], self.model
+                )
+            return None
+        if value is None and entity.data_point_info[dp_name].default is not None:
+            return None
+        try:
+            entity.data_point_model(dp_name).parse_obj(value)
+        except PydanticValidationError as e:
+            return e
+        return None
+
     def validate(self) -> ValidationResult:
         period_start = self.data_create_time
         period_end = datetime.now()
         if period_end - period_start > self.retention:
             period_end = period_start + self.retention
         try:
-            if self.model:
+            if self.incremental or self.cache_subtrees:
+                self._check_collected()
+            elif self.model:
                 self.model.parse_obj(self._data)
             elif self.schema:
+                from jsonschema import validate
+
                 validate(instance=self._data, schema=self.schema)
             res = ValidationResult(period_start, period_end, True, None)
         except Exception as e:
@@ -128,9 +227,174 @@ class Validator:
             self.log.appendleft(res)
         return res
 
+    def _check_collected(self) -> None:
+        """Raise the errors of the collected data points and the missing required paths, as the model would."""
+        if self.cache_subtrees:
+            errors = self._subtree_errors(self.entity, self._data, ())
+            self._validated.update(self._pending)
+            self._pending = {}
+            self._prune()
+        else:
+            errors = [
+                ErrorWrapper(e, loc=tuple(split_path(path)))
+                for path, e in self._leaf_errors.items()
+            ]
+            errors.extend(self._missing_paths(self.entity, self._data, ()))
+        if errors:
+            raise PydanticValidationError(errors, self.model)
+
+    def _mark_dirty(self, path: str, value: Any) -> None:
+        """
+        Mark the subtrees of the entity instances containing a collected data point as dirty if its value
+        differs from the one last validated, and add its path to the paths collected under them.
+        """
+        parts = split_path(path)
+        locs, entity, i = [()], self.entity, 0
+        while i + 1 < len(parts) and parts[i] in entity.children:
+            entity, i = entity.children[parts[i]], i + 2
+            locs.append(tuple(parts[:i]))
+        changed = self._validated.get(path, _NOT_VALIDATED) != value
+        if changed:
+            self._pending[path] = value
+        else:
+            self._pending.pop(path, None)
+        new = path not in self._collected
+        if new:
+            self._collected.add(path)
+        for loc in locs:
+            subtree = self._subtrees.get(loc)
+            if subtree is None:
+                subtree = self._subtrees[loc] = _Subtree()
+            if new:
+                subtree.paths.add(path)
+            if changed:
+                subtree.dirty = True
+
+    def _prune(self) -> None:
+        """
+        Forget the data points and subtrees not collected in the current period, so that the paths of clients
+        no longer sending them do not pile up. They are validated again if they are collected again.
+        """
+        # Every collected path has been validated, so the sizes only differ if other paths are kept.
+        if len(self._validated) > len(self._collected):
+            self._validated = {path: self._validated[path] for path in self._collected}
+        self._subtrees = {
+            loc: subtree
+            for loc, subtree in self._subtrees.items()
+            if subtree.paths or not loc
+        }
+
+    def _subtree_errors(
+        self, entity: Entity, data: dict, loc: tuple
+    ) -> list[ErrorWrapper]:
+        """
+        Errors of the subtree of an entity instance at loc. The last errors are reused if no data point
+        under it changed and the same paths were collected, otherwise only the dirty branches are validated.
+        """
+        subtree = self._subtrees.get(loc)
+        if subtree is None:
+            subtree = self._subtrees[loc] = _Subtree()
+        elif not subtree.dirty and subtree.validated_paths == subtree.paths:
+            return subtree.errors
+        errors = list(self._node_errors(entity, data, loc))
+        errors.extend(self._data_point_errors(entity, data, loc))
+        for child, sub_data, sub_loc in self._child_subtrees(entity, data, loc):
+            errors.extend(self._subtree_errors(child, sub_data, sub_loc))
+        subtree.errors, subtree.validated_paths = errors, frozenset(subtree.paths)
+        subtree.dirty = False
+        return errors
+
+    def _data_point_errors(
+        self, entity: Entity, data: dict, loc: tuple
+    ) -> Iterable[ErrorWrapper]:
+        for dp_name in entity._used_data_points:
+            category = camel_to_snake(
+                entity.data_point_info[dp_name].__class__.__name__
+            )
+            values = data.get(category)
+            key = camel_to_snake(dp_name)
+            if not isinstance(values, dict) or key not in values:
+                continue
+            if self.incremental:
+                e = self._leaf_errors.get(concat_path(*loc, category, key))
+            else:
+                e = self._data_point_error(entity, dp_name, values[key])
+            if e is not None:
+                yield ErrorWrapper(e, loc=loc + (category, key))
+
+    def _missing_paths(
+        self, entity: Entity, data: dict, loc: tuple
+    ) -> Iterable[ErrorWrapper]:
+        yield from self._node_errors(entity, data, loc)
+        for child, sub_data, sub_loc in self._child_subtrees(entity, data, loc):
+            yield from self._missing_paths(child, sub_data, sub_loc)
+
+    @staticmethod
+    def _child_subtrees(
+        entity: Entity, data: dict, loc: tuple
+    ) -> Iterable[tuple[Entity, dict, tuple]]:
+        for name, child in entity.children.items():
+            key = camel_to_snake(name)
+            ids = entity.child_info[name].ids
+            for uuid, sub_data in data.get(key, {}).items():
+                if (ids is None or uuid in ids) and isinstance(sub_data, dict):
+                    yield child, sub_data, loc + (key, uuid)
+
+    def _node_errors(
+        self, entity: Entity, data: dict, loc: tuple
+    ) -> Iterable[ErrorWrapper]:
+        """Missing required paths and unexpected ids directly under an entity instance, excluding its children"""
+        for name, child in entity.children.items():
+            key = camel_to_snake(name)
+            if key not in data:
+                _, is_optional = child._model(
+                    hide_dp_values=self.hide_dp_values,
+                    require_all_children=self.require_all_children,
+                )
+                if not is_optional or self.require_all_children:
+                    yield ErrorWrapper(MissingError(), loc=loc + (key,))
+                continue
+            ids = entity.child_info[name].ids
+            if ids is None:
+                continue
+            for uuid in data[key]:
+                if uuid not in ids:
+                    yield ErrorWrapper(
+                        ValueError(f"unexpected id {uuid}"), loc=loc + (key, uuid)
+                    )
+        for dp_category in DataPointInfo.SUB_CLASSES:
+            names = [
+                k
+                for k in entity.data_points()
+                if isinstance(entity.data_point_info[k], dp_category)
+            ]
+            if not names:
+                continue
+            required = [
+                k
+                for k in names
+                if self.hide_dp_values or entity.data_point_info[k].default is None
+            ]
+            category = camel_to_snake(dp_category.__name__)
+            if category not in data:
+                if required:
+                    yield ErrorWrapper(MissingError(), loc=loc + (category,))
+                continue
+            for k in required:
+                if camel_to_snake(k) not in data[category]:
+                    yield ErrorWrapper(
+                        MissingError(), loc=loc + (category, camel_to_snake(k))
+                    )
+
     def validate_dict(self, content: dict):
         self._data = content
-        return self.validate()
+        incremental, self.incremental = self.incremental, False
+        cache_subtrees, self.cache_subtrees = self.cache_subtrees, False
+        try:
+            return self.validate()
+        finally:
+            self.incremental = incremental
+            self.cache_subtrees = cache_subtrees
 
     @property
     def last_validation_start_time(self):
@@ -151,17 +415,10 @@ class Validator:
         return self._collect_count
 
 
-class RestfulValidationApp(FastAPI):
-    def __init__(self, validator: Validator, *args, **kwargs):
-        super(RestfulValidationApp, self).__init__(*args, **kwargs)
-        self.validator: Validator = validator
-
-        @self.post("/points/{path}")
-        def collect_data(path: str, value: dict):
-            self.validator.collect(path, value)
+def __getattr__(name):
+    # The web application is kept in a separate module, so that FastAPI is only imported when needed.
+    if name == "RestfulValidationApp":
+        from .validate_app import RestfulValidationApp
 
-        @self.get("/results", response_class=PlainTextResponse)
-        def check_result():
-            self.validator.validate()
-            msg = "\n\n".join([str(x) for x in self.validator.log])
-            return msg
+        return RestfulValidationApp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,27 @@
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from .validate import Validator
+
+
+class RestfulValidationApp(FastAPI):
+    def __init__(self, validator: Validator, *args, **kwargs):
+        super(RestfulValidationApp, self).__init__(*args, **kwargs)
+        self.validator: Validator = validator
+
+        @self.post("/points/batch")
+        def collect_batch(items: list[dict]):
+            """Collect many data points in one request, as a list of {path, result}, e.g., from POST /points/batch of MockApp"""
+            for item in items:
+                if "result" in item:
+                    self.validator.collect(item["path"], item["result"])
+
+        @self.post("/points/{path}")
+        def collect_data(path: str, value: dict):
+            self.validator.collect(path, value)
+
+        @self.get("/results", response_class=PlainTextResponse)
+        def check_result():
+            self.validator.validate()
+            msg = "\n\n".join([str(x) for x in self.validator.log])
+            return msg
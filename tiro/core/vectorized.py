@@ -0,0 +1,327 @@
+import gc
+from datetime import datetime, timedelta
+from typing import Optional, Sequence, Generator, TYPE_CHECKING
+
+import numpy as np
+from pydantic import BaseModel
+
+from .mock import seed_fakers, value_bounds
+from .model import DataPointInfo, Telemetry
+from .utils import camel_to_snake
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from .mock import MockedEntity, MockedDataPoint
+
+# Ways of generating values: vectorized uniform floats, vectorized integers, or the faker of each data point.
+SAMPLERS = (float, int, None)
+
+
+def _bounds(dp: "MockedDataPoint") -> tuple[Optional[type], float, float]:
+    """The sampler (float or int) and the value range of a data point, see mock.value_bounds"""
+    bounds = value_bounds(dp)
+    if bounds is None:
+        return None, np.nan, np.nan
+    return bounds
+
+
+class VectorizedMockEngine:
+    """
+    Columnar store for the values and timestamps of all data points in a mocked entity tree.
+
+    Data points are numbered in depth-first order, so the data points of any entity subtree
+    form one contiguous index range. A refresh draws all values bounded by the reference or by
+    confloat/conint constraints with one vectorized call per sampler (float or int), and draws
+    all timestamps with one more call. Only data points without known bounds fall back to their fakers,
+    seeded from the generator of the engine if it is seeded (see seed_fakers).
+    """
+
+    def __init__(self, entity: "MockedEntity", seed: Optional[int] = None):
+        self.rng: np.random.Generator = np.random.default_rng(seed)
+        self.seeded: bool = seed is not None
+        self.data_points: list["MockedDataPoint"] = []
+        self.ranges: dict[int, tuple[int, int]] = {}
+        # Path ID of each data point to its position
+        self.index: dict[int, int] = {}
+        # (Entity path ID, category) to the names and positions of its data points, with and without defaults
+        self.categories: dict[tuple[int, str], tuple] = {}
+        # Owner (entity, category) of each group of data points, and the group of each data point
+        self.groups: list[tuple["MockedEntity", str]] = []
+        self.group_of: list[int] = []
+        self.layout = self._collect(entity)
+
+        dps = self.data_points
+        size = len(dps)
+        self.units: list[Optional[str]] = [dp.prototype.unit for dp in dps]
+        self.unit_indices: list[int] = [i for i, u in enumerate(self.units) if u]
+        self.defaults = np.empty(size, dtype=object)
+        self.defaults[:] = [dp.prototype.default for dp in dps]
+        self.has_default = np.array([d is not None for d in self.defaults], dtype=bool)
+        self.is_telemetry = np.array(
+            [isinstance(dp.prototype, Telemetry) for dp in dps], dtype=bool
+        )
+        self.time_var = np.array(
+            [int(dp.prototype.time_var.total_seconds()) for dp in dps], dtype=np.int64
+        )
+
+        self.values = np.empty(size, dtype=object)
+        self.values[:] = [dp.cur_value for dp in dps]
+        self.timestamps = np.array(
+            [dp.gen_timestamp or "NaT" for dp in dps], dtype="datetime64[s]"
+        )
+        self.generated = np.array([dp.cur_value is not None for dp in dps], dtype=bool)
+        self.group_of = np.array(self.group_of, dtype=np.int64)
+        # Encoded value and timestamp of each data point, updated only for data points refreshed since
+        self.leaves: list[Optional[dict]] = [None] * size
+        self.stale = np.ones(size, dtype=bool)
+        self.any_stale: bool = True
+
+        bounds = [_bounds(dp) for dp in dps]
+        self.samplers = np.array([SAMPLERS.index(b[0]) for b in bounds], dtype=np.int8)
+        self.low = np.array([b[1] for b in bounds], dtype=float)
+        self.high = np.array([b[2] for b in bounds], dtype=float)
+
+    def __len__(self):
+        return len(self.data_points)
+
+    def _collect(self, entity: "MockedEntity") -> tuple[list, list]:
+        """Number the data points of the subtree and return its layout for building dicts."""
+        start = len(self.data_points)
+        categories = []
+        for dp_type in DataPointInfo.SUB_CLASSES:
+            dp_type_name = camel_to_snake(dp_type.__name__)
+            dps = getattr(entity, dp_type_name)
+            if dps:
+                items = []
+                for name, dp in dps.items():
+                    self.index[dp.path_id] = len(self.data_points)
+                    items.append((name, len(self.data_points)))
+                    self.data_points.append(dp)
+                    self.group_of.append(len(self.groups))
+                self.groups.append((entity, dp_type_name))
+                no_default = [
+                    (name, i)
+                    for name, i in items
+                    if self.data_points[i].prototype.default is None
+                ]
+                category = (
+                    dp_type_name,
+                    tuple(name for name, _ in items),
+                    tuple(i for _, i in items),
+                    tuple(name for name, _ in no_default),
+                    tuple(i for _, i in no_default),
+                )
+                categories.append(category)
+                self.categories[entity.path_id, dp_type_name] = category
+        children = [
+            (k, [(uuid, self._collect(c)) for uuid, c in v.items()])
+            for k, v in entity.children.items()
+        ]
+        self.ranges[entity.path_id] = start, len(self.data_points)
+        return children, categories
+
+    def refresh(
+        self,
+        change_attrs: bool = False,
+        use_default: bool = True,
+        indices: Optional[Sequence[int]] = None,
+        now: Optional[datetime] = None,
+    ) -> None:
+        """
+        Regenerate all telemetry, plus attributes that were never generated or all attributes if change_attrs.
+        If indices is given, only those data points are considered.
+        Timestamps are drawn within time_var before now, which defaults to the current time.
+        """
+        if indices is None:
+            idx = np.arange(len(self))
+        else:
+            idx = np.asarray(indices, dtype=np.int64)
+        if not change_attrs:
+            idx = idx[self.is_telemetry[idx] | ~self.generated[idx]]
+        if not len(idx):
+            return
+        sampled = idx
+        if use_default:
+            defaulted = self.has_default[idx]
+            self.values[idx[defaulted]] = self.defaults[idx[defaulted]]
+            sampled = idx[~defaulted]
+
+        samplers = self.samplers[sampled]
+        for code, sampler in enumerate(SAMPLERS):
+            i = sampled[samplers == code]
+            if not len(i):
+                continue
+            if sampler is float:
+                self.values[i] = self.rng.uniform(self.low[i], self.high[i]).tolist()
+            elif sampler is int:
+                self.values[i] = self.rng.integers(
+                    self.low[i].astype(np.int64), self.high[i].astype(np.int64) + 1
+                ).tolist()
+            else:
+                if self.seeded:
+                    seed_fakers(int(self.rng.integers(2**63)))
+                for j in i:
+                    value = self.data_points[j].prototype.faker()
+                    if isinstance(value, BaseModel):
+                        value = value.dict()
+                    self.values[j] = value
+
+        now = np.datetime64((now or datetime.now()).replace(microsecond=0), "s")
+        offsets = self.rng.integers(0, self.time_var[idx] + 1)
+        self.timestamps[idx] = now - offsets.astype("timedelta64[s]")
+        self.generated[idx] = True
+        self.stale[idx] = True
+        self.any_stale = True
+        for group in np.unique(self.group_of[idx]).tolist():
+            entity, category = self.groups[group]
+            entity.mark_changed(category)
+
+    def point(self, i: int) -> dict:
+        res = dict(
+            value=self.values[i],
+            timestamp=str(np.datetime_as_string(self.timestamps[i], unit="s")),
+        )
+        if self.units[i] is not None:
+            res |= dict(unit=self.units[i])
+        return res
+
+    def update_leaves(self) -> list[Optional[dict]]:
+        """Rebuild the leaves of data points refreshed since the last update and return all leaves."""
+        if not self.any_stale:
+            return self.leaves
+        idx = np.flatnonzero(self.stale)
+        timestamps = self.timestamps[idx]
+        unique, inverse = np.unique(timestamps, return_inverse=True)
+        strings = np.datetime_as_string(unique, unit="s").tolist()
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for i, v, t in zip(
+                idx.tolist(), self.values[idx].tolist(), inverse.tolist()
+            ):
+                leaf = {"value": v, "timestamp": strings[t]}
+                if self.units[i] is not None:
+                    leaf["unit"] = self.units[i]
+                self.leaves[i] = leaf
+        finally:
+            if gc_enabled:
+                gc.enable()
+        self.stale[idx] = False
+        self.any_stale = False
+        return self.leaves
+
+    def category_values(
+        self, entity: "MockedEntity", category: str, skip_default: bool
+    ) -> dict:
+        """Current values of a category of data points in an entity, in the same form as MockedEntity.dict"""
+        _, names, indices, names_no_default, indices_no_default = self.categories[
+            entity.path_id, category
+        ]
+        if skip_default:
+            names, indices = names_no_default, indices_no_default
+        return dict(zip(names, map(self.update_leaves().__getitem__, indices)))
+
+    def gen_data_point(
+        self, dp: "MockedDataPoint", change_attrs=False, use_default=True
+    ) -> dict:
+        i = self.index[dp.path_id]
+        self.refresh(change_attrs=change_attrs, use_default=use_default, indices=[i])
+        return self.point(i)
+
+    def timestamp_strings(self) -> list[str]:
+        # Timestamps have a resolution of seconds and mostly coincide, so only the distinct ones are formatted.
+        unique, inverse = np.unique(self.timestamps, return_inverse=True)
+        return list(
+            map(
+                np.datetime_as_string(unique, unit="s").tolist().__getitem__,
+                inverse.tolist(),
+            )
+        )
+
+    def dict(self, change_attrs=False, skip_default=True, use_default=True) -> dict:
+        """Refresh all data points and return the same nested dict as MockedEntity.dict."""
+        self.refresh(change_attrs=change_attrs, use_default=use_default)
+        gc_enabled = gc.isenabled()
+        # Building the tree allocates one dict per data point, which would otherwise trigger many useless collections.
+        gc.disable()
+        try:
+            leaves = [
+                {"value": v, "timestamp": t}
+                for v, t in zip(self.values.tolist(), self.timestamp_strings())
+            ]
+            for i in self.unit_indices:
+                leaves[i]["unit"] = self.units[i]
+            return self._build(self.layout, leaves.__getitem__, skip_default)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _build(self, layout, get_leaf, skip_default) -> dict:
+        children, categories = layout
+        res = {}
+        for k, v in children:
+            _values = {}
+            for uuid, c in v:
+                _sub_value = self._build(c, get_leaf, skip_default)
+                if _sub_value:
+                    _values[uuid] = _sub_value
+            if _values:
+                res[k] = _values
+        for (
+            dp_type_name,
+            names,
+            indices,
+            names_no_default,
+            indices_no_default,
+        ) in categories:
+            if skip_default:
+                names, indices = names_no_default, indices_no_default
+            if names:
+                res[dp_type_name] = dict(zip(names, map(get_leaf, indices)))
+        return res
+
+    def history(
+        self,
+        start: datetime,
+        stop: datetime,
+        step: timedelta,
+        chunk_size: int = 100_000,
+        skip_default: bool = True,
+    ) -> Generator["pd.DataFrame", None, None]:
+        """
+        Refresh the data points at every step from start (inclusive) to stop (exclusive) and yield the values as
+        data frames of at most chunk_size rows, or of one step if a step has more rows.
+        Rows carry the same tags as Scenario.decompose_data, plus the value and the timestamp.
+        """
+        import pandas as pd
+
+        if step <= timedelta(0):
+            raise ValueError("The step of history must be positive.")
+        indices = (
+            np.flatnonzero(~self.has_default) if skip_default else np.arange(len(self))
+        )
+        if not len(indices):
+            return
+        tags = pd.DataFrame(
+            [
+                self.data_points[i].registry.tags(self.data_points[i].path_id)
+                | dict(asset_path=self.data_points[i].parent.path)
+                for i in indices
+            ]
+        )
+        steps_per_chunk = max(1, chunk_size // len(indices))
+        now = start
+        while now < stop:
+            values, timestamps = [], []
+            while now < stop and len(values) < steps_per_chunk:
+                self.refresh(now=now)
+                values.append(self.values[indices])
+                timestamps.append(self.timestamps[indices])
+                now += step
+            chunk = tags.iloc[np.tile(np.arange(len(indices)), len(values))]
+            chunk = chunk.reset_index(drop=True).assign(
+                value=pd.Series(np.concatenate(values)).infer_objects(),
+                timestamp=np.concatenate(timestamps).astype("datetime64[ns]"),
+            )
+            yield chunk
@@ -131,9 +131,8 @@ class ArangoAgent:
         self.insert_vertices_and_edges(vertices, edges, replace=False)
 
     def parse_doc_to_graph_components(self, doc: dict):
-        path = doc["path"].split(PATH_SEP)
         root_name = self.entity.name
-        path.insert(0, root_name)
+        path = [root_name, *self.scenario.path_registry.parts(doc["path"])]
         edges = []
         vertices = {}
         for i in range(len(path) - 1):
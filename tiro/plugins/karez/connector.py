@@ -1,11 +1,19 @@
+import asyncio
 import httpx
 import logging
+from typing import Optional
 
 from karez.config import OptionalConfigEntity
 from karez.connector import RestfulConnectorBase
 
+from tiro.core.utils import shard_of
+
 
 class ConnectorForMockServer(RestfulConnectorBase):
+    # Base URLs of the shards of the mock server, empty if not sharded, and the shard of each uuid
+    shards: Optional[list[str]] = None
+    uuid_shards: Optional[dict[str, int]] = None
+
     @classmethod
     def role_description(cls):
         return "Connector to fetch telemetries and attributes from a Tiro mock server."
@@ -16,12 +24,38 @@ class ConnectorForMockServer(RestfulConnectorBase):
         yield OptionalConfigEntity(
             "by", "path", "Access data by path or uuid? (path, uuid)"
         )
+        yield OptionalConfigEntity(
+            "batch", False, "Fetch all entities in one request to the batch endpoints"
+        )
+
+    async def discover_shards(self, client: httpx.AsyncClient) -> list[str]:
+        """Find the shards of the mock server once, so that entities are fetched from the shards serving them."""
+        if self.shards is None:
+            r = await client.get("/shards")
+            self.shards = r.json()["shards"] if r.status_code == httpx.codes.OK else []
+            if self.shards and self.config.by == "uuid":
+                self.uuid_shards = {}
+                for i, url in enumerate(self.shards):
+                    r = await client.get(f"{url}/values/")
+                    self.uuid_shards |= dict.fromkeys(r.json(), i)
+        return self.shards
+
+    def shard_url(self, entity: str) -> str:
+        """Base URL of the shard serving the entity, or an empty string to use the base URL of the client"""
+        if not self.shards:
+            return ""
+        if self.config.by == "uuid":
+            return self.shards[self.uuid_shards.get(entity, 0)]
+        return self.shards[shard_of(entity, len(self.shards))]
 
     async def fetch_data(self, client: httpx.AsyncClient, entities):
+        await self.discover_shards(client)
+        if self.config.batch:
+            return await self.fetch_batch(client, entities)
         result = []
         for entity in entities:
             if self.config.by == "path":
-                r = await client.get(f"/points/{entity}")
+                r = await client.get(f"{self.shard_url(entity)}/points/{entity}")
                 if r.status_code == httpx.codes.OK:
                     data = dict(path=entity, result=r.json())
                     result.append(
@@ -32,7 +66,7 @@ class ConnectorForMockServer(RestfulConnectorBase):
                         f"{self.__class__.__name__}[{self.name}] request error {r.status_code}: /points/{entity}"
                     )
             elif self.config.by == "uuid":
-                r = await client.get(f"/values/{entity}")
+                r = await client.get(f"{self.shard_url(entity)}/values/{entity}")
                 if r.status_code == httpx.codes.OK:
                     result.append(dict(name=entity, value=r.json()))
                 else:
@@ -42,3 +76,45 @@ class ConnectorForMockServer(RestfulConnectorBase):
             else:
                 raise ValueError(f'Config entity "by" can only be "path" or "uuid"')
         return result
+
+    async def fetch_batch(self, client: httpx.AsyncClient, entities):
+        groups: dict[str, list] = {}
+        for entity in entities:
+            groups.setdefault(self.shard_url(entity), []).append(entity)
+        results = await asyncio.gather(
+            *(
+                self.fetch_shard_batch(client, url, group)
+                for url, group in groups.items()
+            )
+        )
+        return [item for result in results for item in result]
+
+    async def fetch_shard_batch(
+        self, client: httpx.AsyncClient, base_url: str, entities
+    ):
+        if self.config.by == "path":
+            url = f"{base_url}/points/batch"
+            r = await client.post(url, json=dict(paths=list(entities)))
+        elif self.config.by == "uuid":
+            url = f"{base_url}/values/batch"
+            r = await client.post(url, json=dict(uuids=list(entities)))
+        else:
+            raise ValueError(f'Config entity "by" can only be "path" or "uuid"')
+        if r.status_code != httpx.codes.OK:
+            logging.error(
+                f"{self.__class__.__name__}[{self.name}] request error {r.status_code}: {url}"
+            )
+            return []
+        result = []
+        for item in r.json():
+            if "error" in item:
+                logging.error(
+                    f"{self.__class__.__name__}[{self.name}] request error: {item['error']}"
+                )
+            elif self.config.by == "path":
+                result.append(
+                    self.update_meta(item, category=item["path"].split(".")[-2].lower())
+                )
+            else:
+                result.append(item)
+        return result
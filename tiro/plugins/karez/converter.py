@@ -5,7 +5,7 @@ import yaml
 from karez.config import OptionalConfigEntity, ConfigEntity
 from tiro.core import Scenario
 from tiro.core.mock import Reference
-from tiro.core.utils import PATH_SEP, split_path
+from tiro.core.utils import concat_path
 from karez.converter.extras.fix_timestamp import Converter as FixTimestampConverter
 from karez.converter import ConverterBase
 
@@ -49,15 +49,12 @@ class TiroUpdateInfoForValueConverter(FixTimestampConverter):
         if self.is_configured("tz_infos"):
             payload = list(FixTimestampConverter.convert(self, payload))[0]
         uuid = payload.pop("name")
-        path = self.reference.search_by_uuid(uuid)
-        if path is None:
+        handle = self.reference.resolve_uuid(uuid)
+        if handle is None:
             raise ValueError(f"Cannot find uuid {uuid}")
-        path, _, dp_name = path.rpartition(PATH_SEP)
-        path = split_path(path)
-        type_path = [path[i] for i in range(0, len(path), 2)] + [dp_name]
-        dp_info = self.scenario.query_data_point_info(type_path)
+        dp_info = self.scenario.query_data_point_info(handle.type_path)
         category = dp_info.__class__.__name__
-        path = PATH_SEP.join(path + [category, dp_name])
+        path = concat_path(handle.asset_path, category, handle.name)
         result = dict(path=path, result=payload)
         self.copy_meta(result, payload, clear_old=True)
         self.update_meta(result, category=category.lower())
@@ -1,3 +1,5 @@
+from itertools import chain, zip_longest
+
 import httpx as httpx
 
 from karez.config import OptionalConfigEntity
@@ -21,9 +23,15 @@ class DispatcherForMockServer(DispatcherBase):
 
     async def load_entities(self) -> list:
         if self.config.by == "path":
-            url = f"{self.config.base_url}/points/"
+            endpoint = "points"
         elif self.config.by == "uuid":
-            url = f"{self.config.base_url}/values/"
+            endpoint = "values"
         else:
             raise ValueError(f'Config entity "by" can only be "path" or "uuid"')
-        return httpx.get(url).json()
+        r = httpx.get(f"{self.config.base_url}/shards")
+        shards = r.json()["shards"] if r.status_code == httpx.codes.OK else []
+        if not shards:
+            return httpx.get(f"{self.config.base_url}/{endpoint}/").json()
+        # Interleave the entities of all shards, so that every batch is spread across the shards.
+        entities = [httpx.get(f"{url}/{endpoint}/").json() for url in shards]
+        return [e for e in chain.from_iterable(zip_longest(*entities)) if e is not None]
@@ -268,8 +268,8 @@ class TiroTSPump(InfluxDBDataPump):
         for path, value in self.arangodb_agent.query_attributes_and_missing(
             pattern_or_uses=pattern_or_uses, max_time_diff=time_diff
         ).items():
-            data_point = self.scenario.data_point_path_to_tags(path) | value
-            if fields and path.split(PATH_SEP)[-1] not in fields:
+            data_point = self.scenario.path_registry.tags(path) | value
+            if fields and self.scenario.path_registry.parts(path)[-1] not in fields:
                 continue
             missing_data.append(data_point)
         index = gen_index(config.start, config.stop, config.step)
@@ -1,11 +1,30 @@
 from functools import partial
 
-from faker import Faker
 from pydantic import confloat, conint
 
 from .core.model import Telemetry
 
-default_faker = Faker()
+_default_faker = None
+
+
+def get_default_faker():
+    """The shared Faker instance, created on first use as creating it is slow."""
+    global _default_faker
+    if _default_faker is None:
+        from faker import Faker
+
+        _default_faker = Faker()
+    return _default_faker
+
+
+def __getattr__(name):
+    if name == "default_faker":
+        return get_default_faker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _fake(method, faker=None, **kwargs):
+    return getattr(faker or get_default_faker(), method)(**kwargs)
 
 
 class Unit:
@@ -22,21 +41,24 @@ class Unit:
     TON = "ton"
 
 
-def RangedFloatTelemetry(
-    ge, le, unit=None, right_digits=2, faker=default_faker
-) -> Telemetry:
+def RangedFloatTelemetry(ge, le, unit=None, right_digits=2, faker=None) -> Telemetry:
     return Telemetry(
         confloat(ge=ge, le=le),
         unit,
         faker=partial(
-            faker.pyfloat, right_digits=right_digits, min_value=ge, max_value=le
+            _fake,
+            "pyfloat",
+            faker,
+            right_digits=right_digits,
+            min_value=ge,
+            max_value=le,
         ),
     )
 
 
-def RangedIntTelemetry(ge, le, unit=None, faker=default_faker) -> Telemetry:
+def RangedIntTelemetry(ge, le, unit=None, faker=None) -> Telemetry:
     return Telemetry(
         conint(ge=ge, le=le),
         unit,
-        faker=partial(faker.pyint, min_value=ge, max_value=le),
+        faker=partial(_fake, "pyint", faker, min_value=ge, max_value=le),
     )